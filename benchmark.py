@@ -0,0 +1,455 @@
+"""
+The purpose of this document is to measure the hot paths of the simulation, so that every
+change to the engine can be judged on numbers instead of impressions.
+
+Every benchmark is timed for each combination of population size and contact density it
+applies to, taking the best of a few repeats (the least disturbed by the rest of the
+machine); fast cases are repeated until they have run for MIN_CASE_TIME. Benchmarks which
+change their state, such as a day of the epidemic, run every repeat on a fresh copy of the
+same starting point, so that repeats measure the same work. The results are
+written to a JSON file:
+
+    {"environment": {...}, "calibration": <seconds>,
+     "results": {"<benchmark>[size=<N>,density=<D>]": {...}}}
+
+and can be compared against a stored baseline (BASELINE_PATH), reporting every case which
+got slower than the baseline by more than the regression threshold. The calibration is the
+time of a fixed NumPy workload measured alongside the results; baseline times are scaled
+by the ratio of the two calibrations, so that a machine which is busier or slower as a
+whole does not show up as a regression of every case. From the project folder:
+
+    python benchmark.py                          run the default sizes and compare to the baseline
+    python benchmark.py --sizes 1000 10000       run chosen sizes
+    python benchmark.py --save-baseline          store the results as the new baseline
+    python benchmark.py --scale-sizes 1000000 10000000
+                                                 also measure these population sizes at scale
+
+The scale benchmark measures what a large population costs as a whole rather than one hot
+path: the time to set it up, the best time of a day of the 'frontier' engine and the peak
+memory of the arrays of the model, traced by tracemalloc (which sees NumPy arrays) in a
+separate pass, as tracing slows the day down. It runs at SCALE_SIZES by default, or not at
+all with an empty --scale-sizes, and its per-day time is compared to the baseline like every
+other case.
+
+The command exits with status 1 when a regression is found.
+"""
+
+from __future__ import annotations
+from typing import Any, Callable
+import argparse
+import copy
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import matplotlib
+import numpy as np
+
+# Frames are drawn off-screen, so that rendering is measured without the window system
+matplotlib.use("Agg")
+
+# pylint: disable=wrong-import-position
+from population import PopulationState
+from contacts import ContactNetwork
+from randomness import RandomContext
+from simulation import Virus, Policy
+from layout import family_layout
+from renderer import GraphRenderer, CountsRenderer
+from visualization import generate_number_normally, initialize_family, initialize_infected, initialize_edges, \
+    update_day, ContactTargets, GRAPH_DRAWING_LIMIT, DENSITY_MAPPING
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_DENSITIES = (2, 5, 10)
+DEFAULT_REPEATS = 3
+# Population sizes of the scale benchmark, and the days it times at each of them
+SCALE_SIZES = (1_000_000,)
+SCALE_DENSITY = 5
+SCALE_DAYS = 3
+# A case regresses when it is more than this fraction slower than the baseline
+DEFAULT_THRESHOLD = 0.5
+# Slowdowns smaller than this many seconds are never reported, whatever their ratio: the
+# timings of sub-millisecond cases vary by more than the threshold from one run to the next
+MIN_REGRESSION = 0.002
+# Fast cases are repeated until they have run for at least this many seconds, up to MAX_REPEATS times
+MIN_CASE_TIME = 0.2
+MAX_REPEATS = 100
+# The python transmission engine walks every edge in python, so it is only timed up to this size
+PYTHON_ENGINE_LIMIT = 10_000
+# Number of days simulated before the day-step benchmarks, so that they run mid-epidemic
+WARMUP_DAYS = 5
+HOUSE_DENSITY = DENSITY_MAPPING["medium"]
+VIRUS = {"infection_rate": 0.3, "incubation_period": 5, "death_rate": 0.02, "recovery_days": 7}
+
+# Called before every timed call, without being timed, to return the function to time
+Prepare = Callable[[], Callable[[], Any]]
+
+
+class Case:
+    """
+    The setup of one benchmark case: a population with its households, contacts and an epidemic under way.
+
+    Attributes:
+        size (int): The number of people.
+        contact_density (int): The average number of daily contacts.
+        rng (RandomContext): The random streams of the case, seeded so every run measures the same work.
+        state (PopulationState): The population state.
+        network (ContactNetwork): The household and contact layers.
+        targets (ContactTargets): The daily contact counts.
+    """
+
+    size: int
+    contact_density: int
+    rng: RandomContext
+    state: PopulationState
+    network: ContactNetwork
+    targets: ContactTargets
+
+    def __init__(self, size: int, contact_density: int, warmup_days: int = 0) -> None:
+        self.size = size
+        self.contact_density = contact_density
+        self.rng = RandomContext(size * 100 + contact_density)
+        self.state = PopulationState(size)
+        self.network = initialize_family(size, HOUSE_DENSITY, self.state, self.rng)
+        initialize_infected(self.state, max(1, size // 100), self.rng)
+        self.targets = ContactTargets(self.rng.generator)
+        initialize_edges(self.network, self.state, contact_density, 0.0, self.rng, self.targets)
+        for _ in range(warmup_days):
+            self.step('frontier')
+
+    def step(self, engine: str) -> None:
+        """
+        Advance the case by one day with the given transmission engine.
+        """
+        update_day(self.network, self.state, VIRUS["infection_rate"], VIRUS["death_rate"],
+                   VIRUS["recovery_days"], self.contact_density, 0.0, VIRUS["incubation_period"],
+                   engine, self.rng, self.targets)
+
+
+def _fresh_copies(subject: Any, call: Callable[[Any], Any]) -> Callable[[], Callable[[], Any]]:
+    """
+    Return a prepare function for a benchmark which changes subject: every call to time runs
+    call on a new deep copy of subject, so every repeat measures the same day.
+    """
+    def prepare() -> Callable[[], Any]:
+        fresh = copy.deepcopy(subject)
+        return lambda: call(fresh)
+    return prepare
+
+
+def bench_initialize_family(size: int, _density: int) -> Prepare:
+    """
+    Building the households of a population.
+    """
+    rng = RandomContext(size)
+    return lambda: lambda: initialize_family(size, HOUSE_DENSITY, PopulationState(size), rng)
+
+
+def bench_initialize_edges(size: int, density: int) -> Prepare:
+    """
+    Drawing a day of random contacts.
+    """
+    case = Case(size, density)
+    return _fresh_copies(case, lambda fresh: initialize_edges(fresh.network, fresh.state, density, 0.0,
+                                                              fresh.rng, fresh.targets))
+
+
+def bench_update_day(engine: str) -> Callable[[int, int], Prepare | None]:
+    """
+    A whole day of the visualization model with the given transmission engine.
+    """
+    def setup(size: int, density: int) -> Prepare | None:
+        if engine == 'python' and size > PYTHON_ENGINE_LIMIT:
+            return None
+        return _fresh_copies(Case(size, density, WARMUP_DAYS), lambda fresh: fresh.step(engine))
+    return setup
+
+
+def bench_generate_number_normally(size: int, _density: int) -> Prepare:
+    """
+    Drawing one normal number per person.
+    """
+    rng = np.random.default_rng(size)
+    return lambda: lambda: generate_number_normally(1.0, 1.0, size, rng)
+
+
+def bench_spread_virus(size: int, density: int) -> Prepare:
+    """
+    A day of transmission of main.Simulation.
+    """
+    # main imports pygame, which only this benchmark needs
+    from main import Simulation
+    virus = Virus(VIRUS["incubation_period"], VIRUS["infection_rate"], VIRUS["death_rate"], VIRUS["recovery_days"])
+    simulation = Simulation(size, max(1, size // 100), virus, Policy(0.0), RandomContext(size),
+                            HOUSE_DENSITY, density)
+    simulation.run(WARMUP_DAYS)
+    return _fresh_copies(simulation, lambda fresh: fresh.spread_virus())
+
+
+def bench_layout(size: int, _density: int) -> Prepare:
+    """
+    Placing the nodes of the graph.
+    """
+    state = PopulationState(size)
+    rng = RandomContext(size)
+    initialize_family(size, HOUSE_DENSITY, state, rng)
+    return lambda: lambda: family_layout(state.family, rng.generator)
+
+
+def bench_render_frame(size: int, density: int) -> Prepare:
+    """
+    Drawing one day, as the graph up to GRAPH_DRAWING_LIMIT people and as the status curves above.
+    The graph is drawn over the state of the day before, so that the changed nodes are recolored.
+    """
+    case = Case(size, density, WARMUP_DAYS)
+    if size > GRAPH_DRAWING_LIMIT:
+        renderer = CountsRenderer(100, size)
+        return lambda: lambda: renderer.draw_day(WARMUP_DAYS, case.state.counts())
+    positions = family_layout(case.state.family, case.rng.generator)
+    before = case.state.status.copy()
+    case.step('frontier')
+    renderer = GraphRenderer(positions, case.network.household_edges, before)
+    contacts = case.network.contacts.copy()
+
+    def prepare() -> Callable[[], Any]:
+        renderer.status[:] = before
+        return lambda: renderer.draw_day(WARMUP_DAYS + 1, case.state.status, contacts)
+    return prepare
+
+
+# Every benchmark takes a population size and a contact density and returns its prepare
+# function, or None when the benchmark does not apply to that size. The second value tells
+# whether the benchmark depends on the contact density at all.
+BENCHMARKS: dict[str, tuple[Callable[[int, int], Prepare | None], bool]] = {
+    "initialize_family": (bench_initialize_family, False),
+    "initialize_edges": (bench_initialize_edges, True),
+    "update_day.python": (bench_update_day('python'), True),
+    "update_day.vectorized": (bench_update_day('vectorized'), True),
+    "update_day.frontier": (bench_update_day('frontier'), True),
+    "generate_number_normally": (bench_generate_number_normally, False),
+    "Simulation.spread_virus": (bench_spread_virus, True),
+    "layout": (bench_layout, False),
+    "render_frame": (bench_render_frame, True),
+}
+
+
+def measure_scale(size: int, density: int = SCALE_DENSITY, days: int = SCALE_DAYS) -> dict[str, Any]:
+    """
+    Return the setup time, the best and mean time of days of the 'frontier' engine and the
+    peak traced memory in bytes of a population of size people, see the top of this file.
+    """
+    start = time.perf_counter()
+    case = Case(size, density)
+    setup = time.perf_counter() - start
+    times = []
+    for _ in range(days):
+        start = time.perf_counter()
+        case.step('frontier')
+        times.append(time.perf_counter() - start)
+    del case
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    try:
+        Case(size, density, 1)
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        if started:
+            tracemalloc.stop()
+    return {"benchmark": "scale", "size": size, "density": density, "setup": setup,
+            "best": min(times), "mean": sum(times) / len(times), "repeats": len(times), "peak_memory": peak}
+
+
+def run_scale(sizes: tuple[int, ...] = SCALE_SIZES, density: int = SCALE_DENSITY,
+              days: int = SCALE_DAYS) -> dict[str, dict[str, Any]]:
+    """
+    Run the scale benchmark at every size of sizes and return its results, keyed by case_key.
+    """
+    return {case_key("scale", size, density): measure_scale(size, density, days) for size in sizes}
+
+
+def case_key(name: str, size: int, density: int | None) -> str:
+    """
+    Return the key of a benchmark case in the results.
+    """
+    return f"{name}[size={size}]" if density is None else f"{name}[size={size},density={density}]"
+
+
+def time_function(prepare: Prepare, repeats: int) -> list[float]:
+    """
+    Return the wall times, in seconds, of calls to the functions returned by prepare: at least
+    repeats calls, and more until MIN_CASE_TIME has passed or MAX_REPEATS calls were made.
+    prepare itself is not timed.
+    """
+    times = []
+    while len(times) < repeats or (sum(times) < MIN_CASE_TIME and len(times) < MAX_REPEATS):
+        function = prepare()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def calibrate(repeats: int = 5) -> float:
+    """
+    Return the best time of a fixed workload of sorting, gathering and arithmetic on arrays,
+    which measures how fast the machine currently runs NumPy code.
+    """
+    rng = np.random.default_rng(0)
+    keys = rng.integers(0, 1 << 40, 1 << 20)
+    indices = rng.integers(0, len(keys), 1 << 20)
+
+    def workload() -> None:
+        np.sort(keys)
+        np.searchsorted(np.sort(keys[:1 << 16]), keys)
+        (keys[indices] * 3 + 1).sum()
+    return min(time_function(lambda: workload, repeats))
+
+
+def run_benchmarks(sizes: tuple[int, ...] = DEFAULT_SIZES, densities: tuple[int, ...] = DEFAULT_DENSITIES,
+                   names: list[str] | None = None, repeats: int = DEFAULT_REPEATS) -> dict[str, dict[str, Any]]:
+    """
+    Run the benchmarks of the given names (all of them if None) over sizes and densities and
+    return the timings of every case, keyed by case_key.
+    """
+    results = {}
+    for name in BENCHMARKS if names is None else names:
+        setup, uses_density = BENCHMARKS[name]
+        for size in sizes:
+            for density in densities if uses_density else (None,):
+                prepare = setup(size, 5 if density is None else density)
+                if prepare is None:
+                    continue
+                times = time_function(prepare, repeats)
+                results[case_key(name, size, density)] = {
+                    "benchmark": name, "size": size, "density": density,
+                    "best": min(times), "mean": sum(times) / len(times), "repeats": len(times),
+                }
+    return results
+
+
+def environment() -> dict[str, str]:
+    """
+    Return a description of the machine and library versions the benchmarks ran on.
+    """
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "processor": platform.processor(),
+    }
+
+
+def save_results(results: dict[str, dict[str, Any]], calibration: float, path: str) -> None:
+    """
+    Write results, with the environment and calibration they were measured with, to the JSON file at path.
+    """
+    with open(path, "w") as file:
+        json.dump({"environment": environment(), "calibration": calibration, "results": results},
+                  file, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> tuple[dict[str, dict[str, Any]], float | None]:
+    """
+    Read the results and calibration of a JSON file written by save_results.
+    """
+    with open(path) as file:
+        data = json.load(file)
+    return data["results"], data.get("calibration")
+
+
+def compare(results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]],
+            threshold: float = DEFAULT_THRESHOLD, speed: float = 1.0) -> list[tuple[str, float, float, float]]:
+    """
+    Return the cases of results which are slower than in baseline by more than threshold
+    and by more than MIN_REGRESSION seconds, as (case key, baseline seconds, current seconds,
+    ratio), worst first.
+
+    The baseline times are multiplied by speed, the ratio of the current calibration to the
+    calibration of the baseline. Cases missing from either side are not compared.
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        before, after = baseline[key]["best"] * speed, result["best"]
+        ratio = after / before if before > 0 else float("inf")
+        if ratio > 1 + threshold and after - before > MIN_REGRESSION:
+            regressions.append((key, before, after, ratio))
+    return sorted(regressions, key=lambda regression: -regression[3])
+
+
+def report(results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]] | None,
+           speed: float = 1.0) -> None:
+    """
+    Print one line per case with its best time and, if a baseline is given, the ratio to it
+    (with the baseline times multiplied by speed, see compare).
+    """
+    for key, result in results.items():
+        line = f"{key:<60} {result['best'] * 1000:10.2f} ms"
+        if "peak_memory" in result:
+            line += f"  (setup {result['setup']:.2f} s, peak {result['peak_memory'] / 2 ** 20:.0f} MB)"
+        if baseline is not None and key in baseline and baseline[key]["best"] > 0:
+            line += f"  x{result['best'] / (baseline[key]['best'] * speed):.2f}"
+        print(line)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Run the benchmarks from the command line, see the top of this file. Return the exit status.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of the simulation.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--densities", type=int, nargs="+", default=list(DEFAULT_DENSITIES))
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=None)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--scale-sizes", type=int, nargs="*", default=list(SCALE_SIZES))
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    calibration = calibrate()
+    results = run_benchmarks(tuple(args.sizes), tuple(args.densities), args.benchmarks, args.repeats)
+    results.update(run_scale(tuple(args.scale_sizes)))
+    calibration = min(calibration, calibrate())
+    save_results(results, calibration, args.baseline if args.save_baseline else args.output)
+    if args.save_baseline or not os.path.exists(args.baseline):
+        report(results, None)
+        return 0
+
+    baseline, baseline_calibration = load_results(args.baseline)
+    speed = calibration / baseline_calibration if baseline_calibration else 1.0
+    print(f"calibration: {calibration * 1000:.2f} ms, x{speed:.2f} the baseline machine")
+    report(results, baseline, speed)
+    regressions = compare(results, baseline, args.threshold, speed)
+    for key, before, after, ratio in regressions:
+        print(f"REGRESSION {key}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms (x{ratio:.2f})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+
+    check_python_ta = False
+    if check_python_ta:
+        import python_ta
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["argparse", "copy", "json", "os", "platform", "sys", "time", "tracemalloc", "typing",
+                              "matplotlib", "numpy", "population", "contacts", "randomness", "simulation",
+                              "layout", "renderer", "visualization", "main"],  # the names (strs) of imported modules
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': ["save_results", "load_results", "report", "main"],
+            # 'disabled': ["E9999"]
+        })
+
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+The purpose of this document is to let a long run survive a crash or a closed window by
+saving its state every few days and resuming from the last save instead of from day 1.
+
+A checkpoint is a folder of .npy files, one per array of the run (status, day counters,
+families, the household graph, the contacts of the day, the buffered contact counts),
+plus a meta.json holding the day, the parameters and the position of the random streams
+(see RandomContext.get_state in randomness.py). Checkpoints of one run are kept side by
+side in one directory:
+
+    <directory>/day_000040/meta.json, status.npy, ...
+    <directory>/day_000050/...
+    <directory>/latest.json         the name of the newest complete checkpoint
+
+A checkpoint is written to a temporary folder which is renamed once complete, and
+latest.json is replaced atomically after that, so a crash while saving leaves the previous
+checkpoint as the latest one. Only the checkpoint just written and the newest keep - 1
+checkpoints of earlier days are kept; a new run (one that did not resume) also deletes the
+checkpoints of later days, left behind by an older run in the same directory, since they
+would otherwise be taken for its own.
+
+Arrays are loaded as copy-on-write memory maps: nothing is read from disk until it is used,
+and writing to an array changes the memory of the run, never the file. Resuming a run of
+millions of people therefore takes milliseconds, the pages being read in as the first days
+touch them.
+
+What the arrays and parameters of a checkpoint are is up to each model, see save_run and
+resume_run in visualization.py and Simulation.save_checkpoint and resume_simulation in
+main.py. The helpers at the bottom of this file convert the parts they share.
+"""
+
+from __future__ import annotations
+from typing import Any
+import json
+import os
+import shutil
+import numpy as np
+from population import PopulationState
+from contacts import Adjacency
+
+# Name of the file pointing at the newest checkpoint of a directory
+LATEST_FILE = "latest.json"
+# Name of the file holding the day, parameters and random state of a checkpoint
+META_FILE = "meta.json"
+# Number of checkpoints kept in a directory, older ones are deleted
+CHECKPOINT_KEEP = 2
+
+
+class Checkpoint:
+    """
+    A saved state of a run, as read from disk.
+
+    Attributes:
+        path (str): The folder of the checkpoint.
+        day (int): The number of days simulated when the checkpoint was written.
+        meta (dict[str, Any]): The JSON data of the checkpoint: parameters, random state, ...
+        arrays (dict[str, np.ndarray]): The arrays of the checkpoint, as copy-on-write memory maps.
+    """
+
+    path: str
+    day: int
+    meta: dict[str, Any]
+    arrays: dict[str, np.ndarray]
+
+    def __init__(self, path: str, day: int, meta: dict[str, Any], arrays: dict[str, np.ndarray]) -> None:
+        self.path = path
+        self.day = day
+        self.meta = meta
+        self.arrays = arrays
+
+
+def checkpoint_due(day: int, every: int) -> bool:
+    """
+    Return whether a run checkpointing every given number of days saves at the end of day.
+    An every of 0 never saves.
+    """
+    return every > 0 and day % every == 0
+
+
+def _write_json(path: str, data: dict[str, Any]) -> None:
+    """
+    Write data to path, replacing the file atomically.
+    """
+    temporary = path + ".tmp"
+    with open(temporary, "w") as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+
+def write_checkpoint(directory: str, day: int, arrays: dict[str, np.ndarray], meta: dict[str, Any],
+                     keep: int = CHECKPOINT_KEEP, fresh: bool = False) -> str:
+    """
+    Save arrays and meta as the checkpoint of day in directory, make it the latest one and
+    delete all but the newest keep - 1 checkpoints of earlier days. fresh tells that the run
+    did not resume from a checkpoint, in which case the checkpoints of later days are deleted
+    too. Return the folder of the checkpoint.
+    """
+    name = f"day_{day:06d}"
+    path = os.path.join(directory, name)
+    temporary = path + ".tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    for key, array in arrays.items():
+        np.save(os.path.join(temporary, key + ".npy"), np.ascontiguousarray(array))
+    _write_json(os.path.join(temporary, META_FILE), {**meta, "day": day, "arrays": list(arrays)})
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temporary, path)
+    _write_json(os.path.join(directory, LATEST_FILE), {"name": name, "day": day})
+
+    # A checkpoint still mapped by a resumed run cannot be deleted on every system, it is
+    # then left for a later call
+    saved = sorted((int(entry[len("day_"):]), entry) for entry in os.listdir(directory)
+                   if entry.startswith("day_") and entry[len("day_"):].isdigit())
+    earlier = [entry for saved_day, entry in saved if saved_day < day]
+    stale = earlier[:max(len(earlier) - keep + 1, 0)] if keep > 0 else []
+    if fresh:
+        stale += [entry for saved_day, entry in saved if saved_day > day]
+    for old in stale:
+        shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+    return path
+
+
+def read_checkpoint(path: str) -> Checkpoint:
+    """
+    Read the checkpoint in the folder path, mapping its arrays into memory.
+    """
+    with open(os.path.join(path, META_FILE)) as file:
+        meta = json.load(file)
+    arrays = {key: np.load(os.path.join(path, key + ".npy"), mmap_mode="c") for key in meta["arrays"]}
+    return Checkpoint(path, meta["day"], meta, arrays)
+
+
+def load_checkpoint(directory: str) -> Checkpoint | None:
+    """
+    Read the latest checkpoint of directory, or return None if it holds none.
+    """
+    try:
+        with open(os.path.join(directory, LATEST_FILE)) as file:
+            latest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return read_checkpoint(os.path.join(directory, latest["name"]))
+
+
+def state_arrays(state: PopulationState) -> dict[str, np.ndarray]:
+    """
+    Return the arrays to save for state.
+    """
+    return {"status": state.status, "days_infected": state.days_infected, "family": state.family}
+
+
+def restore_state(checkpoint: Checkpoint) -> PopulationState:
+    """
+    Return the population state saved in checkpoint by state_arrays.
+    """
+    state = PopulationState(0)
+    state.status = checkpoint.arrays["status"]
+    state.days_infected = checkpoint.arrays["days_infected"]
+    state.family = checkpoint.arrays["family"]
+    state.refresh_active()
+    return state
+
+
+def adjacency_arrays(adjacency: Adjacency, prefix: str) -> dict[str, np.ndarray]:
+    """
+    Return the arrays to save for adjacency, with names starting with prefix.
+    """
+    return {prefix + "_indptr": adjacency.indptr, prefix + "_indices": adjacency.indices}
+
+
+def restore_adjacency(checkpoint: Checkpoint, prefix: str) -> Adjacency:
+    """
+    Return the adjacency saved in checkpoint by adjacency_arrays with prefix, without rebuilding it.
+    """
+    adjacency = Adjacency(np.empty((0, 2), dtype=np.int64), 0)
+    adjacency.indptr = checkpoint.arrays[prefix + "_indptr"]
+    adjacency.indices = checkpoint.arrays[prefix + "_indices"]
+    return adjacency
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["json", "os", "shutil", "typing", "numpy", "population", "contacts"],
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': ["_write_json", "read_checkpoint", "load_checkpoint"],
+            # 'disabled': ["E9999"]
+        })
@@ -0,0 +1,353 @@
+"""
+The purpose of this document is to rewire the random daily contacts of the simulation
+without scanning the whole population for every person.
+
+The original approach built, for every living person, the list of every other living
+person they were not yet connected to and sampled from it, which costs O(N^2) per day.
+Instead, partners are drawn uniformly from an index of living people and rejected when
+they are the person themself or are already connected to them (rejection sampling).
+Because a typical person only has a handful of contacts in a large population, almost
+every draw is accepted and a day costs O(N + E).
+
+People are processed in a fixed number of blocks. Each person only asks for as many new
+contacts as they are missing to reach their target (degree-aware sampling), and the
+contacts received from earlier blocks count towards that target, which reproduces the
+distribution of contacts per person of the original sequential loop.
+
+The contacts are kept in a ContactNetwork of two layers: the household edges, built once,
+and the random contacts of the day, rewritten in place every day, instead of adding and
+removing edges of a networkx graph.
+"""
+
+from __future__ import annotations
+import math
+import numpy as np
+
+# Number of blocks a day is split into; contacts received in earlier blocks lower the
+# number of contacts a person still asks for in later blocks
+BLOCKS_PER_DAY = 64
+# Upper bound on the number of redraws for a contact that keeps being rejected
+MAX_REJECTION_ROUNDS = 32
+# Color given to daily random contacts in the visualization
+CONTACT_EDGE_COLOR = (0, 0, 0, 0.3)
+
+
+def edge_keys(u: np.ndarray, v: np.ndarray, size: int) -> np.ndarray:
+    """
+    Encode undirected edges as single integers so that (u, v) and (v, u) share a key.
+    """
+    u = np.asarray(u, dtype=np.int64)
+    v = np.asarray(v, dtype=np.int64)
+    return np.minimum(u, v) * size + np.maximum(u, v)
+
+
+def _contains(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """
+    Return a boolean mask telling which of keys appear in the sorted array sorted_keys.
+
+    keys must be sorted as well: searching for them in increasing order keeps the binary
+    searches in cache, which is several times faster than random order once sorted_keys is large.
+    """
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    positions = np.searchsorted(sorted_keys, keys)
+    positions[positions == len(sorted_keys)] = 0
+    return sorted_keys[positions] == keys
+
+
+def _merge_keys(sorted_keys: np.ndarray, new_keys: np.ndarray) -> np.ndarray:
+    """
+    Merge new keys into an already sorted key array.
+
+    The stable sort detects the two sorted runs, so this is a linear merge.
+    """
+    return np.sort(np.concatenate([sorted_keys, np.sort(new_keys)]), kind='stable')
+
+
+def _add_run(runs: list[np.ndarray], new_keys: np.ndarray) -> None:
+    """
+    Add new keys to runs, a list of sorted key arrays of decreasing length.
+
+    A run is merged into the one before it once they have similar lengths, so there are only
+    O(log n) runs and every key is merged O(log n) times, instead of merging every new block
+    of keys into one ever growing array.
+    """
+    runs.append(np.sort(new_keys))
+    while len(runs) > 1 and len(runs[-2]) <= 2 * len(runs[-1]):
+        last = runs.pop()
+        runs[-1] = _merge_keys(runs[-1], last)
+
+
+def _contains_any(runs: list[np.ndarray], keys: np.ndarray) -> np.ndarray:
+    """
+    Return a boolean mask telling which of the sorted keys appear in any of the sorted arrays of runs.
+    """
+    found = np.zeros(len(keys), dtype=bool)
+    for run in runs:
+        found |= _contains(run, keys)
+    return found
+
+
+def _draw_partners(rows: np.ndarray, alive: np.ndarray, blocked: np.ndarray,
+                   added: list[np.ndarray], size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw one partner for every entry of rows by rejection sampling against the alive index.
+
+    A candidate is rejected if it is the person themself, if the pair is already connected
+    (blocked, or in one of the sorted key runs of added) or if the pair was already drawn for
+    this block. Entries which are
+    still rejected after MAX_REJECTION_ROUNDS redraws get the partner -1.
+    """
+    partners = np.full(len(rows), -1, dtype=np.int64)
+    pending = np.arange(len(rows))
+    taken = np.empty(0, dtype=np.int64)
+
+    for _ in range(MAX_REJECTION_ROUNDS):
+        if len(pending) == 0:
+            break
+        candidates = alive[rng.integers(0, len(alive), size=len(pending))]
+        people = rows[pending]
+        keys = edge_keys(people, candidates, size)
+        order = np.argsort(keys)
+        ordered = keys[order]
+        connected = np.empty(len(keys), dtype=bool)
+        connected[order] = _contains(blocked, ordered) | _contains_any(added, ordered) | _contains(taken, ordered)
+        accepted = np.flatnonzero((candidates != people) & ~connected)
+
+        # The same pair may be drawn twice in one round, only keep its first draw
+        _, first = np.unique(keys[accepted], return_index=True)
+        accepted = accepted[first]
+
+        partners[pending[accepted]] = candidates[accepted]
+        taken = _merge_keys(taken, keys[accepted])
+        still_pending = np.ones(len(pending), dtype=bool)
+        still_pending[accepted] = False
+        pending = pending[still_pending]
+
+    return partners
+
+
+def sample_contacts(alive: np.ndarray, degree: np.ndarray, targets: np.ndarray,
+                    blocked: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Sample the new random contacts of a day and return them as an (E, 2) array of node ids,
+    drawing the partners from rng.
+
+    Preconditions:
+    - alive holds the ids of the people who can make contacts, each id smaller than size
+    - degree is indexed by node id and holds each person's current number of contacts;
+      it is updated in place with the new contacts
+    - targets[i] is the number of contacts alive[i] wants to have today
+    - blocked is a sorted array of edge_keys of the pairs that are already connected
+    """
+    alive = np.asarray(alive, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    n_alive = len(alive)
+    if n_alive < 2:
+        return np.empty((0, 2), dtype=np.int64)
+
+    block_size = max(1, math.ceil(n_alive / BLOCKS_PER_DAY))
+    added = []
+    chunks = []
+
+    for start in range(0, n_alive, block_size):
+        nodes = alive[start:start + block_size]
+        wanted = np.minimum(targets[start:start + block_size] - degree[nodes],
+                            n_alive - 1 - degree[nodes])
+        rows = np.repeat(nodes, np.maximum(wanted, 0))
+        if len(rows) == 0:
+            continue
+
+        partners = _draw_partners(rows, alive, blocked, added, size, rng)
+        found = partners >= 0
+        rows, partners = rows[found], partners[found]
+
+        np.add.at(degree, rows, 1)
+        np.add.at(degree, partners, 1)
+        _add_run(added, edge_keys(rows, partners, size))
+        chunks.append(np.column_stack([rows, partners]))
+
+    if not chunks:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.concatenate(chunks)
+
+
+def build_households(num_nodes: int, family_sizes: np.ndarray, house_density: int,
+                     rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Split the people 0 to num_nodes - 1 into households and return the family id of every
+    person (-1 for no family) together with the (E, 2) array of household edges.
+
+    The node ids are permuted once with rng and the permutation is cut into consecutive households
+    of the sizes given by family_sizes, until fewer than house_density people are left;
+    those people get no family. Every household is a clique, whose edges (u, v) have u < v.
+
+    Preconditions:
+    - family_sizes holds positive sizes and sums to at least num_nodes
+    """
+    order = rng.permutation(num_nodes)
+    family_sizes = np.asarray(family_sizes, dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(family_sizes)[:-1]])
+    kept = starts < num_nodes - house_density
+    family_sizes = np.minimum(family_sizes[kept], num_nodes - starts[kept])
+    starts = starts[kept]
+
+    family = np.full(num_nodes, -1, dtype=np.int32)
+    family[order[:family_sizes.sum()]] = np.repeat(np.arange(len(family_sizes), dtype=np.int32), family_sizes)
+
+    # Households of the same size are turned into cliques together
+    chunks = [np.empty((0, 2), dtype=np.int64)]
+    for size in np.unique(family_sizes):
+        if size < 2:
+            continue
+        members = order[starts[family_sizes == size][:, None] + np.arange(size)]
+        first, second = np.triu_indices(size, 1)
+        u, v = members[:, first].ravel(), members[:, second].ravel()
+        chunks.append(np.column_stack([np.minimum(u, v), np.maximum(u, v)]))
+    return family, np.concatenate(chunks)
+
+
+class Adjacency:
+    """
+    A compressed sparse row (CSR) adjacency structure over the node ids 0 to size - 1.
+
+    The neighbors of node u are indices[indptr[u]:indptr[u + 1]]. Every undirected edge is
+    stored in both directions.
+
+    Attributes:
+        indptr (np.ndarray): The offset of the neighbors of every node in indices, of length size + 1.
+        indices (np.ndarray): The neighbors of every node, one node after the other.
+    """
+
+    indptr: np.ndarray
+    indices: np.ndarray
+
+    def __init__(self, edges: np.ndarray, size: int) -> None:
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        sources = np.concatenate([edges[:, 0], edges[:, 1]])
+        targets = np.concatenate([edges[:, 1], edges[:, 0]])
+        order = np.argsort(sources, kind='stable')
+        self.indices = targets[order].astype(np.int32)
+        self.indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=size), out=self.indptr[1:])
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Return the number of bytes used by the adjacency arrays.
+        """
+        return self.indptr.nbytes + self.indices.nbytes
+
+    def degree(self) -> np.ndarray:
+        """
+        Return the number of neighbors of every node.
+        """
+        return np.diff(self.indptr)
+
+    def expand(self, nodes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the arrays (sources, neighbors) listing every neighbor of every node of nodes,
+        where sources[i] is the node of nodes whose neighbor is neighbors[i].
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        starts = self.indptr[nodes]
+        counts = self.indptr[nodes + 1] - starts
+        sources = np.repeat(nodes, counts)
+        # Position of every neighbor within its node's row, added to the start of that row
+        offsets = np.arange(len(sources)) - np.repeat(np.cumsum(counts) - counts, counts)
+        return sources, self.indices[np.repeat(starts, counts) + offsets]
+
+
+class ContactNetwork:
+    """
+    The contacts of the visualization model, as two layers of edge arrays instead of a networkx graph.
+
+    The household layer is built once and never changes. The contact layer holds the random
+    contacts of the current day in a buffer which is overwritten in place by rewire every day,
+    so that no per-edge object is created or destroyed from one day to the next.
+
+    Attributes:
+        size (int): The number of people, whose ids are 0 to size - 1.
+        household_edges (np.ndarray): The (E, 2) household edges.
+        households (Adjacency): The CSR index of the household edges.
+        household_keys (np.ndarray): The sorted edge_keys of the household edges.
+        contact_buffer (np.ndarray): The (capacity, 2) buffer whose first contact_count rows are today's contacts.
+        contact_count (int): The number of random contacts of the current day.
+    """
+
+    size: int
+    household_edges: np.ndarray
+    households: Adjacency
+    household_keys: np.ndarray
+    contact_buffer: np.ndarray
+    contact_count: int
+
+    def __init__(self, household_edges: np.ndarray, size: int, households: Adjacency | None = None,
+                 household_keys: np.ndarray | None = None) -> None:
+        # households and household_keys may be given when they were already computed, e.g. by
+        # a checkpoint (see checkpoint.py), to skip building them
+        self.size = size
+        self.household_edges = np.asarray(household_edges, dtype=np.int64).reshape(-1, 2)
+        if households is None:
+            households = Adjacency(self.household_edges, size)
+        if household_keys is None:
+            household_keys = np.sort(edge_keys(self.household_edges[:, 0], self.household_edges[:, 1], size))
+        self.households = households
+        self.household_keys = household_keys
+        self.contact_buffer = np.empty((0, 2), dtype=np.int64)
+        self.contact_count = 0
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Return the number of bytes used by both layers.
+        """
+        return (self.household_edges.nbytes + self.households.nbytes + self.household_keys.nbytes
+                + self.contact_buffer.nbytes)
+
+    @property
+    def contacts(self) -> np.ndarray:
+        """
+        Return today's (E, 2) random contacts, as a view on the contact buffer which the next
+        call to rewire overwrites.
+        """
+        return self.contact_buffer[:self.contact_count]
+
+    def layers(self) -> list[np.ndarray]:
+        """
+        Return the edge arrays of both layers.
+        """
+        return [self.household_edges, self.contacts]
+
+    def rewire(self, alive: np.ndarray, contact_targets: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        Replace the contact layer with today's random contacts and return it (see contacts).
+
+        alive holds the ids of the people who are not dead; dead people neither make nor receive
+        contacts. contact_targets is indexed by node id and gives how many contacts each person
+        wants to have today, counting their household.
+        """
+        degree = self.households.degree()
+        new_edges = sample_contacts(alive, degree, contact_targets[alive], self.household_keys, self.size, rng)
+        if len(new_edges) > len(self.contact_buffer):
+            self.contact_buffer = np.empty((max(len(new_edges), 2 * len(self.contact_buffer)), 2), dtype=np.int64)
+        self.contact_buffer[:len(new_edges)] = new_edges
+        self.contact_count = len(new_edges)
+        return self.contacts
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy", "math"],  # the names (strs) of imported modules
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            # 'disabled': ["E9999"]
+        })
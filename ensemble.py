@@ -0,0 +1,148 @@
+"""
+The purpose of this document is to run many replicates of the visualization model in
+parallel and summarize them.
+
+A single run of the model is one stochastic sample, so decisions should be based on
+many replicates. run_ensemble runs them in a pool of processes, one replicate per task,
+so the runtime shrinks close to linearly with the number of CPU cores. Every replicate
+gets its own RandomContext, spawned from one base seed (see randomness.py), so the
+replicates are independent and the whole ensemble is reproducible.
+
+iter_ensemble yields the running aggregate every time a replicate finishes, so callers
+can display partial results while the ensemble is still running.
+"""
+
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator
+import os
+import numpy as np
+from population import INFECTED, DEAD, RECOVERED
+from headless import simulate_history
+from randomness import RandomContext
+from visualization import numberType
+
+# The statuses summarized across replicates
+TRACKED_STATUSES = {"infected": INFECTED, "dead": DEAD, "recovered": RECOVERED}
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+
+
+class EnsembleAggregate:
+    """
+    Running summary of the replicates of an ensemble that have finished so far.
+
+    Attributes:
+        quantiles (tuple[float, ...]): The quantiles reported by bands.
+        histories (list[np.ndarray]): The history of every finished replicate, as returned by
+                                      headless.simulate_history, in order of completion.
+        total (int): The number of replicates in the ensemble.
+    """
+
+    quantiles: tuple[float, ...]
+    histories: list[np.ndarray]
+    total: int
+
+    def __init__(self, total: int, quantiles: tuple[float, ...] = DEFAULT_QUANTILES) -> None:
+        self.quantiles = quantiles
+        self.histories = []
+        self.total = total
+
+    @property
+    def completed(self) -> int:
+        """
+        Return the number of replicates which have finished.
+        """
+        return len(self.histories)
+
+    def add(self, history: np.ndarray) -> None:
+        """
+        Add the history of a finished replicate.
+        """
+        self.histories.append(history)
+
+    def _tracked(self) -> np.ndarray:
+        """
+        Return the tracked columns of every history as a (replicates, days, statuses) array.
+        """
+        return np.stack(self.histories)[:, :, list(TRACKED_STATUSES.values())]
+
+    def mean(self) -> dict[str, np.ndarray]:
+        """
+        Return the mean count per day of every tracked status.
+        """
+        means = self._tracked().mean(axis=0)
+        return {name: means[:, i] for i, name in enumerate(TRACKED_STATUSES)}
+
+    def bands(self) -> dict[str, dict[float, np.ndarray]]:
+        """
+        Return the quantiles of the count per day of every tracked status.
+        """
+        values = np.quantile(self._tracked(), self.quantiles, axis=0)
+        return {name: {q: values[j, :, i] for j, q in enumerate(self.quantiles)}
+                for i, name in enumerate(TRACKED_STATUSES)}
+
+    def summary(self) -> dict[str, object]:
+        """
+        Return the day index, means and quantile bands of the finished replicates.
+        """
+        return {
+            "completed": self.completed,
+            "total": self.total,
+            "day": np.arange(len(self.histories[0])),
+            "mean": self.mean(),
+            "bands": self.bands(),
+        }
+
+
+def iter_ensemble(data: dict[str, numberType], replicates: int, seed: int | None = None,
+                  workers: int | None = None,
+                  quantiles: tuple[float, ...] = DEFAULT_QUANTILES) -> Iterator[EnsembleAggregate]:
+    """
+    Run replicates of the simulation described by data and yield the aggregate after each
+    replicate finishes.
+
+    workers is the number of processes, by default one per CPU core. With a single worker
+    the replicates run in this process, which is convenient for profiling.
+    """
+    aggregate = EnsembleAggregate(replicates, quantiles)
+    contexts = RandomContext(seed).spawn(replicates)
+    workers = min(workers or os.cpu_count() or 1, replicates)
+
+    if workers <= 1:
+        for rng in contexts:
+            aggregate.add(simulate_history(data, rng))
+            yield aggregate
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(simulate_history, data, rng) for rng in contexts]
+        for future in as_completed(futures):
+            aggregate.add(future.result())
+            yield aggregate
+
+
+def run_ensemble(data: dict[str, numberType], replicates: int, seed: int | None = None,
+                 workers: int | None = None,
+                 quantiles: tuple[float, ...] = DEFAULT_QUANTILES) -> EnsembleAggregate:
+    """
+    Run replicates of the simulation described by data and return the final aggregate.
+    """
+    aggregate = EnsembleAggregate(replicates, quantiles)
+    for aggregate in iter_ensemble(data, replicates, seed, workers, quantiles):
+        pass
+    return aggregate
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy", "os", "typing", "concurrent.futures", "population",
+                              "headless", "randomness", "visualization"],
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            # 'disabled': ["E9999"]
+        })
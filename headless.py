@@ -0,0 +1,115 @@
+"""
+The purpose of this document is to run the visualization model without drawing it.
+
+generate_graph in visualization.py redraws the whole graph every day and pauses between
+days, so a 100 day run takes minutes even when only the numbers are needed. run_headless
+takes the same parameter dictionary (see VirusSimulationApp.fetch_parameters in main.py),
+runs the same day loop at CPU speed and returns the number of people in each status on
+every day, which makes parameter studies practical.
+"""
+
+from __future__ import annotations
+import numpy as np
+from population import STATUS_NAMES, history_to_series
+from randomness import RandomContext, as_context
+from profiling import Profiler, as_profiler
+from visualization import numberType, ContactTargets, parse_parameters, initialize_population, initialize_edges, \
+    run_day, save_run, resume_run, create_metrics, create_policy
+from checkpoint import checkpoint_due, load_checkpoint
+from trajectory import TrajectoryRecorder
+
+
+def simulate_history(data: dict[str, numberType], seed: int | RandomContext | None = None,
+                     profiler: Profiler | None = None) -> np.ndarray:
+    """
+    Run the simulation described by data without rendering and return its status counts.
+
+    The returned array has one row per day, where row 0 is the state before the first day,
+    and one column per status code of population.py.
+    seed is an integer seed or a RandomContext, by default the "seed" key of data. When it
+    is given, the run is reproducible. The phases of every day are timed by profiler, see
+    profiling.py.
+
+    The "checkpoint_every", "checkpoint_dir" and "resume" keys of data work as in
+    generate_graph, and either can resume the checkpoints of the other. A resumed run continues
+    with the random streams of its checkpoint, whatever seed is. The "record_path",
+    "record_contacts" and "metrics_path" keys, and the measures of the policy ("quarantine", ...,
+    see parse_parameters), also work as in generate_graph.
+    """
+    parameters = parse_parameters(data)
+    profiler = as_profiler(profiler)
+    checkpoint = load_checkpoint(parameters["checkpoint_dir"]) if parameters["resume"] else None
+
+    if checkpoint is None:
+        rng = as_context(parameters["seed"] if seed is None else seed)
+        network, state = initialize_population(parameters, rng)
+        targets = ContactTargets(rng.generator)
+        policy = create_policy(parameters)
+        initialize_edges(network, state, parameters["contact_density"], parameters["isolate_force"], rng, targets,
+                         policy)
+        first_day = 0
+    else:
+        parameters.update(checkpoint.meta["parameters"])
+        network, state, targets, rng = resume_run(checkpoint)
+        policy = create_policy(parameters, checkpoint)
+        first_day = checkpoint.day
+    total_days = parameters["total_days"]
+    metrics = create_metrics(parameters, state, first_day, checkpoint)
+
+    history = np.empty((max(total_days, first_day) + 1, len(STATUS_NAMES)), dtype=np.int64)
+    if checkpoint is None:
+        history[0] = state.counts()
+    else:
+        history[:first_day + 1] = metrics.history()
+
+    recorder = None
+    if parameters["record_path"] is not None:
+        recorder = TrajectoryRecorder(parameters["record_path"], len(state), network.household_edges, state.family,
+                                      None, parameters["record_contacts"], first_day, resume=checkpoint is not None)
+        if recorder.next_day == first_day:
+            recorder.record(state.status, network.contacts, history[first_day])
+
+    for day in range(first_day + 1, total_days + 1):
+        profiler.begin_day(day)
+        contacts = run_day(network, state, parameters, rng, targets, profiler, policy, day)
+        history[day] = state.counts()
+        metrics.end_day(day)
+        if recorder is not None:
+            with profiler.phase("record"):
+                recorder.record(state.status, contacts, history[day])
+        if checkpoint_due(day, parameters["checkpoint_every"]):
+            with profiler.phase("checkpoint"):
+                save_run(parameters["checkpoint_dir"], day, network, state, targets, rng, parameters, metrics,
+                         policy=policy, fresh=checkpoint is None)
+    profiler.stop_capture()
+    if recorder is not None:
+        recorder.close()
+    if parameters["metrics_path"] is not None:
+        metrics.save(parameters["metrics_path"])
+    return history[:total_days + 1]
+
+
+def run_headless(data: dict[str, numberType], seed: int | RandomContext | None = None) -> dict[str, np.ndarray]:
+    """
+    Run the simulation described by data without rendering and return its time series.
+
+    The returned dictionary maps 'day' and every name of population.STATUS_NAMES to an array
+    of length total_days + 1, where index 0 is the state before the first day.
+    seed is handled as in simulate_history.
+    """
+    return history_to_series(simulate_history(data, seed))
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy", "population", "randomness", "visualization", "profiling", "checkpoint",
+                              "trajectory"],
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            # 'disabled': ["E9999"]
+        })
@@ -0,0 +1,219 @@
+"""
+The purpose of this document is to describe the measures a Policy (see simulation.py) can
+take against an outbreak, and how they change the contacts of a day.
+
+A measure is an Intervention, which is in effect on the days between its start_day and its
+end_day while its trigger holds. The trigger compares the share of the living people who are
+detected, i.e. infected (incubated people are not detected yet), with a threshold: the
+measure starts once the share reaches threshold and is lifted once it falls below release,
+by default half the threshold, so that it does not switch on and off every other day. A
+threshold of 0 keeps the measure in effect for its whole window.
+
+    Lockdown              every person makes fewer random contacts, by the factor 1 - strength
+    Quarantine            detected people make and receive no random contacts
+    HouseholdIsolation    the households of detected people make and receive no random contacts
+
+Isolated people stay with their household, whose edges never change, so the virus can still
+spread at home. Every measure only adds to a PolicyEffect, which holds the isolation force of
+the day and the sorted ids of the isolated people: the day loops scale the contact density
+with the first and leave the second out of the contact layer, so a policy costs a few
+vectorized operations on the detected people per day, whatever the size of the population.
+
+get_config returns the arguments of a measure as a JSON-compatible dictionary, which
+intervention_from_config turns back into the measure, e.g. when a checkpoint is resumed.
+"""
+
+from __future__ import annotations
+from typing import Any
+import abc
+import numpy as np
+from population import PopulationState, INFECTED, DEAD
+from contacts import Adjacency
+
+
+class PolicyEffect:
+    """
+    What a policy changes about the random contacts of one day.
+
+    Attributes:
+        isolation_force (float): The share of their random contacts people give up today, see
+                                 visualization.ContactTargets.
+        isolated (np.ndarray): The sorted ids of the people who make and receive no random contacts today.
+    """
+
+    isolation_force: float
+    isolated: np.ndarray
+
+    def __init__(self, isolation_force: float, isolated: np.ndarray | None = None) -> None:
+        self.isolation_force = isolation_force
+        self.isolated = np.empty(0, dtype=np.int64) if isolated is None else isolated
+
+    def reduce_contacts(self, factor: float) -> None:
+        """
+        Multiply the number of random contacts of every person by factor.
+        """
+        self.isolation_force = 1 - (1 - self.isolation_force) * factor
+
+    def isolate(self, people: np.ndarray) -> None:
+        """
+        Add people to the isolated people of the day.
+        """
+        self.isolated = np.union1d(self.isolated, people)
+
+    def allowed(self, people: np.ndarray) -> np.ndarray:
+        """
+        Return a boolean mask telling which of people are not isolated today.
+        """
+        if len(self.isolated) == 0:
+            return np.ones(len(people), dtype=bool)
+        return ~np.isin(people, self.isolated)
+
+    def contactable(self, people: np.ndarray) -> np.ndarray:
+        """
+        Return the people of people who can make random contacts today.
+        """
+        return people if len(self.isolated) == 0 else people[self.allowed(people)]
+
+
+class Intervention(abc.ABC):
+    """
+    A measure of a policy, in effect from start_day to end_day while its trigger holds, see
+    the top of this file. Subclasses say what the measure does in apply.
+
+    Attributes:
+        start_day (int): The first day the measure can be in effect.
+        end_day (int | None): The last day the measure can be in effect, None for the whole run.
+        threshold (float): The share of the living people who must be detected for the measure to start.
+        release (float): The share of the living people below which the measure is lifted.
+        active (bool): Whether the measure was in effect on the last day it was checked.
+    """
+
+    kind: str = ""
+    start_day: int
+    end_day: int | None
+    threshold: float
+    release: float
+    active: bool
+
+    def __init__(self, start_day: int = 0, end_day: int | None = None, threshold: float = 0.0,
+                 release: float | None = None) -> None:
+        self.start_day = start_day
+        self.end_day = end_day
+        self.threshold = threshold
+        self.release = threshold / 2 if release is None else release
+        self.active = False
+
+    def in_effect(self, day: int, detected_share: float) -> bool:
+        """
+        Return whether the measure is in effect on day, when detected_share of the living
+        people are detected, and remember it for the next day.
+        """
+        if day < self.start_day or (self.end_day is not None and day > self.end_day):
+            self.active = False
+        elif self.active:
+            self.active = detected_share >= self.release
+        else:
+            self.active = detected_share >= self.threshold
+        return self.active
+
+    @abc.abstractmethod
+    def apply(self, effect: PolicyEffect, detected: np.ndarray, households: Adjacency) -> None:
+        """
+        Add what the measure does to effect, given the ids of the detected people and the
+        household connections.
+        """
+
+    def get_config(self) -> dict[str, Any]:
+        """
+        Return the kind and arguments of the measure, as a JSON-compatible dictionary.
+        """
+        return {"kind": self.kind, "start_day": self.start_day, "end_day": self.end_day,
+                "threshold": self.threshold, "release": self.release}
+
+
+class Lockdown(Intervention):
+    """
+    Every person makes fewer random contacts.
+
+    Attributes:
+        strength (float): The share of their random contacts people give up during the lockdown.
+    """
+
+    kind = "lockdown"
+    strength: float
+
+    def __init__(self, strength: float = 0.75, start_day: int = 0, end_day: int | None = None,
+                 threshold: float = 0.0, release: float | None = None) -> None:
+        super().__init__(start_day, end_day, threshold, release)
+        self.strength = strength
+
+    def apply(self, effect: PolicyEffect, detected: np.ndarray, households: Adjacency) -> None:
+        effect.reduce_contacts(1 - self.strength)
+
+    def get_config(self) -> dict[str, Any]:
+        return {**super().get_config(), "strength": self.strength}
+
+
+class Quarantine(Intervention):
+    """
+    Detected people make and receive no random contacts.
+    """
+
+    kind = "quarantine"
+
+    def apply(self, effect: PolicyEffect, detected: np.ndarray, households: Adjacency) -> None:
+        effect.isolate(detected)
+
+
+class HouseholdIsolation(Intervention):
+    """
+    Detected people and everyone in their household make and receive no random contacts.
+    """
+
+    kind = "household_isolation"
+
+    def apply(self, effect: PolicyEffect, detected: np.ndarray, households: Adjacency) -> None:
+        _, members = households.expand(detected)
+        effect.isolate(np.concatenate([detected, members]))
+
+
+# The measures by kind, for intervention_from_config
+INTERVENTIONS = {cls.kind: cls for cls in (Lockdown, Quarantine, HouseholdIsolation)}
+
+
+def intervention_from_config(config: dict[str, Any]) -> Intervention:
+    """
+    Return the measure described by config, as returned by get_config.
+    """
+    arguments = dict(config)
+    return INTERVENTIONS[arguments.pop("kind")](**arguments)
+
+
+def detected_people(state: PopulationState) -> np.ndarray:
+    """
+    Return the sorted ids of the detected (infected) people, from the active set of state.
+    """
+    active = state.active_nodes()
+    return active[state.status[active] == INFECTED]
+
+
+def detected_share(state: PopulationState, detected: np.ndarray) -> float:
+    """
+    Return the share of the living people of state who are among detected.
+    """
+    alive = len(state) - int(state.counts()[DEAD])
+    return len(detected) / alive if alive else 0.0
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy", "typing", "abc", "population", "contacts"],
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            # 'disabled': ["E9999"]
+        })
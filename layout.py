@@ -0,0 +1,109 @@
+"""
+The purpose of this document is to place the nodes of the visualization without running
+a force-directed layout.
+
+nx.spring_layout moves every node against every other node on each iteration, which is
+slow near the population cap. Since the only structure worth showing is the families,
+family_layout places every family as a tight cluster around a point of a hexagonal
+lattice, with a little jitter so members do not overlap, and people without a family
+on lattice points of their own. This is O(N).
+
+Layouts are cached on disk in LAYOUT_CACHE_DIR as .npy files, keyed by population size,
+house density and seed, plus a checksum of the family ids so that a cached layout is
+never reused for different families. Repeated runs with the same seeded population
+therefore start instantly; unseeded runs are never cached since they do not repeat.
+"""
+
+from __future__ import annotations
+import math
+import os
+import zlib
+import numpy as np
+from randomness import RandomContext
+
+LAYOUT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".layout_cache")
+# Size of the drawing, matching the scale previously given to spring_layout
+LAYOUT_SCALE = 5.0
+# Radius of a family cluster relative to the distance between lattice points
+CLUSTER_RADIUS = 0.3
+
+
+def hex_lattice(count: int) -> np.ndarray:
+    """
+    Return count points of a hexagonal lattice filling a square, scaled to [-1, 1].
+    """
+    columns = max(1, math.ceil(math.sqrt(count)))
+    index = np.arange(count)
+    row, column = np.divmod(index, columns)
+    x = column + 0.5 * (row % 2)
+    y = row * math.sqrt(3) / 2
+    points = np.column_stack([x, y]).astype(float)
+    if count > 1:
+        points -= points.mean(axis=0)
+        points /= max(np.abs(points).max(), 1e-9)
+    return points
+
+
+def family_layout(family: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Return an (N, 2) array of positions, one row per node id, that clusters families.
+
+    family holds the family id of every node, -1 for no family (see population.py).
+    """
+    family = np.asarray(family)
+    size = len(family)
+
+    # Every family, and every person without one, gets its own group and lattice point
+    groups = family.astype(np.int64).copy()
+    loners = groups < 0
+    groups[loners] = groups.max(initial=-1) + 1 + np.arange(np.count_nonzero(loners))
+    _, groups = np.unique(groups, return_inverse=True)
+
+    n_groups = int(groups.max(initial=-1)) + 1
+    centers = hex_lattice(n_groups)[rng.permutation(n_groups)]
+    spacing = 2.0 / max(1, math.ceil(math.sqrt(n_groups)))
+
+    angle = rng.uniform(0, 2 * math.pi, size)
+    radius = spacing * CLUSTER_RADIUS * np.sqrt(rng.uniform(0, 1, size))
+    jitter = np.column_stack([np.cos(angle), np.sin(angle)]) * radius[:, None]
+    return (centers[groups] + jitter) * LAYOUT_SCALE
+
+
+def cached_family_layout(family: np.ndarray, house_density: int, rng: RandomContext,
+                         cache_dir: str = LAYOUT_CACHE_DIR) -> np.ndarray:
+    """
+    Return family_layout(family, rng.generator), reading it from or writing it to the disk cache.
+
+    The cache is keyed by population size, house density, the seed of rng and a checksum of
+    family. rng should only be used for the layout, so that a cache hit does not change the
+    draws made afterwards.
+    """
+    if not rng.seeded:
+        return family_layout(family, rng.generator)
+
+    family = np.ascontiguousarray(family, dtype=np.int32)
+    checksum = zlib.crc32(family.tobytes())
+    path = os.path.join(cache_dir, f"layout_{len(family)}_{house_density}_{rng.key}_{checksum:08x}.npy")
+    if os.path.exists(path):
+        positions = np.load(path)
+        if positions.shape == (len(family), 2):
+            return positions
+
+    positions = family_layout(family, rng.generator)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(path, positions)
+    return positions
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy", "os", "math", "zlib", "randomness"],  # the names (strs) of imported modules
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            # 'disabled': ["E9999"]
+        })
@@ -5,15 +5,51 @@ Lowest population = 10
 
 """
 import sys
-import random
 from typing_extensions import Any
 import pygame
 import pygame_widgets
 from pygame_widgets.slider import Slider
 from pygame_widgets.button import Button
-import networkx as nx
-from simulation import Virus, Person, Policy
-from visualization import generate_graph
+import numpy as np
+from simulation import Virus, Policy, Person, Population, policy_from_state
+from visualization import generate_graph, generate_households, ContactTargets, DENSITY_MAPPING, \
+    MIN_POPULATION, MAX_POPULATION
+from population import PopulationState, history_to_series, STATUS_NAMES, HEALTHY, INCUBATED
+from contacts import Adjacency
+from randomness import RandomContext, context_from_state
+from profiling import Profiler, as_profiler
+from metrics import EpidemicMetrics
+from interventions import PolicyEffect
+from checkpoint import CHECKPOINT_KEEP, Checkpoint, checkpoint_due, write_checkpoint, load_checkpoint, \
+    state_arrays, restore_state, adjacency_arrays, restore_adjacency
+
+
+def parse_population_size(text: str) -> int | None:
+    """
+    Return the population size written in text, or None if text is not a whole number of people
+    between MIN_POPULATION and MAX_POPULATION (see visualization.py).
+
+    Digits may be grouped with commas, underscores or spaces and may end with k or m for
+    thousands or millions, e.g. '250,000' or '2.5m'.
+
+    >>> parse_population_size('250,000')
+    250000
+    >>> parse_population_size('2.5m')
+    2500000
+    >>> parse_population_size('five') is None
+    True
+    """
+    text = text.strip().lower().replace(',', '').replace('_', '').replace(' ', '')
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    if multiplier != 1:
+        text = text[:-1]
+    try:
+        size = float(text) * multiplier
+    except ValueError:
+        return None
+    if not size.is_integer() or not MIN_POPULATION <= size <= MAX_POPULATION:
+        return None
+    return int(size)
 
 
 class InputBox:
@@ -96,6 +132,7 @@ class VirusSimulationApp:
     population_size: int
     population_size_box: InputBox
     input_text: str
+    input_error: str
     house_density_btn: Button
     initial_infected_count_slider: Slider
     infection_rate_slider: Slider
@@ -152,6 +189,7 @@ class VirusSimulationApp:
         self.population_size_box = InputBox(
             slider_start_x, 97, 200, 40, self.font)
         self.input_text = ''     # Variable to store the input text from the user
+        self.input_error = ''    # Message shown when the population size cannot be read
 
         # Button for changing house density
         # Allows users to cycle through house density.
@@ -220,42 +258,18 @@ class VirusSimulationApp:
         self.parameters['contact_density'] = self.contact_density_slider.getValue()
         pygame.quit()  # Close the Pygame window to proceed with the simulation
 
-    def run_simulation(self) -> "Simulation":
+    def run_simulation(self) -> None:
         """
         Initializes and runs the simulation based on the current configuration.
 
-        This function creates instances of the `Virus` and `Policy` classes using the parameters
-        specified in the global `parameters` dictionary. It then initializes a `Simulation` object
-        with the population size, initial infected count, `Virus` instance, and `Policy` instance.
-
-        The simulation environment is prepared by instantiating the necessary components with their
-        respective parameters.
+        The parameters are fetched from the interface and the visualization model is run and
+        drawn by generate_graph.
         """
         self.fetch_parameters()
         # print("Simulation parameters:", self.parameters)
 
         generate_graph(self.parameters)
 
-        # Creating instances of Virus and Policy with their respective parameters
-        virus = Virus(
-            incubation_period=self.parameters['incubation_period'],
-            infection_rate=self.parameters['infection_rate'],
-            death_rate=self.parameters['death_rate'],
-            recovery_days=self.parameters['recovery_days']
-        )
-        policy = Policy(
-            isolate_force=self.parameters['isolate_force']
-        )
-
-        sim = Simulation(
-            population_size=self.parameters['population_size'],
-            initial_infected_count=self.parameters['initial_infected_count'],
-            virus=virus,
-            policy=policy
-        )
-
-        return sim
-
     def draw_text(self, text: str, position: tuple[int, int], color: tuple[int, int, int] = (0, 0, 0)) -> None:
         """
         Draws text on the Pygame screen at a specified position.
@@ -284,8 +298,13 @@ class VirusSimulationApp:
 
                     # Check if the click is within the bounds of the 'Start Simulation' button
                     if 300 <= mouse_pos[0] <= 540 and 580 <= mouse_pos[1] <= 630:
-                        self.population_size = int(self.population_size_box.text) \
-                            if self.population_size_box.text.isdigit() else 500
+                        # An empty box keeps the default size, anything else must be a valid size
+                        if self.population_size_box.text.strip():
+                            population_size = parse_population_size(self.population_size_box.text)
+                            if population_size is None:
+                                self.input_error = f'Enter {MIN_POPULATION} to {MAX_POPULATION:,} people'
+                                continue
+                            self.population_size = population_size
                         self.run_simulation()  # Fetch simulation parameters from the UI
                         pygame.quit()
                         running = False
@@ -333,6 +352,8 @@ class VirusSimulationApp:
                 self.draw_text(label, (50, 105 + 50 * i))
                 if value:
                     self.draw_text(value, (640, 105 + 50 * i))
+            if self.input_error:
+                self.draw_text(self.input_error, (330, 140), (200, 0, 0))
 
             ui_elements = [
                 self.population_size_box,
@@ -369,67 +390,242 @@ class Simulation:
     """
     Represents the main framework for simulating the spread of a virus within a population.
 
+    The population is stored in arrays (see population.py) rather than one Person object per
+    person, so that populations of millions fit in memory. Every person is connected to their
+    household, which never changes, and makes new random contacts every day. A day only visits
+    the people who are currently incubated or infected, as listed by the active set of state:
+    their household neighbors are looked up in a CSR adjacency and their random contacts of
+    the day are drawn on the spot, since the contacts between two people who cannot infect
+    each other never matter. A day therefore costs in proportion to the epidemic, not to the
+    population.
+
     Attributes:
         population_size (int): The total number of people in the population.
         initial_infected_count (int): The number of initially infected individuals.
-        persons (dict[int, Person]): A dictionary mapping each person's ID to their respective Person object.
         virus (Virus): An instance of the Virus class, containing virus-specific parameters.
         policy (Policy): An instance of the Policy class, representing the policy to be applied during the simulation.
+        rng (RandomContext): The source of every random draw of the simulation, see randomness.py.
+        house_density (int): The average number of people in a household.
+        contact_density (float): The average number of random contacts a person makes in a day, before isolation.
+        population (Population): The people of the simulation and their household connections.
+        state (PopulationState): The status, day counter and family of every person, the state of population.
+        households (Adjacency): The household connections between people, the adjacency of population.
+        targets (ContactTargets): Draws the number of random contacts every infectious person makes in a day.
+        day (int): The number of days simulated so far.
+        first_day (int): The day the simulation started from, 0 unless it resumed from a checkpoint.
+        profiler (Profiler): Times the phases of every day, see profiling.py.
+        metrics (EpidemicMetrics): The counts per status, new infections and effective R of every day,
+                                   see metrics.py.
+        effect (PolicyEffect): How policy changes the random contacts of the current day, see interventions.py.
     """
 
     population_size: int
-    graph: nx.Graph
-    persons: dict[int, Person]
+    initial_infected_count: int
     virus: Virus
     policy: Policy
-
-    def __init__(self, population_size: int, initial_infected_count: int, virus: Virus, policy: Policy) -> None:
+    rng: RandomContext
+    house_density: int
+    contact_density: float
+    population: Population
+    state: PopulationState
+    households: Adjacency
+    targets: ContactTargets
+    day: int
+    first_day: int
+    profiler: Profiler
+    metrics: EpidemicMetrics
+    effect: PolicyEffect
+
+    def __init__(self, population_size: int, initial_infected_count: int, virus: Virus, policy: Policy,
+                 rng: RandomContext | None = None, house_density: int = DENSITY_MAPPING["medium"],
+                 contact_density: float = 5, profiler: Profiler | None = None,
+                 checkpoint: Checkpoint | None = None) -> None:
         self.population_size = population_size
-        self.graph = nx.Graph()
-        self.persons = {i: Person() for i in range(population_size)}
+        self.initial_infected_count = initial_infected_count
         self.virus = virus
         self.policy = policy
-        self.initial_infected(initial_infected_count)
-        self.create_connections()
+        self.rng = RandomContext() if rng is None else rng
+        self.house_density = house_density
+        self.contact_density = contact_density
+        self.population = Population(population_size)
+        self.state = self.population.state
+        self.targets = ContactTargets(self.rng.generator)
+        self.day = 0
+        self.profiler = as_profiler(profiler)
+        self.effect = PolicyEffect(policy.isolate_force)
+        if checkpoint is None:
+            self.initial_infected(initial_infected_count)
+            self.create_connections()
+        else:
+            self.restore(checkpoint)
+        self.first_day = self.day
+        self.metrics = EpidemicMetrics(self.state, virus.incubation_period + virus.recovery_days, self.day,
+                                       None if checkpoint is None else checkpoint.arrays.get("metrics"))
+
+    def restore(self, checkpoint: Checkpoint) -> None:
+        """
+        Continue from the people, households, unused contact counts and day saved in checkpoint
+        by save_checkpoint, in place of drawing a new population. rng should already be at the
+        position saved in checkpoint (see resume_simulation).
+        """
+        self.population.restore(restore_state(checkpoint), checkpoint.arrays["edges"],
+                                restore_adjacency(checkpoint, "households"))
+        self.state = self.population.state
+        self.households = self.population.adjacency
+        self.targets.buffer = checkpoint.arrays["contact_targets"]
+        self.day = checkpoint.day
+
+    def save_checkpoint(self, directory: str, keep: int = CHECKPOINT_KEEP) -> str:
+        """
+        Save the simulation as a checkpoint of the current day in directory (see checkpoint.py)
+        and return the folder of the checkpoint. Unless the simulation resumed from a checkpoint,
+        the checkpoints of later days left in directory by another run are deleted.
+        """
+        arrays = {**state_arrays(self.state), "edges": self.population.edges,
+                  **adjacency_arrays(self.households, "households"),
+                  "contact_targets": self.targets.buffer[self.targets.position:], "metrics": self.metrics.table()}
+        meta = {"model": "simulation", "rng": self.rng.get_state(), "policy": self.policy.get_state(),
+                "parameters": {"population_size": self.population_size,
+                               "initial_infected_count": self.initial_infected_count,
+                               "incubation_period": self.virus.incubation_period,
+                               "infection_rate": self.virus.infection_rate,
+                               "death_rate": self.virus.death_rate,
+                               "recovery_days": self.virus.recovery_days,
+                               "isolate_force": self.policy.isolate_force,
+                               "house_density": self.house_density,
+                               "contact_density": self.contact_density}}
+        return write_checkpoint(directory, self.day, arrays, meta, keep, fresh=self.first_day == 0)
 
     def initial_infected(self, initial_infected_count: int) -> None:
         """
         Randomly selects a subset of the population to be initially infected with the virus.
         """
-        infected_ids = random.sample(
-            list(self.persons.keys()), initial_infected_count)
-        for i in infected_ids:
-            self.persons[i].status = "incubation"
+        infected_ids = self.rng.random.sample(range(self.population_size), initial_infected_count)
+        self.state.set_status(infected_ids, INCUBATED)
 
     def create_connections(self) -> None:
         """
         Creates connections between individuals in the population to simulate their interactions.
+
+        Only the households are built here; the random contacts are drawn day by day in spread_virus.
         """
-        return NotImplemented
+        family, family_edges = generate_households(self.population_size, self.house_density, self.rng)
+        self.state.family[:] = family
+        self.population.connect(family_edges[:, 0], family_edges[:, 1])
+        self.households = self.population.adjacency
+
+    def infectious(self) -> np.ndarray:
+        """
+        Return the ids of the people who can currently spread the virus, from the active set of state.
+        """
+        return self.state.active_nodes()
+
+    def daily_contacts(self, people: np.ndarray) -> np.ndarray:
+        """
+        Return the random contacts people make today, as the ids of the people they meet.
+
+        Partners are drawn uniformly from the whole population; a partner who is the person
+        themself is dropped, and a dead partner is a contact that cannot infect anyone. The
+        number of contacts follows the effect of the policy for the day, whose isolated people
+        make no contacts and are dropped as partners.
+        """
+        with self.profiler.phase("daily_contacts"):
+            counts = self.targets.draw(len(people), self.contact_density, self.effect.isolation_force)
+            counts[~self.effect.allowed(people)] = 0
+            sources = np.repeat(people, counts)
+            partners = self.rng.generator.integers(self.population_size, size=len(sources))
+            return partners[(partners != sources) & self.effect.allowed(partners)]
 
     def spread_virus(self) -> None:
         """
         Simulates the transmission of the virus between connected individuals based on the infection rate.
+
+        Every contact of an infectious person with an uninfected one transmits the virus independently,
+        and everyone infected today starts their incubation together at the end of the spread.
         """
-        for person_id, person in self.persons.items():
-            if person.status in ["incubation", "infected"]:
-                for neighbor_id in self.graph.neighbors(person_id):
-                    neighbor = self.persons[neighbor_id]
-                    if neighbor.status == "uninfected" and random.random() < self.virus.infection_rate:
-                        neighbor.status = "incubation"
+        infectious = self.infectious()
+        if len(infectious) == 0:
+            return
+        _, household = self.households.expand(infectious)
+        exposed = np.concatenate([household, self.daily_contacts(infectious)])
+        exposed = exposed[self.state.status[exposed] == HEALTHY]
+        infected = exposed[self.rng.generator.random(len(exposed)) < self.virus.infection_rate]
+        self.state.set_status(infected, INCUBATED)
 
     def update_status(self) -> None:
         """
         Updates the health status of each individual in the population, considering the virus's effects and recovery.
+
+        Only the incubated and infected people are moved on, all at once (see Population.update_status).
+        """
+        self.population.update_status(self.virus, self.rng.generator)
+
+    def person(self, person_id: int) -> Person:
+        """
+        Return a Person view on the given person.
         """
-        for person in self.persons.values():
-            person.update_status(self.virus)
+        return self.population.person(person_id)
 
     def apply_policy(self) -> None:
         """
         Applies the defined policy (e.g., isolation) to mitigate the spread of the virus within the population.
+
+        The measures of the policy for the coming day are decided from the people at the end of
+        the day before (see Policy.enforce_policy) and change the random contacts of the day.
+        """
+        self.effect = self.policy.enforce_policy(self.day + 1, self.state, self.households)
+
+    def step(self) -> None:
+        """
+        Simulate one day: the virus spreads, then everyone's status moves on by a day.
         """
-        return NotImplemented
+        self.profiler.begin_day(self.day + 1)
+        with self.profiler.phase("apply_policy"):
+            self.apply_policy()
+        with self.profiler.phase("spread_virus"):
+            self.spread_virus()
+        with self.profiler.phase("update_status"):
+            self.update_status()
+        self.day += 1
+        self.metrics.end_day(self.day)
+
+    def run(self, days: int, checkpoint_dir: str | None = None, checkpoint_every: int = 0) -> dict[str, np.ndarray]:
+        """
+        Simulate the given number of days and return the number of people in each status on every
+        day, as one array per status name (see population.py) plus the 'day' index, starting with
+        the state before the first simulated day.
+
+        With a checkpoint_dir, a checkpoint is saved there whenever the day count of the
+        simulation reaches a multiple of checkpoint_every (see resume_simulation).
+        """
+        history = np.zeros((days + 1, len(STATUS_NAMES)), dtype=np.int64)
+        history[0] = self.state.counts()
+        for day in range(1, days + 1):
+            self.step()
+            history[day] = self.state.counts()
+            if checkpoint_dir is not None and checkpoint_due(self.day, checkpoint_every):
+                with self.profiler.phase("checkpoint"):
+                    self.save_checkpoint(checkpoint_dir)
+        self.profiler.stop_capture()
+        return history_to_series(history)
+
+
+def resume_simulation(directory: str, profiler: Profiler | None = None) -> Simulation | None:
+    """
+    Return the simulation saved by the latest checkpoint of directory (see
+    Simulation.save_checkpoint), ready to simulate its next day, or None if there is none.
+    """
+    checkpoint = load_checkpoint(directory)
+    if checkpoint is None:
+        return None
+    parameters = checkpoint.meta["parameters"]
+    virus = Virus(parameters["incubation_period"], parameters["infection_rate"], parameters["death_rate"],
+                  parameters["recovery_days"])
+    policy = policy_from_state(checkpoint.meta["policy"]) if "policy" in checkpoint.meta \
+        else Policy(parameters["isolate_force"])
+    return Simulation(parameters["population_size"], parameters["initial_infected_count"], virus,
+                      policy, context_from_state(checkpoint.meta["rng"]),
+                      parameters["house_density"], parameters["contact_density"], profiler, checkpoint)
 
 
 if __name__ == "__main__":
@@ -440,10 +636,12 @@ if __name__ == "__main__":
         python_ta.check_all(config={
             'max-line-length': 120,
             'extra-imports': ["pygame", "pygame_widgets", "sys",
-                            "matplotlib", "numpy", "networkx",
+                            "matplotlib", "numpy",
                               "pygame_widgets.slider", "pygame_widgets.textbox",
                               "typing_extensions", "simulation", "visualization",
-                              "pygame_widgets.button", "random"],  # the names (strs) of imported modules
+                              "pygame_widgets.button", "randomness", "population", "contacts",
+                              "profiling", "checkpoint", "metrics",
+                              "interventions"],  # the names (strs) of imported modules
             # the names (strs) of functions that call print/open/input
             'allowed-io': [],
             'disabled': ["R0914", "R1702", "R0913", "R0902"]
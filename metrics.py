@@ -0,0 +1,167 @@
+"""
+The purpose of this document is to keep the epidemic numbers of every day of a run, so they
+can be exported for analysis instead of only being shown on screen.
+
+An EpidemicMetrics collector is created on a PopulationState at the start of a run and told
+at the end of every day (end_day). It never scans the population: the state keeps the number
+of people in each status up to date as it changes them, together with the flows between
+statuses (see track_transitions in population.py), and every day the collector reads
+
+    the counts per status        S, E, I, R, D = healthy, incubated, infected, recovered, dead
+    new_infections               the people who became incubated or infected from healthy or
+                                 recovered (this model lets recovered people be infected again)
+    effective_r                  new_infections / contagious people at the start of the day
+                                 * infectious_days, the average number of people infected by a
+                                 contagious person over the days they are contagious at today's
+                                 rate; nan when nobody was contagious
+    the peak                     the day with the most contagious (incubated or infected) people
+
+The columns can be exported to CSV, to Parquet when pyarrow is installed, or to a NumPy .npz
+file, see save.
+"""
+
+from __future__ import annotations
+import numpy as np
+from population import PopulationState, STATUS_NAMES, HEALTHY, INCUBATED, INFECTED, RECOVERED
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+# The columns of the exported table, in order
+METRIC_COLUMNS = ("day",) + STATUS_NAMES + ("new_infections", "effective_r")
+
+
+class EpidemicMetrics:
+    """
+    Collects the epidemic numbers of every day of a run, see the top of this file.
+
+    Attributes:
+        state (PopulationState): The population state of the run, whose transitions are tracked.
+        infectious_days (float): The number of days a person stays contagious, incubated and infected.
+        rows (list[list[float]]): The values of METRIC_COLUMNS of every day so far.
+        peak_day (int): The day with the most contagious people so far.
+        peak_active (int): The number of contagious people on peak_day.
+    """
+
+    state: PopulationState
+    infectious_days: float
+    rows: list[list[float]]
+    peak_day: int
+    peak_active: int
+
+    def __init__(self, state: PopulationState, infectious_days: float, day: int = 0,
+                 previous: np.ndarray | None = None) -> None:
+        """
+        Start collecting on state from day. previous holds the table of the days before, as
+        returned by table, e.g. when a run is resumed from a checkpoint.
+        """
+        self.state = state
+        self.infectious_days = infectious_days
+        self.rows = []
+        self.peak_day = day
+        self.peak_active = -1
+        state.track_transitions()
+        for row in [] if previous is None else np.asarray(previous).tolist():
+            if row[0] <= day:
+                self._add(row)
+        if not self.rows or self.rows[-1][0] != day:
+            self._add([day] + state.counts().tolist() + [0, float("nan")])
+
+    def _add(self, row: list[float]) -> None:
+        """
+        Append the row of a day and update the peak.
+        """
+        self.rows.append(row)
+        active = int(row[1 + INCUBATED] + row[1 + INFECTED])
+        if active > self.peak_active:
+            self.peak_day, self.peak_active = int(row[0]), active
+
+    def end_day(self, day: int) -> None:
+        """
+        Record the numbers of day, which has just been simulated.
+        """
+        flows = self.state.take_flows()
+        new_infections = int(flows[[HEALTHY, RECOVERED]][:, [INCUBATED, INFECTED]].sum())
+        previous = self.rows[-1]
+        contagious = previous[1 + INCUBATED] + previous[1 + INFECTED]
+        effective_r = new_infections / contagious * self.infectious_days if contagious else float("nan")
+        self._add([day] + self.state.counts().tolist() + [new_infections, effective_r])
+
+    def table(self) -> np.ndarray:
+        """
+        Return the (days, len(METRIC_COLUMNS)) table of every day so far.
+        """
+        return np.array(self.rows, dtype=float).reshape(-1, len(METRIC_COLUMNS))
+
+    def history(self) -> np.ndarray:
+        """
+        Return the (days, len(STATUS_NAMES)) number of people in each status on every day so far.
+        """
+        return self.table()[:, 1:1 + len(STATUS_NAMES)].astype(np.int64)
+
+    def columns(self) -> dict[str, np.ndarray]:
+        """
+        Return every column of the table by name, with integer columns as integers.
+        """
+        table = self.table()
+        return {name: table[:, i] if name == "effective_r" else table[:, i].astype(np.int64)
+                for i, name in enumerate(METRIC_COLUMNS)}
+
+    def summary(self) -> dict[str, float]:
+        """
+        Return the peak day, the number of contagious people on it, the total number of
+        infections and the final number of deaths.
+        """
+        columns = self.columns()
+        return {"peak_day": self.peak_day, "peak_active": self.peak_active,
+                "total_infections": int(columns["new_infections"].sum()), "deaths": int(columns["dead"][-1])}
+
+    def to_csv(self, path: str) -> None:
+        """
+        Write the table to path as CSV, with a header line of column names.
+        """
+        formats = ["%.6g" if name == "effective_r" else "%d" for name in METRIC_COLUMNS]
+        np.savetxt(path, self.table(), fmt=formats, delimiter=",", header=",".join(METRIC_COLUMNS), comments="")
+
+    def to_parquet(self, path: str) -> None:
+        """
+        Write the table to path as Parquet. Needs pyarrow.
+        """
+        if pyarrow is None:
+            raise ImportError("Parquet export needs pyarrow, install it or use CSV or .npz instead")
+        pyarrow.parquet.write_table(pyarrow.table(self.columns()), path)
+
+    def to_npz(self, path: str) -> None:
+        """
+        Write every column to path as a NumPy .npz archive.
+        """
+        np.savez(path, **self.columns())
+
+    def save(self, path: str) -> None:
+        """
+        Write the table to path, as Parquet if it ends with .parquet, as NumPy if it ends with
+        .npz and as CSV otherwise.
+        """
+        if path.endswith(".parquet"):
+            self.to_parquet(path)
+        elif path.endswith(".npz"):
+            self.to_npz(path)
+        else:
+            self.to_csv(path)
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy", "population", "pyarrow", "pyarrow.parquet"],
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            # 'disabled': ["E9999"]
+        })
@@ -0,0 +1,206 @@
+"""
+The purpose of this document is to decouple advancing the simulation from drawing it.
+
+SimulationWorker advances the model one day at a time (e.g. with run_day from
+visualization.py) on a background thread and pushes a compact DaySnapshot of every day
+(a copy of the status array and of the day's contact edges) into a bounded queue, so the
+model can run ahead of the display by up to buffer_size days. The contact layer is drawn
+anew every day (see contacts.ContactNetwork.rewire), so a snapshot carries the new layer
+whole, which replaces the previous one, rather than a delta against it.
+
+play consumes the queue on the main thread at a target frame rate. Every day gets its own
+frame while the display keeps up; when drawing falls behind schedule, the days that are
+already late are skipped instead of holding the model back. While it waits for the next
+day, play keeps the window responsive; if a day fails on the worker, the worker ends the
+queue and play raises the error on the main thread.
+
+Both sides time their work as phases of an optional profiler (see profiling.py): the
+worker marks the start of every day and times the snapshot copy, play times drawing and
+pausing.
+"""
+
+from __future__ import annotations
+from typing import Callable
+import queue
+import threading
+import time
+import numpy as np
+from population import PopulationState
+from renderer import GraphRenderer, CountsRenderer
+from profiling import Profiler, as_profiler
+
+# Number of days the simulation may run ahead of the display
+DEFAULT_BUFFER_SIZE = 16
+# Seconds play waits for a snapshot before letting the window handle its events again
+WAIT_INTERVAL = 0.05
+
+
+class DaySnapshot:
+    """
+    The state of the simulation at the end of a day, as sent from the worker to the display.
+
+    Attributes:
+        day (int): The day the snapshot was taken.
+        status (np.ndarray): A copy of the status of every node, or the number of people in each
+                             status for a worker sending counts only.
+        contacts (np.ndarray): A copy of the (E, 2) contact edges of this day, empty for a worker
+                               sending counts only.
+    """
+
+    day: int
+    status: np.ndarray
+    contacts: np.ndarray
+
+    def __init__(self, day: int, status: np.ndarray, contacts: np.ndarray) -> None:
+        self.day = day
+        self.status = status
+        self.contacts = contacts
+
+
+def _as_edges(edges: list | np.ndarray) -> np.ndarray:
+    """
+    Copy a list or array of edges into a new (E, 2) integer array.
+    """
+    return np.array(edges, dtype=np.int64).reshape(-1, 2)
+
+
+class SimulationWorker(threading.Thread):
+    """
+    A background thread advancing the simulation and publishing one DaySnapshot per day.
+
+    Attributes:
+        step (Callable[[np.ndarray], np.ndarray]): Advances the simulation by one day, taking the current
+                                                   contact edges and returning the new ones.
+        state (PopulationState): The population state advanced by step, owned by the worker once started.
+        total_days (int): The number of days to simulate.
+        edges (np.ndarray): The current contact edges.
+        snapshots (queue.Queue): The bounded queue of snapshots; None marks the end of the run.
+        stopped (threading.Event): Set to ask the worker to stop early.
+        counts_only (bool): Whether snapshots carry the counts per status and no edges, for
+                            populations too large to copy every day (see renderer.CountsRenderer).
+        profiler (Profiler): Times the days of the worker, see profiling.py.
+        first_day (int): The number of days simulated before the worker started, e.g. by a
+                         resumed run (see checkpoint.py); the worker simulates the days after it.
+        error (Exception | None): The error which stopped the worker before its last day, if any.
+    """
+
+    step: Callable[[np.ndarray], np.ndarray]
+    state: PopulationState
+    total_days: int
+    edges: np.ndarray
+    snapshots: queue.Queue
+    stopped: threading.Event
+    counts_only: bool
+    profiler: Profiler
+    first_day: int
+    error: Exception | None
+
+    def __init__(self, step: Callable[[np.ndarray], np.ndarray], state: PopulationState, total_days: int,
+                 edges: np.ndarray, buffer_size: int = DEFAULT_BUFFER_SIZE, counts_only: bool = False,
+                 profiler: Profiler | None = None, first_day: int = 0) -> None:
+        super().__init__(daemon=True)
+        self.step = step
+        self.state = state
+        self.total_days = total_days
+        self.edges = edges
+        self.snapshots = queue.Queue(maxsize=buffer_size)
+        self.stopped = threading.Event()
+        self.counts_only = counts_only
+        self.profiler = as_profiler(profiler)
+        self.first_day = first_day
+        self.error = None
+
+    def _put(self, item: DaySnapshot | None) -> bool:
+        """
+        Wait for room in the queue and push item. Return False if the worker was stopped.
+        """
+        while not self.stopped.is_set():
+            try:
+                self.snapshots.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self) -> None:
+        try:
+            for day in range(self.first_day + 1, self.total_days + 1):
+                self.profiler.begin_day(day)
+                self.edges = self.step(self.edges)
+                with self.profiler.phase("snapshot"):
+                    if self.counts_only:
+                        snapshot = DaySnapshot(day, self.state.counts(), np.empty((0, 2), dtype=np.int64))
+                    else:
+                        # The next step overwrites the edges in place, so they are copied
+                        snapshot = DaySnapshot(day, self.state.status.copy(), _as_edges(self.edges))
+                if not self._put(snapshot):
+                    return
+        except Exception as error:
+            # Raised again by play, on the main thread
+            self.error = error
+        finally:
+            self.profiler.stop_capture()
+        self._put(None)
+
+    def stop(self) -> None:
+        """
+        Ask the worker to stop and wait for it.
+        """
+        self.stopped.set()
+        self.join()
+
+
+def play(renderer: GraphRenderer | CountsRenderer, worker: SimulationWorker, frame_rate: float,
+         profiler: Profiler | None = None) -> None:
+    """
+    Start worker and show its snapshots in renderer at frame_rate frames per second,
+    where a frame_rate of 0 draws as fast as possible.
+
+    A snapshot is skipped when the next one is already due, which only happens when
+    drawing cannot keep up with frame_rate. Closing the window stops the worker.
+    Drawing is timed as phases of profiler, on the day being shown. An error raised by the
+    worker is raised again here.
+    """
+    profiler = as_profiler(profiler)
+    period = 1.0 / frame_rate if frame_rate > 0 else 0.0
+    worker.start()
+
+    start = time.perf_counter()
+    frame = 0
+    while renderer.is_open():
+        try:
+            snapshot = worker.snapshots.get(timeout=WAIT_INTERVAL)
+        except queue.Empty:
+            renderer.pause(WAIT_INTERVAL)
+            continue
+        if snapshot is None:
+            worker.join()
+            if worker.error is not None:
+                raise worker.error
+            return
+
+        frame += 1
+        late = time.perf_counter() - start > frame * period
+        if period and late and not worker.snapshots.empty():
+            continue
+
+        with profiler.phase("draw", snapshot.day):
+            renderer.draw_day(snapshot.day, snapshot.status, snapshot.contacts)
+        with profiler.phase("pause", snapshot.day):
+            renderer.pause(start + frame * period - time.perf_counter())
+    worker.stop()
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy", "queue", "threading", "time", "typing",
+                              "population", "renderer", "profiling"],
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            # 'disabled': ["E9999"]
+        })
@@ -0,0 +1,205 @@
+"""
+The purpose of this document is to store the epidemic state of the whole population
+in compact NumPy arrays instead of in the per-node attribute dictionaries of networkx.
+
+Every person is identified by their node id, which is also their index in each array.
+A status is stored as a small integer code:
+
+    HEALTHY   = 0   green
+    INCUBATED = 1   purple (infected, but not detected)
+    INFECTED  = 2   red
+    RECOVERED = 3   blue
+    DEAD      = 4   black
+
+so that a person costs 7 bytes (status, days_infected and family) instead of the
+kilobyte-sized attribute dictionary networkx keeps per node.
+
+The ids of the people who can spread the virus (incubated or infected) are also kept in a
+sorted array, the active set. set_status records the people it makes incubated or infected,
+and active_nodes merges them in and drops the people who are no longer contagious, so
+spreading and progression only visit the active set and a day costs in proportion to the
+current size of the epidemic rather than to the population. Code making people incubated
+or infected by writing to status directly has to call refresh_active afterwards.
+
+After track_transitions, set_status also keeps the number of people in each status, and
+the number of people who moved from each status to each other one (the flows), up to date
+as it changes them, so counts() no longer scans the population and new infections can be
+read from the flows (see metrics.py). Code writing to status directly has to call
+track_transitions again afterwards.
+"""
+
+from __future__ import annotations
+import numpy as np
+
+HEALTHY = 0
+INCUBATED = 1
+INFECTED = 2
+RECOVERED = 3
+DEAD = 4
+
+STATUS_NAMES = ('healthy', 'incubated', 'infected', 'recovered', 'dead')
+STATUS_COLORS = ('green', 'purple', 'red', 'blue', 'black')
+
+
+class PopulationState:
+    """
+    Array-backed health state of a population, indexed by node id.
+
+    Attributes:
+        status (np.ndarray): The status code of every person, see the codes at the top of this file.
+        days_infected (np.ndarray): The number of days every person has spent in their current
+                                    incubated or infected status.
+        family (np.ndarray): The family id of every person, -1 for no family.
+        active (np.ndarray): The sorted ids of every incubated or infected person as of the last
+                             call to active_nodes, plus possibly people who have stopped being contagious since.
+        added (list[np.ndarray]): The ids made incubated or infected since the last call to active_nodes.
+        tally (np.ndarray | None): The number of people in each status, when transitions are tracked.
+        flows (np.ndarray | None): The number of status changes from each status (row) to each status
+                                   (column) since the last call to take_flows, when transitions are tracked.
+    """
+
+    status: np.ndarray
+    days_infected: np.ndarray
+    family: np.ndarray
+    active: np.ndarray
+    added: list[np.ndarray]
+    tally: np.ndarray | None
+    flows: np.ndarray | None
+
+    def __init__(self, size: int) -> None:
+        self.status = np.full(size, HEALTHY, dtype=np.uint8)
+        self.days_infected = np.zeros(size, dtype=np.int16)
+        self.family = np.full(size, -1, dtype=np.int32)
+        self.active = np.empty(0, dtype=np.int64)
+        self.added = []
+        self.tally = None
+        self.flows = None
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Return the number of bytes used by the state arrays.
+        """
+        return self.status.nbytes + self.days_infected.nbytes + self.family.nbytes
+
+    def set_status(self, nodes: np.ndarray | list[int] | int, status: int) -> None:
+        """
+        Move the given nodes to status and restart their day counter.
+        """
+        if self.flows is not None:
+            # A person listed twice changes status once
+            nodes = _distinct(nodes)
+            before = np.bincount(np.atleast_1d(self.status[nodes]), minlength=len(STATUS_NAMES))
+            self.flows[:, status] += before
+            self.tally -= before
+            self.tally[status] += before.sum()
+        self.status[nodes] = status
+        self.days_infected[nodes] = 0
+        if status in (INCUBATED, INFECTED):
+            if isinstance(nodes, slice):
+                nodes = np.arange(len(self.status))[nodes]
+            self.added.append(np.asarray(nodes, dtype=np.int64).ravel())
+
+    def refresh_active(self) -> None:
+        """
+        Rebuild the active set from the status array, after status was written to directly.
+        """
+        self.active = np.flatnonzero((self.status == INCUBATED) | (self.status == INFECTED))
+        self.added = []
+
+    def active_nodes(self) -> np.ndarray:
+        """
+        Return the sorted ids of every incubated or infected person, from the active set.
+        """
+        if self.added:
+            merged = np.sort(np.concatenate([self.active] + self.added))
+            first = np.ones(len(merged), dtype=bool)
+            first[1:] = merged[1:] != merged[:-1]
+            self.active = merged[first]
+            self.added = []
+        status = self.status[self.active]
+        self.active = self.active[(status == INCUBATED) | (status == INFECTED)]
+        return self.active
+
+    def track_transitions(self) -> None:
+        """
+        Start keeping the number of people in each status and the flows between statuses up
+        to date in set_status, from the current status, with no flows yet.
+        """
+        self.tally = np.bincount(self.status, minlength=len(STATUS_NAMES)).astype(np.int64)
+        self.flows = np.zeros((len(STATUS_NAMES), len(STATUS_NAMES)), dtype=np.int64)
+
+    def take_flows(self) -> np.ndarray:
+        """
+        Return the flows between statuses since the last call, indexed by (from, to) status
+        code, and start counting them again. Transitions must be tracked.
+        """
+        flows = self.flows
+        self.flows = np.zeros_like(flows)
+        return flows
+
+    def counts(self) -> np.ndarray:
+        """
+        Return the number of people in each status, indexed by status code.
+        """
+        if self.tally is not None:
+            return self.tally.copy()
+        return np.bincount(self.status, minlength=len(STATUS_NAMES))
+
+    def count(self, status: int) -> int:
+        """
+        Return the number of people with the given status code.
+        """
+        return int(np.count_nonzero(self.status == status))
+
+    def alive(self) -> np.ndarray:
+        """
+        Return the ids of every person who is not dead.
+        """
+        return np.flatnonzero(self.status != DEAD)
+
+    def node_colors(self) -> list[str]:
+        """
+        Return the visualization color of every person, in node id order.
+        """
+        return np.array(STATUS_COLORS)[self.status].tolist()
+
+
+def _distinct(nodes: np.ndarray | list[int] | int | slice) -> np.ndarray | int | slice:
+    """
+    Return nodes without repeated ids. A slice or a single id is returned as is.
+    """
+    if isinstance(nodes, slice) or np.ndim(nodes) == 0:
+        return nodes
+    nodes = np.sort(np.asarray(nodes, dtype=np.int64).ravel())
+    first = np.ones(len(nodes), dtype=bool)
+    first[1:] = nodes[1:] != nodes[:-1]
+    return nodes[first]
+
+
+def history_to_series(history: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Split a history of daily counts, with one row per day and one column per status code,
+    into one time series per status name, plus the 'day' index.
+    """
+    series = {"day": np.arange(len(history))}
+    for code, name in enumerate(STATUS_NAMES):
+        series[name] = history[:, code]
+    return series
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy"],  # the names (strs) of imported modules
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            # 'disabled': ["E9999"]
+        })
@@ -0,0 +1,338 @@
+"""
+The purpose of this document is to show where the time of a run goes, day by day and phase
+by phase, instead of only how long the whole run took.
+
+A Profiler is passed to the day loop (generate_graph and run_day in visualization.py, the
+worker and play in pipeline.py, simulate_history in headless.py and main.Simulation), which
+wraps every phase of a day in profiler.phase(name):
+
+    transmission, progression, apply_policy,               a day of visualization.update_day
+    contact_targets, rewire
+    snapshot                                               copying a day for the display
+    draw, pause                                            showing a day, in pipeline.play
+    apply_policy, spread_virus, daily_contacts, update_status     a day of main.Simulation
+
+and calls profiler.begin_day(day) when a new day starts. Every phase is recorded as a
+PhaseEvent with its wall time and, when track_allocations is set, the bytes it allocated
+and did not free (measured with tracemalloc, which also sees NumPy arrays); begin_day also
+records the peak traced memory of every day. tracemalloc slows down the phases which make
+many small allocations (rewire about threefold), so wall times are best read from a run
+without track_allocations. Phases may be nested (daily_contacts runs inside spread_virus),
+so their totals are not meant to be added up; the worker and the display also run at the
+same time on different threads, which the trace shows as two tracks. tracemalloc only counts
+the memory of the whole process, so while both threads run every phase would also count what
+the other thread allocated meanwhile: a profiler created as concurrent tracks no allocations,
+and its report says so.
+
+For a closer look, profile_days = (first, last) runs cProfile over those days, in the
+thread running the days, and keeps a tracemalloc snapshot of what is allocated at the end
+of them. save writes:
+
+    <prefix>.trace.json     every phase as a Chrome trace event, for chrome://tracing,
+                            Perfetto or speedscope
+    <prefix>.prof           the cProfile statistics, for pstats, snakeviz or flameprof
+    <prefix>.tracemalloc    the tracemalloc snapshot, for tracemalloc.Snapshot.load
+
+A disabled Profiler (NO_PROFILER, used when None is given) records nothing and costs one
+attribute lookup per phase.
+"""
+
+from __future__ import annotations
+from typing import Any
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+class PhaseEvent:
+    """
+    One run of a phase of the day loop.
+
+    Attributes:
+        name (str): The name of the phase.
+        day (int): The day the phase belongs to.
+        thread (str): The name of the thread that ran the phase.
+        start (float): The start of the phase in seconds, from the creation of the profiler.
+        duration (float): The wall time of the phase in seconds.
+        allocated (int): The bytes allocated and not freed by the phase, 0 when allocations are not tracked.
+    """
+
+    name: str
+    day: int
+    thread: str
+    start: float
+    duration: float
+    allocated: int
+
+    def __init__(self, name: str, day: int, thread: str, start: float, duration: float, allocated: int) -> None:
+        self.name = name
+        self.day = day
+        self.thread = thread
+        self.start = start
+        self.duration = duration
+        self.allocated = allocated
+
+
+class _Phase:
+    """
+    The context manager returned by Profiler.phase, recording one PhaseEvent on exit.
+    """
+
+    def __init__(self, profiler: Profiler, name: str, day: int | None) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.day = day
+        self.memory = 0
+        self.start = 0.0
+
+    def __enter__(self) -> _Phase:
+        if self.profiler.track_allocations:
+            self.memory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        duration = time.perf_counter() - self.start
+        allocated = tracemalloc.get_traced_memory()[0] - self.memory if self.profiler.track_allocations else 0
+        day = self.profiler.day if self.day is None else self.day
+        self.profiler.events.append(PhaseEvent(self.name, day, threading.current_thread().name,
+                                               self.start - self.profiler.origin, duration, allocated))
+
+
+class _NoPhase:
+    """
+    The context manager returned by a disabled Profiler, doing nothing.
+    """
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *_exc: Any) -> None:
+        return None
+
+
+_NO_PHASE = _NoPhase()
+
+
+class Profiler:
+    """
+    Records the phases of the day loop of a run, see the top of this file.
+
+    Attributes:
+        enabled (bool): Whether anything is recorded.
+        track_allocations (bool): Whether tracemalloc measures the memory allocated by every phase.
+        concurrent (bool): Whether the phases run on several threads at the same time, e.g. the
+                           worker and play of pipeline.py, so allocations are not tracked.
+        profile_days (tuple[int, int] | None): The first and last day captured with cProfile and
+                                               tracemalloc, or None for no capture.
+        origin (float): The time.perf_counter() of the creation of the profiler.
+        day (int): The current day, as given to begin_day.
+        events (list[PhaseEvent]): Every phase recorded so far, in the order they ended.
+        day_peaks (dict[int, int]): The peak traced memory in bytes of every day, when allocations are tracked.
+        profile (cProfile.Profile | None): The statistics of the captured days, once their capture started.
+        snapshot (tracemalloc.Snapshot | None): The memory allocated at the end of the captured days.
+    """
+
+    enabled: bool
+    track_allocations: bool
+    concurrent: bool
+    profile_days: tuple[int, int] | None
+    origin: float
+    day: int
+    events: list[PhaseEvent]
+    day_peaks: dict[int, int]
+    profile: cProfile.Profile | None
+    snapshot: tracemalloc.Snapshot | None
+    _capturing: bool
+    _started_tracemalloc: bool
+
+    def __init__(self, enabled: bool = True, track_allocations: bool = True,
+                 profile_days: tuple[int, int] | None = None, concurrent: bool = False) -> None:
+        self.enabled = enabled
+        self.concurrent = concurrent
+        self.track_allocations = enabled and track_allocations and not concurrent
+        self.profile_days = profile_days if enabled else None
+        self.origin = time.perf_counter()
+        self.day = 0
+        self.events = []
+        self.day_peaks = {}
+        self.profile = None
+        self.snapshot = None
+        self._capturing = False
+        self._started_tracemalloc = False
+        if self.track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def phase(self, name: str, day: int | None = None) -> _Phase | _NoPhase:
+        """
+        Return a context manager recording the code it wraps as the phase name of day,
+        by default of the current day.
+        """
+        if not self.enabled:
+            return _NO_PHASE
+        return _Phase(self, name, day)
+
+    def begin_day(self, day: int) -> None:
+        """
+        Mark the start of day, in the thread running the days. Starts or stops the capture of
+        profile_days.
+        """
+        if not self.enabled:
+            return
+        if self.track_allocations:
+            self.day_peaks[self.day] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+        self.day = day
+        if self.profile_days is not None:
+            first, last = self.profile_days
+            if first <= day <= last and not self._capturing:
+                self._start_capture()
+            elif day > last:
+                self.stop_capture()
+
+    def _start_capture(self) -> None:
+        """
+        Start cProfile in the current thread, and tracemalloc if it is not running yet.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.profile = cProfile.Profile() if self.profile is None else self.profile
+        self.profile.enable()
+        self._capturing = True
+
+    def stop_capture(self) -> None:
+        """
+        Stop the capture of profile_days, in the thread running the days, if it is running.
+        Called by begin_day after the last captured day, and by the day loops when they end.
+        """
+        if self.track_allocations:
+            self.day_peaks[self.day] = tracemalloc.get_traced_memory()[1]
+        if not self._capturing:
+            return
+        self.profile.disable()
+        self.snapshot = tracemalloc.take_snapshot()
+        self._capturing = False
+        if self._started_tracemalloc and not self.track_allocations:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def close(self) -> None:
+        """
+        Stop tracemalloc if this profiler started it.
+        """
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """
+        Return the calls, total, mean and maximum seconds and allocated bytes of every phase,
+        in the order the phases first ended.
+        """
+        phases = {}
+        for event in self.events:
+            totals = phases.setdefault(event.name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "allocated": 0})
+            totals["calls"] += 1
+            totals["seconds"] += event.duration
+            totals["max_seconds"] = max(totals["max_seconds"], event.duration)
+            totals["allocated"] += event.allocated
+        for totals in phases.values():
+            totals["mean_seconds"] = totals["seconds"] / totals["calls"]
+        return phases
+
+    def per_day(self) -> dict[int, dict[str, tuple[int, float, int]]]:
+        """
+        Return, for every day, the (calls, seconds, allocated bytes) of every phase run on that day.
+        """
+        days = {}
+        for event in self.events:
+            calls, seconds, allocated = days.setdefault(event.day, {}).get(event.name, (0, 0.0, 0))
+            days[event.day][event.name] = (calls + 1, seconds + event.duration, allocated + event.allocated)
+        return dict(sorted(days.items()))
+
+    def trace_events(self) -> list[dict[str, Any]]:
+        """
+        Return every phase as a complete event of the Chrome trace event format, with one
+        track per thread, times in microseconds and the day and allocated bytes as arguments.
+        """
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for event in self.events:
+            tid = threads.setdefault(event.thread, len(threads) + 1)
+            events.append({"name": event.name, "cat": "day", "ph": "X", "pid": pid, "tid": tid,
+                           "ts": event.start * 1e6, "dur": event.duration * 1e6,
+                           "args": {"day": event.day, "allocated": event.allocated}})
+        for thread, tid in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}})
+        return events
+
+    def write_trace(self, path: str) -> None:
+        """
+        Write the phases to path as a Chrome trace JSON file.
+        """
+        with open(path, "w") as file:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, file)
+
+    def save(self, prefix: str) -> list[str]:
+        """
+        Write the trace, and the cProfile statistics and tracemalloc snapshot of the captured
+        days if any, to files starting with prefix (see the top of this file). Return their paths.
+        """
+        directory = os.path.dirname(prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        paths = [prefix + ".trace.json"]
+        self.write_trace(paths[0])
+        if self.profile is not None:
+            paths.append(prefix + ".prof")
+            self.profile.dump_stats(paths[-1])
+        if self.snapshot is not None:
+            paths.append(prefix + ".tracemalloc")
+            self.snapshot.dump(paths[-1])
+        return paths
+
+    def report(self) -> None:
+        """
+        Print the summary of every phase, and the peak memory of the run if it was tracked.
+        """
+        if self.enabled and self.concurrent:
+            print("allocations not tracked: the phases ran on several threads at once, and tracemalloc "
+                  "would count the allocations of every thread in each phase")
+        print(f"{'phase':<16} {'calls':>7} {'total s':>10} {'mean ms':>10} {'max ms':>10} {'alloc MB':>10}")
+        for name, totals in self.summary().items():
+            print(f"{name:<16} {totals['calls']:>7} {totals['seconds']:>10.3f} "
+                  f"{totals['mean_seconds'] * 1000:>10.2f} {totals['max_seconds'] * 1000:>10.2f} "
+                  f"{totals['allocated'] / 2 ** 20:>10.2f}")
+        if self.day_peaks:
+            day, peak = max(self.day_peaks.items(), key=lambda item: item[1])
+            print(f"peak traced memory {peak / 2 ** 20:.1f} MB on day {day}")
+
+
+NO_PROFILER = Profiler(enabled=False)
+
+
+def as_profiler(profiler: Profiler | None) -> Profiler:
+    """
+    Return profiler, or NO_PROFILER if it is None.
+    """
+    return NO_PROFILER if profiler is None else profiler
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["cProfile", "json", "os", "threading", "time", "tracemalloc", "typing"],
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': ["write_trace", "report"],
+            # 'disabled': ["E9999"]
+        })
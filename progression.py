@@ -0,0 +1,53 @@
+"""
+The purpose of this document is to implement the daily disease progression shared by the
+Simulation of main.py and the visualization model of visualization.py.
+
+Both models follow the same state machine, applied to every contagious person at once:
+
+    incubated --(incubation_period days)--> infected
+    infected  --(recovery_days days)------> dead with probability death_rate, recovered otherwise
+
+A day first adds one to the day counter of every incubated and infected person, then moves
+the people whose counter has reached the length of their stage with masks, drawing all the
+death outcomes of the day in a single vectorized call. Only the active set of the
+population state is visited (see population.py).
+"""
+
+from __future__ import annotations
+import numpy as np
+from population import PopulationState, INCUBATED, INFECTED, RECOVERED, DEAD
+
+
+def progress(state: PopulationState, incubation_period: int, recovery_days: int, death_rate: float,
+             rng: np.random.Generator | None = None, nodes: np.ndarray | None = None) -> None:
+    """
+    Move the given people (every incubated or infected person if nodes is None) on by one day.
+
+    The death outcomes are drawn from rng, or from the global numpy random state if rng is None.
+    """
+    status, days = state.status, state.days_infected
+    nodes = state.active_nodes() if nodes is None else np.asarray(nodes, dtype=np.int64).ravel()
+    incubated = nodes[status[nodes] == INCUBATED]
+    infected = nodes[status[nodes] == INFECTED]
+    days[incubated] += 1
+    days[infected] += 1
+
+    state.set_status(incubated[days[incubated] >= incubation_period], INFECTED)
+    resolved = infected[days[infected] >= recovery_days]
+    dies = (np.random if rng is None else rng).random(len(resolved)) < death_rate
+    state.set_status(resolved[dies], DEAD)
+    state.set_status(resolved[~dies], RECOVERED)
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy", "population"],  # the names (strs) of imported modules
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            # 'disabled': ["E9999"]
+        })
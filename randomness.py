@@ -0,0 +1,122 @@
+"""
+The purpose of this document is to make every random draw of the simulation come from one
+seedable source, so runs can be reproduced and split across processes.
+
+A RandomContext is created from a seed and passed to every part of the simulation which
+draws random numbers (Simulation in main.py, visualization.py, contacts.py, transmission.py
+and layout.py) instead of them using the global random and np.random states. It holds:
+    generator   a numpy Generator, for vectorized draws
+    random      a random.Random, for the per-person and per-edge draws of the python loops
+
+spawn derives independent child contexts with numpy's SeedSequence, e.g. one per worker
+process, so a parallel run gives bit-for-bit the same result whatever the number of workers.
+
+get_state returns the position of both streams as a JSON-compatible dictionary, and
+context_from_state turns it back into a context which continues exactly where the saved one
+stopped, which is what checkpoints store (see checkpoint.py). The restored seed sequence has
+not spawned any children yet, so it spawns the same children as the original context did.
+"""
+
+from __future__ import annotations
+from typing import Any
+import random
+import numpy as np
+
+
+class RandomContext:
+    """
+    The random number streams of one simulation run.
+
+    Attributes:
+        seed_sequence (np.random.SeedSequence): The seed the streams are derived from.
+        seeded (bool): Whether the context was created from an explicit seed, i.e. is reproducible.
+        generator (np.random.Generator): The stream for numpy draws.
+        random (random.Random): The stream for scalar python draws.
+    """
+
+    seed_sequence: np.random.SeedSequence
+    seeded: bool
+    generator: np.random.Generator
+    random: random.Random
+
+    def __init__(self, seed: int | np.random.SeedSequence | None = None, seeded: bool | None = None) -> None:
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        self.seeded = seed is not None if seeded is None else seeded
+        self.generator = np.random.Generator(np.random.PCG64(self.seed_sequence))
+        self.random = random.Random(int(self.generator.integers(2 ** 63)))
+
+    def spawn(self, count: int) -> list[RandomContext]:
+        """
+        Return count new contexts whose streams are independent from this one and from each other.
+        """
+        return [RandomContext(child, self.seeded) for child in self.seed_sequence.spawn(count)]
+
+    def spawn_seeds(self, count: int) -> list[int]:
+        """
+        Return count integer seeds of independent streams, for places that record the seed of a run.
+        """
+        return [int(child.generate_state(1)[0]) for child in self.seed_sequence.spawn(count)]
+
+    def get_state(self) -> dict[str, Any]:
+        """
+        Return the seed and the current position of both streams, as a JSON-compatible dictionary.
+        """
+        version, internal, gauss = self.random.getstate()
+        return {
+            "entropy": self.seed_sequence.entropy,
+            "spawn_key": list(self.seed_sequence.spawn_key),
+            "seeded": self.seeded,
+            "generator": self.generator.bit_generator.state,
+            "random": [version, list(internal), gauss],
+        }
+
+    def set_state(self, state: dict[str, Any]) -> None:
+        """
+        Move both streams to the position saved in state by get_state.
+        """
+        self.generator.bit_generator.state = state["generator"]
+        version, internal, gauss = state["random"]
+        self.random.setstate((version, tuple(internal), gauss))
+
+    @property
+    def key(self) -> str:
+        """
+        Return a short text identifying the seed of this context, e.g. for cache file names.
+        """
+        spawn_key = "-".join(str(i) for i in self.seed_sequence.spawn_key)
+        return f"{self.seed_sequence.entropy}" + (f"-{spawn_key}" if spawn_key else "")
+
+
+def context_from_state(state: dict[str, Any]) -> RandomContext:
+    """
+    Return a context with the seed of state, as returned by get_state, whose streams continue
+    from the saved position.
+    """
+    seed_sequence = np.random.SeedSequence(state["entropy"], spawn_key=tuple(state["spawn_key"]))
+    context = RandomContext(seed_sequence, state["seeded"])
+    context.set_state(state)
+    return context
+
+
+def as_context(seed: int | RandomContext | None) -> RandomContext:
+    """
+    Return seed if it already is a RandomContext, and a new context created from it otherwise.
+    """
+    return seed if isinstance(seed, RandomContext) else RandomContext(seed)
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy", "random", "typing"],  # the names (strs) of imported modules
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            # 'disabled': ["E9999"]
+        })
@@ -0,0 +1,239 @@
+"""
+The purpose of this document is to draw the days of the visualization incrementally.
+
+generate_graph used to clear the figure every day and call nx.draw, which rebuilds an
+artist for every node and every edge. GraphRenderer instead creates its artists once:
+a scatter for the nodes, a LineCollection for the family edges and a LineCollection for
+the daily contacts. Every day it only recolors the nodes whose status changed, replaces
+the contact segments and redraws the changing artists on top of a saved background
+(blitting), so a frame costs little more than the number of status changes and contacts.
+
+Drawing every person stops being readable, and fast, beyond a few thousand people.
+CountsRenderer draws the number of people in each status per day instead, which costs
+the same whatever the size of the population.
+"""
+
+from __future__ import annotations
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba_array
+from population import STATUS_COLORS, STATUS_NAMES, INFECTED, DEAD
+from contacts import CONTACT_EDGE_COLOR
+
+STATUS_RGBA = to_rgba_array(STATUS_COLORS)
+FAMILY_EDGE_COLOR = 'blue'
+NODE_SIZE = 10
+
+
+class GraphRenderer:
+    """
+    A matplotlib window showing the population graph, updated one day at a time.
+
+    Attributes:
+        positions (np.ndarray): The (N, 2) position of every node, indexed by node id.
+        fig (plt.Figure): The figure of the window.
+        ax (plt.Axes): The axes the graph is drawn on.
+        nodes (PathCollection): The scatter of the nodes, colored by status.
+        contacts (LineCollection): The segments of the daily random contacts.
+        day_text (plt.Text): The subtitle showing the day.
+        count_text (plt.Text): The subtitle showing the number of infected people.
+        colors (np.ndarray): The RGBA face color of every node.
+        status (np.ndarray): The status of every node when it was last drawn.
+        background (object): The saved pixels of everything that does not change between days.
+    """
+
+    positions: np.ndarray
+    fig: plt.Figure
+    ax: plt.Axes
+    nodes: object
+    contacts: LineCollection
+    day_text: plt.Text
+    count_text: plt.Text
+    colors: np.ndarray
+    status: np.ndarray
+    background: object
+
+    def __init__(self, positions: np.ndarray, family_edges: np.ndarray, status: np.ndarray,
+                 figsize: tuple[int, int] = (15, 10)) -> None:
+        self.positions = np.asarray(positions, dtype=float)
+        self.status = status.copy()
+        self.colors = STATUS_RGBA[self.status]
+        self.background = None
+
+        plt.ion()
+        self.fig, self.ax = plt.subplots(figsize=figsize)
+        plt.subplots_adjust(left=0.05, right=0.95, bottom=0.05)
+        self.ax.set_axis_off()
+
+        self.ax.add_collection(LineCollection(self.positions[family_edges], colors=FAMILY_EDGE_COLOR,
+                                              linewidths=1.0, zorder=1))
+        self.contacts = LineCollection([], colors=[CONTACT_EDGE_COLOR], linewidths=1.0,
+                                       zorder=1, animated=True)
+        self.ax.add_collection(self.contacts)
+        self.nodes = self.ax.scatter(self.positions[:, 0], self.positions[:, 1], s=NODE_SIZE,
+                                     c=self.colors, zorder=2, animated=True)
+        self.ax.autoscale_view()
+
+        self.fig.suptitle('Virus Infection', ha='center')
+        # Subtitle below main title
+        self.day_text = self.fig.text(0.5, 0.94, '', ha='center', va='center', fontsize=10, animated=True)
+        # Second subtitle below the first subtitle
+        self.count_text = self.fig.text(0.5, 0.9, '', ha='center', va='center', fontsize=10, animated=True)
+
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        plt.show(block=False)
+        self.fig.canvas.draw()
+
+    def _animated_artists(self) -> list:
+        """
+        Return the artists which change from one day to the next.
+        """
+        return [self.contacts, self.nodes, self.day_text, self.count_text]
+
+    def _on_draw(self, _event: object) -> None:
+        """
+        Save the background after a full redraw (first draw, resize, ...) and draw the
+        changing artists on top of it.
+        """
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for artist in self._animated_artists():
+            self.fig.draw_artist(artist)
+
+    def draw_day(self, day: int, status: np.ndarray, contact_edges: np.ndarray) -> None:
+        """
+        Show the given day, where status holds the status of every node and contact_edges
+        is the (E, 2) array of the day's random contacts.
+        """
+        changed = np.flatnonzero(status != self.status)
+        self.colors[changed] = STATUS_RGBA[status[changed]]
+        self.status[changed] = status[changed]
+        self.nodes.set_facecolors(self.colors)
+        self.contacts.set_segments(self.positions[np.asarray(contact_edges, dtype=np.int64).reshape(-1, 2)])
+
+        counts = np.bincount(status, minlength=len(STATUS_COLORS))
+        self.day_text.set_text(f'The {day}th Day')
+        self.count_text.set_text(f'Infected: {counts[INFECTED]} / {len(status) - counts[DEAD]}')
+
+        canvas = self.fig.canvas
+        if self.background is None:
+            canvas.draw()
+        else:
+            canvas.restore_region(self.background)
+            for artist in self._animated_artists():
+                self.fig.draw_artist(artist)
+            canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+    def is_open(self) -> bool:
+        """
+        Return whether the window is still open.
+        """
+        return plt.fignum_exists(self.fig.number)
+
+    def pause(self, interval: float) -> None:
+        """
+        Keep the window responsive for interval seconds without redrawing the figure.
+        """
+        # start_event_loop waits forever when given a non-positive timeout
+        if interval > 0:
+            self.fig.canvas.start_event_loop(interval)
+
+    def show(self) -> None:
+        """
+        Keep the window open until the user closes it.
+        """
+        plt.ioff()
+        plt.show()
+
+
+class CountsRenderer:
+    """
+    A matplotlib window showing the number of people in every status over the days, for
+    populations too large to draw person by person.
+
+    It has the drawing methods of GraphRenderer, but draw_day takes the counts per status
+    (see PopulationState.counts) in place of the status of every node.
+
+    Attributes:
+        fig (plt.Figure): The figure of the window.
+        ax (plt.Axes): The axes the curves are drawn on.
+        lines (list): One curve per status code.
+        days (list[int]): The days drawn so far; days skipped by the display are left out of the curves.
+        history (list[np.ndarray]): The counts per status of every day of days.
+        day_text (plt.Text): The subtitle showing the day.
+    """
+
+    fig: plt.Figure
+    ax: plt.Axes
+    lines: list
+    days: list[int]
+    history: list[np.ndarray]
+    day_text: plt.Text
+
+    def __init__(self, total_days: int, population_size: int, figsize: tuple[int, int] = (15, 10)) -> None:
+        self.days = []
+        self.history = []
+
+        plt.ion()
+        self.fig, self.ax = plt.subplots(figsize=figsize)
+        self.lines = [self.ax.plot([], [], color=color, label=name)[0]
+                      for name, color in zip(STATUS_NAMES, STATUS_COLORS)]
+        self.ax.set_xlim(0, max(total_days, 1))
+        self.ax.set_ylim(0, population_size)
+        self.ax.set_xlabel('Day')
+        self.ax.set_ylabel('People')
+        self.ax.legend(loc='upper right')
+
+        self.fig.suptitle(f'Virus Infection ({population_size:,} people)', ha='center')
+        self.day_text = self.fig.text(0.5, 0.92, '', ha='center', va='center', fontsize=10)
+        plt.show(block=False)
+        self.fig.canvas.draw()
+
+    def draw_day(self, day: int, counts: np.ndarray, _contact_edges: np.ndarray | None = None) -> None:
+        """
+        Show the given day, where counts holds the number of people in each status.
+        """
+        self.days.append(day)
+        self.history.append(np.asarray(counts))
+        history = np.array(self.history)
+        for code, line in enumerate(self.lines):
+            line.set_data(self.days, history[:, code])
+        self.day_text.set_text(f'The {day}th Day, Infected: {counts[INFECTED]} / {counts.sum() - counts[DEAD]}')
+        self.fig.canvas.draw_idle()
+        self.fig.canvas.flush_events()
+
+    def is_open(self) -> bool:
+        """
+        Return whether the window is still open.
+        """
+        return plt.fignum_exists(self.fig.number)
+
+    def pause(self, interval: float) -> None:
+        """
+        Keep the window responsive for interval seconds.
+        """
+        if interval > 0:
+            self.fig.canvas.start_event_loop(interval)
+
+    def show(self) -> None:
+        """
+        Keep the window open until the user closes it.
+        """
+        plt.ioff()
+        plt.show()
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy", "matplotlib.pyplot", "matplotlib.collections", "matplotlib.colors",
+                              "population", "contacts"],
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            # 'disabled': ["E9999"]
+        })
@@ -0,0 +1,229 @@
+"""
+The purpose of this document is to compare policies on the same outbreak, instead of
+running generate_graph or simulate_history once per policy.
+
+Every such run would build its own population, households and initial infections from
+scratch, so two policies are never compared on the same people, and most of a short run is
+spent setting it up. run_scenarios sets up the visualization model once (see SharedSetup):
+
+    the household layer of the contact network, which no policy changes
+    the population state, with its initial infections
+    the position of the random streams after the setup
+
+and every scenario forks it: the household arrays and the family ids are shared, as they are
+never written to, only the status and day counters are copied, and every scenario restarts
+the random streams from the same position. The scenarios therefore draw the same numbers,
+e.g. the same contact counts every day and the same first contacts, for as long as the
+policies let them (common random numbers), so the difference between two curves comes from
+the policies rather than from luck, with far less variance than between independent runs.
+
+A scenario is a Policy (see simulation.py), or a dictionary of the policy keys of
+parse_parameters ("isolate_force", "quarantine", "lockdown_threshold", ...) which changes
+the base parameters. The scenarios run in a pool of processes; where processes are forked,
+the workers see the shared setup copy-on-write, so it is neither copied nor pickled, and
+elsewhere it is sent once to every worker. The result is a ScenarioComparison, whose plot
+draws the curves of every scenario side by side.
+"""
+
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any
+import copy
+import multiprocessing
+import os
+import numpy as np
+import matplotlib.pyplot as plt
+from population import PopulationState, STATUS_NAMES, STATUS_COLORS
+from contacts import ContactNetwork
+from randomness import RandomContext, as_context, context_from_state
+from simulation import Policy
+from metrics import METRIC_COLUMNS
+from visualization import numberType, ContactTargets, parse_parameters, initialize_population, initialize_edges, \
+    run_day, create_metrics, create_policy
+
+# The parameters which shape the shared setup, and so cannot change from one scenario to another
+SHARED_PARAMETERS = ("population_size", "house_density", "initial_infected_count", "seed")
+
+# The setup of the scenarios run by this process, see _share
+_shared: SharedSetup | None = None
+
+
+class SharedSetup:
+    """
+    What every scenario of a comparison starts from, built once, see the top of this file.
+
+    Attributes:
+        data (dict[str, numberType]): The base parameter dictionary of the scenarios.
+        parameters (dict[str, Any]): data, as returned by parse_parameters.
+        network (ContactNetwork): The contact network, whose household layer is shared by every scenario.
+        state (PopulationState): The population state before the first day.
+        rng_state (dict[str, Any]): The position of the random streams after the setup, see randomness.py.
+    """
+
+    data: dict[str, numberType]
+    parameters: dict[str, Any]
+    network: ContactNetwork
+    state: PopulationState
+    rng_state: dict[str, Any]
+
+    def __init__(self, data: dict[str, numberType], seed: int | RandomContext | None = None) -> None:
+        self.data = data
+        self.parameters = parse_parameters(data)
+        rng = as_context(self.parameters["seed"] if seed is None else seed)
+        self.network, self.state = initialize_population(self.parameters, rng)
+        self.rng_state = rng.get_state()
+
+    def fork(self) -> tuple[ContactNetwork, PopulationState, RandomContext]:
+        """
+        Return a network, state and random context for one scenario: the household layer and
+        family ids are shared with this setup, the rest is the scenario's own.
+        """
+        network = ContactNetwork(self.network.household_edges, self.network.size, self.network.households,
+                                 self.network.household_keys)
+        state = PopulationState(0)
+        state.status = self.state.status.copy()
+        state.days_infected = self.state.days_infected.copy()
+        state.family = self.state.family
+        state.refresh_active()
+        return network, state, context_from_state(self.rng_state)
+
+
+def _share(shared: SharedSetup) -> None:
+    """
+    Make shared the setup of the scenarios run by this process.
+    """
+    global _shared
+    _shared = shared
+
+
+def _run_scenario(scenario: Policy | dict[str, numberType]) -> np.ndarray:
+    """
+    Run scenario from the shared setup of this process and return its metrics table, see metrics.py.
+    """
+    if isinstance(scenario, Policy):
+        parameters = {**_shared.parameters, "isolate_force": scenario.isolate_force}
+        policy = copy.deepcopy(scenario)
+    else:
+        parameters = parse_parameters({**_shared.data, **scenario})
+        policy = create_policy(parameters)
+    network, state, rng = _shared.fork()
+    targets = ContactTargets(rng.generator)
+    metrics = create_metrics(parameters, state)
+    initialize_edges(network, state, parameters["contact_density"], parameters["isolate_force"], rng, targets,
+                     policy)
+    for day in range(1, parameters["total_days"] + 1):
+        run_day(network, state, parameters, rng, targets, None, policy, day)
+        metrics.end_day(day)
+    return metrics.table()
+
+
+class ScenarioComparison:
+    """
+    The metrics of every scenario of a comparison, by scenario name.
+
+    Attributes:
+        tables (dict[str, np.ndarray]): The (days, len(METRIC_COLUMNS)) metrics table of every
+                                        scenario (see metrics.py), in the order the scenarios were given.
+    """
+
+    tables: dict[str, np.ndarray]
+
+    def __init__(self, tables: dict[str, np.ndarray]) -> None:
+        self.tables = tables
+
+    def series(self, column: str) -> dict[str, np.ndarray]:
+        """
+        Return the column of METRIC_COLUMNS named column, e.g. 'infected', of every scenario.
+        """
+        index = METRIC_COLUMNS.index(column)
+        return {name: table[:, index] for name, table in self.tables.items()}
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """
+        Return the peak day, the number of contagious people on it, the total number of
+        infections and the final number of deaths of every scenario.
+        """
+        summaries = {}
+        for name, table in self.tables.items():
+            active = table[:, 1 + STATUS_NAMES.index("incubated")] + table[:, 1 + STATUS_NAMES.index("infected")]
+            peak = int(active.argmax())
+            summaries[name] = {"peak_day": int(table[peak, 0]), "peak_active": int(active[peak]),
+                               "total_infections": int(table[:, METRIC_COLUMNS.index("new_infections")].sum()),
+                               "deaths": int(table[-1, METRIC_COLUMNS.index("dead")])}
+        return summaries
+
+    def plot(self, path: str | None = None) -> plt.Figure:
+        """
+        Draw the number of people in every status over the days, one panel per scenario side
+        by side on the same scale, and save the figure to path, or show it if path is None.
+        """
+        fig, axes = plt.subplots(1, len(self.tables), figsize=(4 * len(self.tables), 4), sharey=True, squeeze=False)
+        for ax, (name, table) in zip(axes[0], self.tables.items()):
+            for code, status in enumerate(STATUS_NAMES):
+                ax.plot(table[:, 0], table[:, 1 + code], color=STATUS_COLORS[code], label=status)
+            ax.set_title(name)
+            ax.set_xlabel("day")
+        axes[0][0].set_ylabel("people")
+        axes[0][0].legend()
+        fig.tight_layout()
+        if path is None:
+            plt.show()
+        else:
+            fig.savefig(path)
+        return fig
+
+
+def run_scenarios(data: dict[str, numberType], scenarios: dict[str, Policy | dict[str, numberType]],
+                  seed: int | RandomContext | None = None, workers: int | None = None) -> ScenarioComparison:
+    """
+    Run every scenario of scenarios, by name, on the model described by data, all from one
+    shared setup, and return their metrics (see the top of this file).
+
+    seed is an integer seed or a RandomContext, by default the "seed" key of data. workers is
+    the number of processes, by default one per CPU core; with a single worker the scenarios
+    run in this process.
+
+    Preconditions:
+    - no scenario dictionary has a key of SHARED_PARAMETERS
+    """
+    for name, scenario in scenarios.items():
+        if not isinstance(scenario, Policy) and any(key in scenario for key in SHARED_PARAMETERS):
+            raise ValueError(f"scenario {name} changes a parameter of the shared setup, one of {SHARED_PARAMETERS}")
+    shared = SharedSetup(data, seed)
+    workers = min(workers or os.cpu_count() or 1, max(len(scenarios), 1))
+
+    tables = {}
+    if workers <= 1:
+        previous = _shared
+        _share(shared)
+        try:
+            for name, scenario in scenarios.items():
+                tables[name] = _run_scenario(scenario)
+        finally:
+            _share(previous)
+    else:
+        # Forked workers inherit shared copy-on-write instead of receiving a pickled copy
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork") if "fork" in methods else None
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_share,
+                                 initargs=(shared,)) as executor:
+            futures = {executor.submit(_run_scenario, scenario): name for name, scenario in scenarios.items()}
+            for future in as_completed(futures):
+                tables[futures[future]] = future.result()
+    return ScenarioComparison({name: tables[name] for name in scenarios})
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy", "os", "copy", "multiprocessing", "typing", "concurrent.futures",
+                              "matplotlib.pyplot", "population", "contacts", "randomness", "simulation",
+                              "metrics", "visualization"],
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            # 'disabled': ["E9999"]
+        })
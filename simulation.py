@@ -2,10 +2,22 @@
 The purpose of this document is to outline possible further enhancement for encapsulating
 data needed to run the simulation. This way, faster and more efficient comparisons can be
 made when studying specific virus and policies proposed by governments.
+
+People are kept in a Population, a structure of arrays with integer status codes (see
+population.py) and one adjacency index, so that a person costs a few bytes; Person is a
+small __slots__ view on one of its rows for code that wants to handle people one at a time.
 """
 
 from __future__ import annotations
-import random
+from typing import Any
+import numpy as np
+from population import PopulationState
+from contacts import Adjacency, edge_keys
+from progression import progress
+from interventions import Intervention, PolicyEffect, intervention_from_config, detected_people, detected_share
+
+# The status words of the Person API, indexed by the status codes of population.py
+STATUS_WORDS = ('uninfected', 'incubation', 'infected', 'recovered', 'dead')
 
 
 class Virus:
@@ -23,6 +35,7 @@ class Virus:
             to either recover or die from the virus.
     """
 
+    __slots__ = ('incubation_period', 'infection_rate', 'death_rate', 'recovery_days')
     incubation_period: int
     infection_rate: float
     death_rate: float
@@ -35,11 +48,101 @@ class Virus:
         self.recovery_days = recovery_days      # Period ultil recovery or death
 
 
+class Population:
+    """
+    The people of a simulation, stored as a structure of arrays instead of one object per person.
+
+    The health of every person is kept in a PopulationState (see population.py) and their
+    connections in one edge array indexed as a CSR Adjacency (see contacts.py), in place of a
+    set of Person objects per person. Person objects are only views on one row of the store.
+
+    Attributes:
+        state (PopulationState): The status, day counter and family of every person, indexed by person id.
+        edges (np.ndarray): The (E, 2) connections between people, each stored once.
+        pending (list[np.ndarray]): Connections added since the adjacency was last built.
+    """
+
+    state: PopulationState
+    edges: np.ndarray
+    pending: list[np.ndarray]
+    _adjacency: Adjacency | None
+
+    def __init__(self, size: int) -> None:
+        self.state = PopulationState(size)
+        self.edges = np.empty((0, 2), dtype=np.int64)
+        self.pending = []
+        self._adjacency = None
+
+    def __len__(self) -> int:
+        return len(self.state)
+
+    def person(self, person_id: int) -> Person:
+        """
+        Return a Person view on the given person.
+        """
+        return Person(self, person_id)
+
+    def connect(self, u: np.ndarray | int, v: np.ndarray | int) -> None:
+        """
+        Connect every person of u to the person at the same position of v, in both directions.
+        Connections which already exist and connections of a person to themself are ignored.
+        """
+        pairs = np.column_stack([np.atleast_1d(u), np.atleast_1d(v)]).astype(np.int64)
+        self.pending.append(pairs[pairs[:, 0] != pairs[:, 1]])
+
+    @property
+    def adjacency(self) -> Adjacency:
+        """
+        Return the CSR index of the connections, rebuilding it if connections were added.
+        """
+        if self.pending or self._adjacency is None:
+            edges = np.concatenate([self.edges] + self.pending)
+            _, first = np.unique(edge_keys(edges[:, 0], edges[:, 1], len(self)), return_index=True)
+            self.edges = edges[np.sort(first)]
+            self.pending = []
+            self._adjacency = Adjacency(self.edges, len(self))
+        return self._adjacency
+
+    def neighbors(self, person_id: int) -> np.ndarray:
+        """
+        Return the ids of the people connected to the given person.
+        """
+        adjacency = self.adjacency
+        return adjacency.indices[adjacency.indptr[person_id]:adjacency.indptr[person_id + 1]]
+
+    def restore(self, state: PopulationState, edges: np.ndarray, adjacency: Adjacency) -> None:
+        """
+        Replace the people of the store with state, connected by edges whose CSR index is
+        adjacency, e.g. as saved by a checkpoint (see checkpoint.py).
+        """
+        self.state = state
+        self.edges = edges
+        self.pending = []
+        self._adjacency = adjacency
+
+    def update_status(self, virus: Virus, rng: np.random.Generator | None = None,
+                      nodes: np.ndarray | None = None) -> None:
+        """
+        Move the given people (every incubated or infected person if nodes is None) on by one day.
+
+        Incubated people become infected once they have spent virus.incubation_period days
+        incubated, and infected people die with probability virus.death_rate or recover once
+        they have spent virus.recovery_days days infected, see progression.py. The death
+        outcomes are drawn from rng in one call, or from the global numpy random state if rng is None.
+        """
+        progress(self.state, virus.incubation_period, virus.recovery_days, virus.death_rate, rng, nodes)
+
+
 class Person:
     """
     Represents an individual in a simulation of an infectious disease outbreak.
 
+    A Person is a view on one row of a Population store; its attributes are read from and
+    written to the arrays of the store.
+
     Attributes:
+        population (Population): The store holding this person.
+        person_id (int): The index of this person in the store.
         relationship (Set[Person]): A set of other Person instances to which this individual is connected,
                                     representing potential pathways for virus transmission.
         status (str): The current health status of the individual, which can be 'uninfected', 'incubation',
@@ -48,47 +151,72 @@ class Person:
                              incubation and infectious periods.
     """
 
-    status: str
-    days_infected: int
-    relationship: set
+    __slots__ = ('population', 'person_id')
+    population: Population
+    person_id: int
+
+    def __init__(self, population: Population | None = None, person_id: int = 0) -> None:
+        # A person created on their own gets a store of their own, initially 'uninfected'
+        self.population = Population(1) if population is None else population
+        self.person_id = person_id
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Person) and other.population is self.population \
+            and other.person_id == self.person_id
+
+    def __hash__(self) -> int:
+        return hash((id(self.population), self.person_id))
+
+    @property
+    def status(self) -> str:
+        """
+        The current health status of the individual.
+        """
+        return STATUS_WORDS[self.population.state.status[self.person_id]]
+
+    @status.setter
+    def status(self, value: str) -> None:
+        self.population.state.set_status(self.person_id, STATUS_WORDS.index(value))
+
+    @property
+    def days_infected(self) -> int:
+        """
+        The number of days the individual has spent in their current status.
+        """
+        return int(self.population.state.days_infected[self.person_id])
+
+    @days_infected.setter
+    def days_infected(self, value: int) -> None:
+        self.population.state.days_infected[self.person_id] = value
 
-    def __init__(self) -> None:
-        self.status = "uninfected"  # Initial health status is 'uninfected'
-        self.days_infected = 0      # Initially, the individual has not been infected
-        self.relationship = set()   # Initializes an empty set for relationships
+    @property
+    def relationship(self) -> set[Person]:
+        """
+        The people this individual is connected to.
+        """
+        return {Person(self.population, int(other)) for other in self.population.neighbors(self.person_id)}
 
     def add_connection(self, other_person: 'Person') -> None:
         """
         Adds a bidirectional connection between this person and another, representing a potential pathway for virus
         transmission.
+
+        Preconditions:
+        - other_person belongs to the same Population as this person
         """
-        # Ensure the connection is bidirectional and doesn't duplicate
-        if other_person not in self.relationship:
-            # Adding a connection from this person to the other
-            self.relationship.add(other_person)
-            # Ensuring the connection is reciprocal
-            other_person.relationship.add(self)
+        if other_person.population is not self.population:
+            raise ValueError("Only people of the same population can be connected")
+        self.population.connect(self.person_id, other_person.person_id)
 
-    def update_status(self, virus: 'Virus') -> None:
+    def update_status(self, virus: 'Virus', rng: np.random.Generator | None = None) -> None:
         """
-        Updates the individual's health status based on the current status, virus 
+        Updates the individual's health status based on the current status, virus
         characteristics, and the passage of time.
-        """
-        if self.status == "incubation":
-            self.days_infected += 1
-            if self.days_infected >= virus.incubation_period:
-                self.status = "infected"
-                self.days_infected = 0  # Reset days infected upon entering the 'infected' state
-
-            # If 'infected', determine if the person recovers or dies after the infectious period
-        elif self.status == "infected":
-            self.days_infected += 1
-            if self.days_infected >= virus.recovery_days:
-                self.status = "dead" if random.random() < virus.death_rate else "recovered"
 
-            # No action needed if the person is already 'recovered' or 'dead'
-        elif self.status in ["recovered", "dead"]:
-            pass
+        This is Population.update_status restricted to this person; the death outcome is drawn
+        from rng, e.g. the generator of a RandomContext (see randomness.py).
+        """
+        self.population.update_status(virus, rng, np.array([self.person_id]))
 
 
 class Policy:
@@ -96,22 +224,57 @@ class Policy:
     Represents a health policy or intervention strategy in a disease outbreak simulation.
 
     This class models the effects of various policy decisions, such as social distancing or quarantine measures, on the
-    spread of the virus within the population.
+    spread of the virus within the population. Every day, the measures of interventions which are in
+    effect (see interventions.py) are added to the isolation of isolate_force.
 
     Attributes:
         isolate_force (float): A measure of the stringency and effectiveness of isolation policies.
+        interventions (list[Intervention]): The measures taken when their day window and trigger allow it.
     """
 
     isolate_force: float
+    interventions: list[Intervention]
 
-    def __init__(self, isolate_force: float) -> None:
+    def __init__(self, isolate_force: float, interventions: list[Intervention] | None = None) -> None:
         self.isolate_force = isolate_force
+        self.interventions = [] if interventions is None else interventions
 
-    def enforce_policy(self) -> None:
+    def enforce_policy(self, day: int, state: PopulationState, households: Adjacency) -> PolicyEffect:
         """
-        Applies the policy's effects to the simulation.
+        Applies the policy's effects to the simulation: return how the random contacts of day
+        change, given the people of state on the eve of day and their household connections.
         """
-        return NotImplemented
+        effect = PolicyEffect(self.isolate_force)
+        if not self.interventions:
+            return effect
+        detected = detected_people(state)
+        share = detected_share(state, detected)
+        for intervention in self.interventions:
+            if intervention.in_effect(day, share):
+                intervention.apply(effect, detected, households)
+        return effect
+
+    def get_state(self) -> dict[str, Any]:
+        """
+        Return the isolation force and the measures of the policy, with whether each one is in
+        effect, as a JSON-compatible dictionary.
+        """
+        return {"isolate_force": self.isolate_force,
+                "interventions": [{**intervention.get_config(), "active": intervention.active}
+                                  for intervention in self.interventions]}
+
+
+def policy_from_state(state: dict[str, Any]) -> Policy:
+    """
+    Return the policy saved in state by get_state, with its measures in effect as they were.
+    """
+    interventions = []
+    for config in state["interventions"]:
+        config = dict(config)
+        active = config.pop("active")
+        interventions.append(intervention_from_config(config))
+        interventions[-1].active = active
+    return Policy(state["isolate_force"], interventions)
 
 
 if __name__ == "__main__":
@@ -122,10 +285,11 @@ if __name__ == "__main__":
         python_ta.check_all(config={
             'max-line-length': 120,
             'extra-imports': ["pygame", "pygame_widgets", "sys",
-                            "matplotlib", "numpy", "networkx",
+                            "matplotlib", "numpy",
                               "pygame_widgets.slider", "pygame_widgets.textbox",
                               "typing_extensions", "simulation", "visualization",
-                              "pygame_widgets.button", "random"],  # the names (strs) of imported modules
+                              "pygame_widgets.button", "population", "contacts", "progression",
+                              "interventions", "typing"],  # the names (strs) of imported modules
             'allowed-io': [],
             # 'disabled': ["E9999"]
         })
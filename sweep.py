@@ -0,0 +1,189 @@
+"""
+The purpose of this document is to sweep the parameters of the visualization model,
+i.e. run the headless model for many combinations of the keys defined by
+VirusSimulationApp.default_parameters in main.py, and record one row of summary
+metrics per run.
+
+A design is a list of parameter dictionaries, built by
+    grid_design            every combination of the listed values
+    random_design          points drawn uniformly within bounds
+    latin_hypercube_design points drawn from a Latin hypercube within bounds
+
+run_sweep schedules the runs of a design across a pool of processes. Every finished run
+is appended to a CSV log right away, so an interrupted sweep resumes from where it stopped
+by calling run_sweep again with the same arguments. Once every run has finished, the rows
+are also written column by column to a .npz file next to the log.
+"""
+
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any
+import csv
+import itertools
+import os
+import numpy as np
+from population import INFECTED, DEAD
+from headless import simulate_history
+from randomness import RandomContext
+from visualization import numberType
+
+# Parameters which only take integer values
+INTEGER_PARAMETERS = {"incubation_period", "recovery_days", "contact_density", "population_size",
+                      "initial_infected_count", "total_days"}
+METRICS = ("peak_infected", "peak_day", "total_dead")
+
+
+def grid_design(space: dict[str, list[numberType]]) -> list[dict[str, numberType]]:
+    """
+    Return every combination of the values listed for each parameter in space.
+    """
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+
+def _scale(unit: np.ndarray, bounds: dict[str, tuple | list], rng: np.random.Generator) -> list[dict]:
+    """
+    Map points of the unit hypercube, one column per key of bounds, to parameter values.
+
+    A tuple (low, high) is a numeric range, rounded for INTEGER_PARAMETERS; a list is a set
+    of choices, such as the house densities.
+    """
+    design = [{} for _ in range(len(unit))]
+    for column, (key, bound) in enumerate(bounds.items()):
+        if isinstance(bound, list):
+            indices = np.minimum((unit[:, column] * len(bound)).astype(int), len(bound) - 1)
+            values = [bound[i] for i in indices]
+        else:
+            low, high = bound
+            values = low + unit[:, column] * (high - low)
+            values = np.rint(values).astype(int).tolist() if key in INTEGER_PARAMETERS else values.tolist()
+        for point, value in zip(design, values):
+            point[key] = value
+    rng.shuffle(design)
+    return design
+
+
+def random_design(bounds: dict[str, tuple | list], runs: int, seed: int | None = None) -> list[dict]:
+    """
+    Return runs points drawn uniformly within bounds, see _scale for the format of bounds.
+    """
+    rng = np.random.default_rng(seed)
+    return _scale(rng.random((runs, len(bounds))), bounds, rng)
+
+
+def latin_hypercube_design(bounds: dict[str, tuple | list], runs: int, seed: int | None = None) -> list[dict]:
+    """
+    Return runs points of a Latin hypercube within bounds: along every parameter, each of
+    runs equal strata contains exactly one point.
+    """
+    rng = np.random.default_rng(seed)
+    strata = np.column_stack([rng.permutation(runs) for _ in bounds]).reshape(runs, len(bounds))
+    return _scale((strata + rng.random((runs, len(bounds)))) / runs, bounds, rng)
+
+
+def summarize(history: np.ndarray) -> dict[str, int]:
+    """
+    Return the summary metrics of a history returned by headless.simulate_history.
+    """
+    infected = history[:, INFECTED]
+    return {
+        "peak_infected": int(infected.max()),
+        "peak_day": int(infected.argmax()),
+        "total_dead": int(history[-1, DEAD]),
+    }
+
+
+def _run_point(data: dict[str, numberType], seed: int) -> dict[str, int]:
+    """
+    Run one point of a sweep and return its summary metrics.
+    """
+    return summarize(simulate_history(data, seed))
+
+
+def _finished_runs(log_path: str) -> dict[int, dict[str, str]]:
+    """
+    Return the rows already written to the log of an interrupted sweep, keyed by run.
+    A row cut short by the interruption is ignored, so that run is done again, and so is
+    any line that is not a run, such as a repeated header.
+    """
+    if not os.path.exists(log_path):
+        return {}
+    with open(log_path, newline='') as log:
+        return {int(row["run"]): row for row in csv.DictReader(log)
+                if str(row.get("run")).isdigit() and row.get(METRICS[-1])}
+
+
+def _parse(value: Any) -> numberType:
+    """
+    Convert a value read back from the CSV log to a number where possible.
+    """
+    if not isinstance(value, str):
+        return value
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+
+def run_sweep(base: dict[str, numberType], design: list[dict[str, numberType]], output_path: str,
+              seed: int | None = None, workers: int | None = None) -> dict[str, np.ndarray]:
+    """
+    Run every point of design on top of the base parameters and return the summary table
+    as one array per column.
+
+    Rows are appended to output_path + '.csv' as runs finish, and the finished table is
+    written to output_path + '.npz'. Runs already present in the CSV are not run again.
+    The seed of every run is derived from seed, so resuming gives the same table.
+    """
+    log_path = output_path + ".csv"
+    keys = sorted({key for point in design for key in point})
+    columns = ["run", *keys, "seed", *METRICS]
+    seeds = RandomContext(seed).spawn_seeds(len(design))
+    finished = _finished_runs(log_path)
+    pending = [run for run in range(len(design)) if run not in finished]
+    # A sweep interrupted before its first run finished has already written the header
+    has_header = os.path.exists(log_path) and os.path.getsize(log_path) > 0
+
+    with open(log_path, "a", newline='') as log:
+        writer = csv.DictWriter(log, fieldnames=columns)
+        if not has_header:
+            writer.writeheader()
+
+        def record(run: int, metrics: dict[str, int]) -> None:
+            row = {"run": run, **design[run], "seed": seeds[run], **metrics}
+            writer.writerow(row)
+            log.flush()
+            finished[run] = row
+
+        workers = min(workers or os.cpu_count() or 1, max(len(pending), 1))
+        if workers <= 1:
+            for run in pending:
+                record(run, _run_point({**base, **design[run]}, seeds[run]))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(_run_point, {**base, **design[run]}, seeds[run]): run
+                           for run in pending}
+                for future in as_completed(futures):
+                    record(futures[future], future.result())
+
+    rows = [finished[run] for run in range(len(design))]
+    table = {column: np.array([_parse(row[column]) for row in rows]) for column in columns}
+    np.savez(output_path + ".npz", **table)
+    return table
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy", "os", "csv", "itertools", "typing", "concurrent.futures",
+                              "population", "headless", "randomness", "visualization"],
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': ["_finished_runs", "run_sweep"],
+            # 'disabled': ["E9999"]
+        })
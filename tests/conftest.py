@@ -0,0 +1,13 @@
+"""
+The purpose of this document is to let the tests import the modules of the simulation, which
+sit in the folder above, ahead of the older demo scripts kept in this folder (e.g. main.py).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pytest puts this folder back in front of the path before importing every test file, so load
+# the main module of the simulation now, before the demo main.py of this folder can shadow it
+import main  # noqa: E402,F401
@@ -0,0 +1,100 @@
+"""
+The purpose of this document is to check that runs resumed from a checkpoint (see
+checkpoint.py) continue exactly like the runs they were saved from, and that the
+checkpoints of a directory are pruned without losing the newest one.
+"""
+
+from __future__ import annotations
+import os
+import numpy as np
+import pytest
+from randomness import RandomContext
+from headless import simulate_history
+from simulation import Virus, Policy
+from interventions import Quarantine
+from checkpoint import load_checkpoint
+from transmission import TRANSMISSION_ENGINES
+from visualization import ContactTargets, parse_parameters, initialize_population, initialize_edges, run_day, \
+    save_run, create_metrics, create_policy
+from main import Simulation, resume_simulation
+
+# A small model which spreads over the whole population within the run
+SMALL_RUN = {"population_size": 400, "initial_infected_count": 5, "total_days": 30, "seed": 7}
+
+
+@pytest.mark.parametrize("engine", sorted(TRANSMISSION_ENGINES))
+def test_headless_resume_is_identical(engine: str, tmp_path: str) -> None:
+    """
+    A headless run resumed from a checkpoint ends exactly like the run it was saved from.
+    """
+    data = {**SMALL_RUN, "engine": engine, "quarantine": True, "lockdown_threshold": 0.05}
+    directory = os.path.join(tmp_path, "checkpoints")
+    full = simulate_history(data)
+    simulate_history({**data, "total_days": 12, "checkpoint_every": 6, "checkpoint_dir": directory})
+    assert load_checkpoint(directory).day == 12
+    resumed = simulate_history({**data, "checkpoint_dir": directory, "resume": True})
+    assert np.array_equal(full, resumed)
+
+
+def test_simulation_resume_is_identical(tmp_path: str) -> None:
+    """
+    A Simulation resumed from a checkpoint ends exactly like the one it was saved from.
+    """
+    virus = Virus(3, 0.3, 0.05, 5)
+    full = Simulation(2000, 10, virus, Policy(0.2, [Quarantine()]), RandomContext(3)).run(30)
+    simulation = Simulation(2000, 10, virus, Policy(0.2, [Quarantine()]), RandomContext(3))
+    simulation.run(15, str(tmp_path), 5)
+    resumed = resume_simulation(str(tmp_path))
+    assert resumed.day == 15
+    rest = resumed.run(15)
+    for name, values in full.items():
+        if name != "day":
+            assert np.array_equal(values[15:], rest[name])
+
+
+def test_new_run_keeps_its_checkpoint(tmp_path: str) -> None:
+    """
+    A short run in a directory holding the checkpoints of a longer one keeps its own
+    checkpoint, which a resumed run can then continue.
+    """
+    directory = os.path.join(tmp_path, "checkpoints")
+    data = {**SMALL_RUN, "checkpoint_every": 10, "checkpoint_dir": directory}
+    simulate_history({**data, "total_days": 100})
+    simulate_history({**data, "total_days": 15})
+    assert sorted(os.listdir(directory)) == ["day_000010", "latest.json"]
+    assert load_checkpoint(directory).day == 10
+    resumed = simulate_history({**data, "total_days": 20, "resume": True})
+    assert np.array_equal(resumed, simulate_history({**SMALL_RUN, "total_days": 20}))
+    assert load_checkpoint(directory).day == 20
+
+
+def test_headless_resumes_a_visualization_checkpoint(tmp_path: str) -> None:
+    """
+    simulate_history resumes a checkpoint saved by the day loop of generate_graph, which
+    keeps no history of its own.
+    """
+    directory = os.path.join(tmp_path, "checkpoints")
+    data = {**SMALL_RUN, "checkpoint_dir": directory}
+    parameters = parse_parameters(data)
+    rng = RandomContext(SMALL_RUN["seed"])
+    network, state = initialize_population(parameters, rng)
+    targets = ContactTargets(rng.generator)
+    policy = create_policy(parameters)
+    metrics = create_metrics(parameters, state)
+    initialize_edges(network, state, parameters["contact_density"], parameters["isolate_force"], rng, targets,
+                     policy)
+    for day in range(1, 13):
+        run_day(network, state, parameters, rng, targets, None, policy, day)
+        metrics.end_day(day)
+    save_run(directory, 12, network, state, targets, rng, parameters, metrics, policy=policy, fresh=True)
+    resumed = simulate_history({**data, "resume": True})
+    assert np.array_equal(resumed, simulate_history(SMALL_RUN))
+
+
+def test_headless_rejects_a_simulation_checkpoint(tmp_path: str) -> None:
+    """
+    simulate_history refuses a checkpoint saved by the Simulation of main.py.
+    """
+    Simulation(400, 5, Virus(3, 0.3, 0.05, 5), Policy(0.2), RandomContext(3)).run(10, str(tmp_path), 5)
+    with pytest.raises(ValueError):
+        simulate_history({**SMALL_RUN, "checkpoint_dir": str(tmp_path), "resume": True})
@@ -0,0 +1,46 @@
+"""
+The purpose of this document is to check that visualization.ContactTargets draws the same
+truncated normal contact counts as generate_number_normally, in bulk.
+"""
+
+from __future__ import annotations
+import numpy as np
+from visualization import ContactTargets, generate_number_normally, MAX_CONTACTS, CONTACT_BUFFER_DAYS
+
+
+def test_counts_are_truncated_normal_draws() -> None:
+    """
+    The counts of a day are the truncated draws of generate_number_normally, scaled by the
+    density left by the isolation force and capped at MAX_CONTACTS.
+    """
+    size, density, isolation_force = 1000, 24, 0.25
+    expected = generate_number_normally(1.0, 1.0, size * CONTACT_BUFFER_DAYS, np.random.default_rng(3))
+    targets = ContactTargets(np.random.default_rng(3))
+    for day in range(CONTACT_BUFFER_DAYS):
+        unit = expected[day * size:(day + 1) * size]
+        counts = targets.draw(size, density, isolation_force)
+        scaled = (unit * (density * (1 - isolation_force))).astype(np.int64)
+        assert np.array_equal(counts, np.minimum(scaled, MAX_CONTACTS))
+    assert targets.position == len(targets.buffer)
+
+
+def test_buffer_is_refilled_in_bulk() -> None:
+    """
+    Once the buffered days are used up, the buffer is refilled at once, with counts staying
+    within center +- length / 2 of the density.
+    """
+    targets = ContactTargets(np.random.default_rng(5))
+    for _ in range(CONTACT_BUFFER_DAYS + 1):
+        counts = targets.draw(200, 6, 0.0)
+        assert counts.min() >= 3 and counts.max() <= 9
+    assert len(targets.buffer) == 200 * CONTACT_BUFFER_DAYS
+    assert targets.position == 200
+
+
+def test_generate_number_normally_is_clipped() -> None:
+    """
+    generate_number_normally stays within center +- length / 2.
+    """
+    numbers = generate_number_normally(5, 4, 10000, np.random.default_rng(0))
+    assert numbers.min() >= 3 and numbers.max() <= 7
+    assert abs(numbers.mean() - 5) < 0.05
@@ -0,0 +1,51 @@
+"""
+The purpose of this document is to check the households built by contacts.build_households,
+and the daily contact layer of contacts.ContactNetwork.
+"""
+
+import numpy as np
+from contacts import build_households, edge_keys, ContactNetwork
+
+
+def test_households_are_cliques_of_one_family() -> None:
+    """
+    Every household edge joins two people of the same family, every family is one clique, and
+    people without a family have no household edge.
+    """
+    rng = np.random.default_rng(1)
+    size = 1000
+    family, edges = build_households(size, rng.integers(1, 7, size=size), 4, rng)
+    assert np.all(family[edges[:, 0]] == family[edges[:, 1]])
+    assert np.all(family[edges] >= 0)
+    keys = edge_keys(edges[:, 0], edges[:, 1], size)
+    assert len(np.unique(keys)) == len(keys)
+    members = np.bincount(family[family >= 0])
+    assert len(edges) == int((members * (members - 1) // 2).sum())
+
+
+def test_rewire_replaces_the_contact_layer_in_place() -> None:
+    """
+    Every day's contacts join two different living people who are not in the same household,
+    at most once each, are no more than the people want, and are written to the same buffer
+    as the day before.
+    """
+    rng = np.random.default_rng(2)
+    size = 2000
+    family, edges = build_households(size, rng.integers(1, 7, size=size), 4, rng)
+    network = ContactNetwork(edges, size)
+    alive = np.setdiff1d(np.arange(size), rng.choice(size, 100, replace=False))
+    buffers = set()
+    for _ in range(3):
+        targets = rng.integers(0, 11, size)
+        contacts = network.rewire(alive, targets, rng)
+        buffers.add(id(network.contact_buffer))
+        assert len(contacts) > 0
+        assert np.all(contacts[:, 0] != contacts[:, 1])
+        assert np.all(np.isin(contacts, alive))
+        keys = edge_keys(contacts[:, 0], contacts[:, 1], size)
+        assert len(np.unique(keys)) == len(keys)
+        assert not np.any(np.isin(keys, network.household_keys))
+        # Every contact is made by one person short of their target, counting their household
+        wanted = np.maximum(targets[alive] - network.households.degree()[alive], 0)
+        assert len(contacts) <= wanted.sum()
+    assert len(buffers) == 1
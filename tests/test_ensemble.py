@@ -0,0 +1,17 @@
+"""
+The purpose of this document is to check that an ensemble (see ensemble.py) does not depend on
+the number of worker processes it runs on.
+"""
+
+from ensemble import run_ensemble
+
+SMALL_RUN = {"population_size": 400, "initial_infected_count": 5, "total_days": 15, "seed": 7}
+
+
+def test_ensemble_does_not_depend_on_workers() -> None:
+    """
+    An ensemble gives the same replicates whatever the number of worker processes.
+    """
+    serial = run_ensemble(SMALL_RUN, 4, seed=11, workers=1)
+    parallel = run_ensemble(SMALL_RUN, 4, seed=11, workers=2)
+    assert sorted(h.tobytes() for h in serial.histories) == sorted(h.tobytes() for h in parallel.histories)
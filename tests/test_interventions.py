@@ -0,0 +1,84 @@
+"""
+The purpose of this document is to check the triggers of the measures of interventions.py, and
+what each measure does to the contacts of a day.
+"""
+
+from __future__ import annotations
+import numpy as np
+import pytest
+from population import PopulationState, INCUBATED, INFECTED, DEAD
+from contacts import Adjacency
+from interventions import Intervention, Lockdown, Quarantine, HouseholdIsolation
+from simulation import Policy, policy_from_state
+
+
+def _outbreak() -> tuple[PopulationState, Adjacency]:
+    """
+    Return 10 people, of whom 0 and 5 are infected, 1 is incubated and 9 is dead, living in
+    the households {0, 1, 2} and {5, 6}.
+    """
+    state = PopulationState(10)
+    state.status[[0, 5]] = INFECTED
+    state.status[1] = INCUBATED
+    state.status[9] = DEAD
+    state.refresh_active()
+    return state, Adjacency(np.array([[0, 1], [0, 2], [1, 2], [5, 6]]), 10)
+
+
+def test_intervention_is_abstract() -> None:
+    """
+    A measure must say what it does.
+    """
+    with pytest.raises(TypeError):
+        Intervention()
+
+
+def test_trigger_has_hysteresis() -> None:
+    """
+    A measure starts once the detected share reaches its threshold and is lifted only once
+    the share falls below its release, half the threshold by default.
+    """
+    quarantine = Quarantine(threshold=0.1)
+    shares = [0.05, 0.1, 0.07, 0.05, 0.04, 0.07, 0.1]
+    assert [quarantine.in_effect(day, share) for day, share in enumerate(shares)] == \
+        [False, True, True, True, False, False, True]
+
+
+def test_measure_is_only_in_effect_in_its_window() -> None:
+    """
+    A measure with a threshold of 0 is in effect from its start day to its end day.
+    """
+    lockdown = Lockdown(start_day=3, end_day=5)
+    assert [lockdown.in_effect(day, 0.0) for day in range(1, 8)] == [False, False, True, True, True, False, False]
+
+
+def test_measures_of_a_policy() -> None:
+    """
+    Quarantine isolates the infected people, household isolation their households too, and a
+    lockdown scales the contacts which are left.
+    """
+    state, households = _outbreak()
+    assert np.array_equal(Policy(0.0, [Quarantine()]).enforce_policy(1, state, households).isolated, [0, 5])
+    effect = Policy(0.5, [HouseholdIsolation(), Lockdown(0.5)]).enforce_policy(1, state, households)
+    assert np.array_equal(effect.isolated, [0, 1, 2, 5, 6])
+    assert effect.isolation_force == pytest.approx(0.75)
+    assert np.array_equal(effect.contactable(np.arange(10)), [3, 4, 7, 8, 9])
+
+
+def test_policy_state_keeps_the_measures_in_effect() -> None:
+    """
+    A policy restored from get_state keeps the measures which were in effect, so they are
+    lifted at the release share rather than started at the threshold.
+    """
+    state, households = _outbreak()
+    policy = Policy(0.1, [Quarantine(threshold=0.2, release=0.1)])
+    # 2 of the 9 living people are detected
+    assert len(policy.enforce_policy(1, state, households).isolated) == 2
+    restored = policy_from_state(policy.get_state())
+    assert restored.get_state() == policy.get_state()
+    state.status[5] = INCUBATED
+    state.refresh_active()
+    # 1 of 9 is between the release and the threshold
+    assert len(restored.enforce_policy(2, state, households).isolated) == 1
+    fresh = Policy(0.1, [Quarantine(threshold=0.2, release=0.1)])
+    assert len(fresh.enforce_policy(2, state, households).isolated) == 0
@@ -0,0 +1,54 @@
+"""
+The purpose of this document is to check the family layout of layout.py and its disk cache.
+"""
+
+from __future__ import annotations
+import os
+import numpy as np
+import pytest
+import layout
+from randomness import RandomContext
+
+FAMILY = np.repeat(np.arange(50, dtype=np.int32), 4)
+
+
+def test_families_are_clustered() -> None:
+    """
+    The members of a family sit within the cluster around their lattice point.
+    """
+    positions = layout.family_layout(FAMILY, np.random.default_rng(0))
+    assert positions.shape == (len(FAMILY), 2)
+    distances = np.linalg.norm(positions[:, None] - positions[None], axis=2)
+    same = FAMILY[:, None] == FAMILY[None]
+    # 50 families lie on a lattice of 8 columns over the width 2
+    cluster = 2 * layout.CLUSTER_RADIUS * 2 / 8 * layout.LAYOUT_SCALE
+    assert distances[same].max() <= cluster
+    assert np.median(distances[~same]) > 2 * cluster
+
+
+def test_layout_is_cached(tmp_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    A seeded layout is computed once and then read back from the cache, and another
+    population with the same size and seed gets its own.
+    """
+    first = layout.cached_family_layout(FAMILY, 4, RandomContext(3), str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 1
+    assert np.array_equal(first, layout.family_layout(FAMILY, RandomContext(3).generator))
+
+    def not_computed(*_args: object) -> np.ndarray:
+        raise AssertionError("the cached layout was computed again")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(layout, "family_layout", not_computed)
+        assert np.array_equal(layout.cached_family_layout(FAMILY, 4, RandomContext(3), str(tmp_path)), first)
+
+    layout.cached_family_layout(FAMILY[::-1].copy(), 4, RandomContext(3), str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_unseeded_layout_is_not_cached(tmp_path: str) -> None:
+    """
+    A layout drawn without a seed never repeats, so it is not written to the cache.
+    """
+    layout.cached_family_layout(FAMILY, 4, RandomContext(), str(tmp_path))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,87 @@
+"""
+The purpose of this document is to check the numbers EpidemicMetrics of metrics.py keeps from
+the transitions of a population.
+"""
+
+from __future__ import annotations
+import math
+import os
+import numpy as np
+import pytest
+from population import PopulationState, INCUBATED, INFECTED, RECOVERED, DEAD
+from metrics import EpidemicMetrics, METRIC_COLUMNS
+
+
+def _outbreak() -> PopulationState:
+    """
+    Return 10 people, of whom 0 is infected and 1 is incubated.
+    """
+    state = PopulationState(10)
+    state.set_status(0, INFECTED)
+    state.set_status(1, INCUBATED)
+    state.refresh_active()
+    return state
+
+
+def test_new_infections_count_the_flows_into_contagion() -> None:
+    """
+    New infections count the healthy and recovered people who became contagious, once each,
+    and not the incubated people who became infected.
+    """
+    state = _outbreak()
+    metrics = EpidemicMetrics(state, 4.0)
+    state.set_status(np.array([2, 3, 3]), INCUBATED)
+    state.set_status(1, INFECTED)
+    state.set_status(0, RECOVERED)
+    metrics.end_day(1)
+    state.set_status(0, INFECTED)
+    state.set_status(4, DEAD)
+    metrics.end_day(2)
+    state.set_status(np.arange(5, 10), DEAD)
+    state.set_status(np.arange(4), DEAD)
+    metrics.end_day(3)
+
+    columns = metrics.columns()
+    assert columns["day"].tolist() == [0, 1, 2, 3]
+    assert columns["new_infections"].tolist() == [0, 2, 1, 0]
+    # 2 contagious people the day before, infecting 2 then 1 people a day for 4 days
+    assert columns["effective_r"][1] == pytest.approx(2 / 2 * 4)
+    assert columns["effective_r"][2] == pytest.approx(1 / 3 * 4)
+    assert columns["healthy"].tolist() == [8, 6, 5, 0]
+    assert columns["dead"].tolist() == [0, 0, 1, 10]
+    assert metrics.summary() == {"peak_day": 2, "peak_active": 4, "total_infections": 3, "deaths": 10}
+
+
+def test_effective_r_is_nan_without_contagious_people() -> None:
+    """
+    Nobody contagious the day before leaves the effective R undefined.
+    """
+    metrics = EpidemicMetrics(PopulationState(5), 4.0)
+    metrics.end_day(1)
+    assert math.isnan(metrics.columns()["effective_r"][1])
+
+
+def test_resumed_metrics_continue_the_table(tmp_path: str) -> None:
+    """
+    A collector given the table of a checkpoint keeps the days up to its own first day, and
+    the exports hold the whole table.
+    """
+    state = _outbreak()
+    metrics = EpidemicMetrics(state, 4.0)
+    for day in (1, 2, 3):
+        state.set_status(day + 1, INCUBATED)
+        metrics.end_day(day)
+    resumed = EpidemicMetrics(state, 4.0, 2, metrics.table())
+    assert np.array_equal(resumed.table(), metrics.table()[:3], equal_nan=True)
+    assert resumed.history().tolist() == metrics.table()[:3, 1:6].astype(int).tolist()
+
+    path = os.path.join(tmp_path, "metrics")
+    metrics.save(path + ".csv")
+    metrics.save(path + ".npz")
+    table = np.loadtxt(path + ".csv", delimiter=",", skiprows=1)
+    # The effective R is written with 6 significant digits
+    assert np.allclose(table, metrics.table(), rtol=1e-5, equal_nan=True)
+    with open(path + ".csv") as file:
+        assert file.readline().strip() == ",".join(METRIC_COLUMNS)
+    with np.load(path + ".npz") as columns:
+        assert columns["new_infections"].tolist() == [0, 1, 1, 1]
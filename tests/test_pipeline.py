@@ -0,0 +1,87 @@
+"""
+The purpose of this document is to check that play in pipeline.py shows every day the worker
+simulates, with that day's contacts, and raises the errors of the worker.
+"""
+
+from __future__ import annotations
+from typing import Callable
+import numpy as np
+import pytest
+from population import PopulationState
+from pipeline import SimulationWorker, play
+
+
+class FakeRenderer:
+    """
+    Records the days it is asked to draw instead of drawing them.
+
+    Attributes:
+        days (list[tuple[int, np.ndarray, np.ndarray]]): The day, status and contacts of every drawn day.
+    """
+
+    days: list[tuple[int, np.ndarray, np.ndarray]]
+
+    def __init__(self) -> None:
+        self.days = []
+
+    def is_open(self) -> bool:
+        """
+        Return True, the window is never closed.
+        """
+        return True
+
+    def draw_day(self, day: int, status: np.ndarray, contact_edges: np.ndarray) -> None:
+        """
+        Record the given day.
+        """
+        self.days.append((day, status, contact_edges))
+
+    def pause(self, _interval: float) -> None:
+        """
+        Do not wait.
+        """
+
+
+def _step(state: PopulationState, buffer: np.ndarray) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Return a step which writes the contacts of every day into buffer, in place, as
+    ContactNetwork.rewire does, and counts the days in the status of person 0.
+    """
+    def step(_edges: np.ndarray) -> np.ndarray:
+        state.status[0] += 1
+        buffer[:] = [[0, state.status[0]], [1, 2]]
+        return buffer
+    return step
+
+
+def test_play_draws_the_contacts_of_every_day() -> None:
+    """
+    Every day is drawn with its own contacts, although the worker overwrites them in place.
+    """
+    state = PopulationState(8)
+    buffer = np.empty((2, 2), dtype=np.int64)
+    renderer = FakeRenderer()
+    play(renderer, SimulationWorker(_step(state, buffer), state, 5, buffer), 0)
+    assert [day for day, _, _ in renderer.days] == [1, 2, 3, 4, 5]
+    for day, status, contacts in renderer.days:
+        assert status[0] == day
+        assert np.array_equal(contacts, [[0, day], [1, 2]])
+
+
+def test_play_raises_the_error_of_the_worker() -> None:
+    """
+    An error raised on the worker is raised again by play, after the days before it are drawn.
+    """
+    state = PopulationState(8)
+    buffer = np.empty((2, 2), dtype=np.int64)
+    step = _step(state, buffer)
+
+    def failing_step(edges: np.ndarray) -> np.ndarray:
+        if state.status[0] == 3:
+            raise RuntimeError("day 4 failed")
+        return step(edges)
+
+    renderer = FakeRenderer()
+    with pytest.raises(RuntimeError, match="day 4 failed"):
+        play(renderer, SimulationWorker(failing_step, state, 5, buffer), 0)
+    assert [day for day, _, _ in renderer.days] == [1, 2, 3]
@@ -0,0 +1,51 @@
+"""
+The purpose of this document is to check what the Profiler of profiling.py records about the
+phases of a run.
+"""
+
+from __future__ import annotations
+import numpy as np
+import pytest
+from profiling import Profiler
+
+
+def _run(profiler: Profiler) -> np.ndarray:
+    """
+    Run two days of one phase allocating 8 MB each, and return what they allocated.
+    """
+    kept = []
+    for day in (1, 2):
+        profiler.begin_day(day)
+        with profiler.phase("allocate"):
+            kept.append(np.ones(2 ** 20))
+    profiler.stop_capture()
+    return np.array(kept)
+
+
+def test_phases_record_their_allocations() -> None:
+    """
+    A phase records the bytes it allocated and kept.
+    """
+    profiler = Profiler()
+    try:
+        _run(profiler)
+    finally:
+        profiler.close()
+    assert [event.day for event in profiler.events] == [1, 2]
+    assert all(event.allocated >= 2 ** 23 for event in profiler.events)
+    assert profiler.day_peaks[2] >= 2 ** 23
+
+
+def test_concurrent_profiler_tracks_no_allocations(capsys: pytest.CaptureFixture) -> None:
+    """
+    A profiler whose phases run on several threads at once times them, but does not count
+    allocations, and its report says so.
+    """
+    profiler = Profiler(concurrent=True)
+    _run(profiler)
+    assert not profiler.track_allocations
+    assert len(profiler.events) == 2
+    assert all(event.allocated == 0 for event in profiler.events)
+    assert profiler.day_peaks == {}
+    profiler.report()
+    assert "allocations not tracked" in capsys.readouterr().out
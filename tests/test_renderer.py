@@ -0,0 +1,61 @@
+"""
+The purpose of this document is to check that the renderers of renderer.py update their
+artists in place from one day to the next.
+"""
+
+from __future__ import annotations
+from typing import Iterator
+import numpy as np
+import matplotlib.pyplot as plt
+import pytest
+from population import HEALTHY, INCUBATED, INFECTED, DEAD, STATUS_NAMES
+from renderer import GraphRenderer, CountsRenderer, STATUS_RGBA
+
+
+@pytest.fixture(autouse=True)
+def off_screen() -> Iterator[None]:
+    """
+    Draw off-screen, and close the figures of every test.
+    """
+    plt.switch_backend("Agg")
+    yield
+    plt.close("all")
+
+
+def test_graph_renderer_updates_its_artists() -> None:
+    """
+    A day recolors the nodes whose status changed and replaces the contact segments, on the
+    artists created once.
+    """
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-5, 5, (20, 2))
+    status = np.full(20, HEALTHY, dtype=np.uint8)
+    renderer = GraphRenderer(positions, np.array([[0, 1], [2, 3]]), status)
+    nodes, contacts = renderer.nodes, renderer.contacts
+
+    for day in (1, 2):
+        status = status.copy()
+        status[rng.choice(20, 5, replace=False)] = rng.choice([INCUBATED, INFECTED, DEAD], 5)
+        edges = rng.integers(0, 20, (day * 3, 2))
+        renderer.draw_day(day, status, edges)
+        assert renderer.nodes is nodes and renderer.contacts is contacts
+        assert np.array_equal(renderer.status, status)
+        assert np.array_equal(renderer.colors, STATUS_RGBA[status])
+        assert np.allclose(np.array(contacts.get_segments()), positions[edges])
+        assert renderer.day_text.get_text() == f"The {day}th Day"
+    assert renderer.is_open()
+
+
+def test_counts_renderer_draws_the_days_shown() -> None:
+    """
+    The curves of the counts renderer hold the days it was asked to draw.
+    """
+    renderer = CountsRenderer(10, 100)
+    counts = [np.array([90, 5, 5, 0, 0]), np.array([80, 10, 8, 1, 1])]
+    renderer.draw_day(1, counts[0])
+    renderer.draw_day(3, counts[1])
+    for code, line in enumerate(renderer.lines):
+        days, values = line.get_data()
+        assert list(days) == [1, 3]
+        assert list(values) == [counts[0][code], counts[1][code]]
+    assert len(renderer.lines) == len(STATUS_NAMES)
@@ -0,0 +1,62 @@
+"""
+The purpose of this document is to check that the scenarios of scenarios.py share their setup
+and their random numbers, so that they differ only where their policies do.
+"""
+
+from __future__ import annotations
+import numpy as np
+import pytest
+from population import STATUS_NAMES
+from simulation import Policy
+from interventions import Quarantine
+from headless import simulate_history
+from scenarios import run_scenarios
+
+DATA = {"population_size": 400, "initial_infected_count": 5, "total_days": 20, "seed": 4}
+
+
+def _counts(table: np.ndarray) -> np.ndarray:
+    """
+    Return the status counts of a metrics table.
+    """
+    return table[:, 1:1 + len(STATUS_NAMES)].astype(np.int64)
+
+
+def test_scenario_without_changes_is_the_headless_run() -> None:
+    """
+    A scenario which changes nothing runs exactly as simulate_history does on the same data.
+    """
+    comparison = run_scenarios(DATA, {"base": {}}, workers=1)
+    assert np.array_equal(_counts(comparison.tables["base"]), simulate_history(DATA))
+
+
+def test_scenarios_share_random_numbers() -> None:
+    """
+    A policy which starts on day 10 leaves the first days exactly as in the scenario without
+    it, and a Policy runs as the dictionary describing it, in a pool as in this process.
+    """
+    scenarios = {"none": {}, "late quarantine": {"quarantine": True, "policy_start": 10},
+                 "isolation": Policy(0.5), "isolation dict": {"isolate_force": 0.5},
+                 "quarantine": Policy(0.0, [Quarantine()])}
+    serial = run_scenarios(DATA, scenarios, workers=1)
+    pooled = run_scenarios(DATA, scenarios, workers=2)
+    assert list(pooled.tables) == list(scenarios)
+    for name in scenarios:
+        assert np.array_equal(serial.tables[name], pooled.tables[name], equal_nan=True)
+
+    tables = serial.tables
+    assert np.array_equal(tables["late quarantine"][:10], tables["none"][:10], equal_nan=True)
+    assert not np.array_equal(tables["late quarantine"], tables["none"], equal_nan=True)
+    assert not np.array_equal(tables["quarantine"], tables["none"], equal_nan=True)
+    assert np.array_equal(tables["isolation"], tables["isolation dict"], equal_nan=True)
+    infected = serial.series("infected")
+    assert infected["none"][0] == infected["quarantine"][0] == DATA["initial_infected_count"]
+    assert set(serial.summary()) == set(scenarios)
+
+
+def test_scenario_cannot_change_the_shared_setup() -> None:
+    """
+    The parameters the scenarios share cannot vary between them.
+    """
+    with pytest.raises(ValueError):
+        run_scenarios(DATA, {"bigger": {"population_size": 800}}, workers=1)
@@ -0,0 +1,58 @@
+"""
+The purpose of this document is to check that an interrupted sweep of sweep.py resumes where it
+stopped and ends with the same table as an uninterrupted one.
+"""
+
+from __future__ import annotations
+import os
+import numpy as np
+import pytest
+import sweep
+
+BASE = {"population_size": 200, "initial_infected_count": 3, "total_days": 10}
+DESIGN = sweep.grid_design({"infection_rate": [0.2, 0.5], "contact_density": [2, 4]})
+
+
+def test_interrupted_sweep_resumes(tmp_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    A sweep whose log lost its last rows, one of them cut in half, runs only those again, and
+    writes one header in all.
+    """
+    full = sweep.run_sweep(BASE, DESIGN, os.path.join(tmp_path, "full"), seed=1, workers=1)
+    output = os.path.join(tmp_path, "resumed")
+    sweep.run_sweep(BASE, DESIGN, output, seed=1, workers=1)
+    with open(output + ".csv") as log:
+        lines = log.readlines()
+    with open(output + ".csv", "w") as log:
+        log.writelines(lines[:3] + [lines[3][:5]])
+
+    runs = []
+    run_point = sweep._run_point
+
+    def counted_run_point(data: dict, seed: int) -> dict[str, int]:
+        runs.append(seed)
+        return run_point(data, seed)
+
+    monkeypatch.setattr(sweep, "_run_point", counted_run_point)
+    resumed = sweep.run_sweep(BASE, DESIGN, output, seed=1, workers=1)
+    assert len(runs) == 2
+    for column, values in full.items():
+        assert np.array_equal(values, resumed[column])
+    with open(output + ".csv") as log:
+        lines = log.read().splitlines()
+    assert [line.startswith("run,") for line in lines].count(True) == 1
+    assert len(sweep._finished_runs(output + ".csv")) == len(DESIGN)
+    assert np.array_equal(np.load(output + ".npz")["run"], np.arange(len(DESIGN)))
+
+
+def test_designs_stay_within_bounds() -> None:
+    """
+    The points of the random designs lie within their bounds, with integers where needed.
+    """
+    bounds = {"infection_rate": (0.1, 0.4), "contact_density": (1, 8), "house_density": ["low", "high"]}
+    for design in (sweep.random_design(bounds, 20, 3), sweep.latin_hypercube_design(bounds, 20, 3)):
+        assert len(design) == 20
+        for point in design:
+            assert 0.1 <= point["infection_rate"] <= 0.4
+            assert isinstance(point["contact_density"], int) and 1 <= point["contact_density"] <= 8
+            assert point["house_density"] in ("low", "high")
@@ -0,0 +1,88 @@
+"""
+The purpose of this document is to check that a trajectory recorded by trajectory.py can be read
+back at any day, after a crash and after a resumed run continued it.
+"""
+
+from __future__ import annotations
+import os
+import numpy as np
+import pytest
+from population import STATUS_NAMES
+from trajectory import Trajectory, TrajectoryRecorder, INDEX_FILE
+from headless import simulate_history
+
+SIZE = 50
+HOUSEHOLDS = np.array([[0, 1], [2, 3]])
+
+
+def _days(count: int, seed: int = 0) -> list[tuple[np.ndarray, np.ndarray]]:
+    """
+    Return the status and contacts of count made-up days, with a different number of contacts every day.
+    """
+    rng = np.random.default_rng(seed)
+    return [(rng.integers(0, len(STATUS_NAMES), SIZE).astype(np.uint8), rng.integers(0, SIZE, (day + 1, 2)))
+            for day in range(count)]
+
+
+def _record(path: str, days: list[tuple[np.ndarray, np.ndarray]], first_day: int = 0,
+            resume: bool = False) -> None:
+    """
+    Record days in path from first_day on.
+    """
+    with TrajectoryRecorder(path, SIZE, HOUSEHOLDS, np.zeros(SIZE, dtype=np.int32), None, True,
+                            first_day, resume) as recorder:
+        for status, contacts in days:
+            recorder.record(status, contacts)
+
+
+def test_any_day_can_be_read(tmp_path: str) -> None:
+    """
+    Every recorded day is read back, in any order, and other days raise an IndexError.
+    """
+    days = _days(10)
+    _record(str(tmp_path), days)
+    trajectory = Trajectory(str(tmp_path))
+    assert (trajectory.first_day, trajectory.last_day) == (0, 9)
+    for day in (7, 2, 9, 0):
+        status, contacts = days[day]
+        assert np.array_equal(trajectory.status(day), status)
+        assert np.array_equal(trajectory.contacts(day), contacts)
+        assert np.array_equal(trajectory.day_counts(day), np.bincount(status, minlength=len(STATUS_NAMES)))
+    assert np.array_equal(trajectory.households(), HOUSEHOLDS)
+    for day in (-1, 10):
+        with pytest.raises(IndexError):
+            trajectory.status(day)
+
+
+def test_incomplete_day_is_not_read(tmp_path: str) -> None:
+    """
+    A day whose index record was cut short by a crash is left out.
+    """
+    _record(str(tmp_path), _days(5))
+    path = os.path.join(tmp_path, INDEX_FILE)
+    os.truncate(path, os.path.getsize(path) - 3)
+    assert Trajectory(str(tmp_path)).last_day == 3
+
+
+def test_resumed_recording_replaces_later_days(tmp_path: str) -> None:
+    """
+    A recording continued from day 4 keeps days 0 to 4 and replaces the days after them.
+    """
+    days, later = _days(8), _days(3, 1)
+    _record(str(tmp_path), days)
+    _record(str(tmp_path), later, 4, resume=True)
+    trajectory = Trajectory(str(tmp_path))
+    assert trajectory.last_day == 7
+    for day, (status, contacts) in enumerate(days[:5] + later):
+        assert np.array_equal(trajectory.status(day), status)
+        assert np.array_equal(trajectory.contacts(day), contacts)
+
+
+def test_headless_recording_matches_history(tmp_path: str) -> None:
+    """
+    The counts recorded by a headless run are its history.
+    """
+    path = os.path.join(tmp_path, "run")
+    history = simulate_history({"population_size": 300, "initial_infected_count": 5, "total_days": 12, "seed": 2,
+                                "record_path": path})
+    assert np.array_equal(Trajectory(path).counts, history)
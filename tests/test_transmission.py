@@ -0,0 +1,67 @@
+"""
+The purpose of this document is to check that the transmission engines of transmission.py
+expose the same people along the same edges.
+"""
+
+from __future__ import annotations
+import numpy as np
+import pytest
+from population import HEALTHY, INCUBATED, INFECTED
+from randomness import RandomContext
+from transmission import TRANSMISSION_ENGINES
+from visualization import ContactTargets, initialize_population, initialize_edges
+
+PARAMETERS = {"population_size": 500, "house_density": 4, "initial_infected_count": 10}
+
+
+def _contagious_after(engine: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return who was contagious after one day of engine at infection rate 1, and who should
+    have been, i.e. the contagious people and the healthy people next to them.
+    """
+    rng = RandomContext(5)
+    network, state = initialize_population(PARAMETERS, rng)
+    initialize_edges(network, state, 5, 0.0, rng, ContactTargets(rng.generator))
+    edges = np.concatenate(network.layers())
+    contagious = np.isin(state.status, (INCUBATED, INFECTED))
+    exposed = np.concatenate([edges[contagious[edges[:, 0]], 1], edges[contagious[edges[:, 1]], 0]])
+    expected = contagious.copy()
+    expected[exposed[state.status[exposed] == HEALTHY]] = True
+    TRANSMISSION_ENGINES[engine](network, state, 1.0, rng)
+    return np.isin(state.status, (INCUBATED, INFECTED)), expected
+
+
+@pytest.mark.parametrize("engine", ["vectorized", "frontier"])
+def test_engines_infect_the_neighbors_of_the_contagious(engine: str) -> None:
+    """
+    At infection rate 1, every healthy neighbor of a contagious person is infected.
+    """
+    after, expected = _contagious_after(engine)
+    assert np.array_equal(after, expected)
+
+
+def test_python_engine_infects_at_least_the_neighbors_of_the_contagious() -> None:
+    """
+    The python engine also lets the people it infects spread along the later edges of the day.
+    """
+    after, expected = _contagious_after("python")
+    assert np.all(after[expected])
+
+
+def test_engines_expose_the_same_end_of_contagious_households() -> None:
+    """
+    Along a household edge between two contagious people, every engine exposes the same
+    person, whose day counter restarts.
+    """
+    exposed = {}
+    for engine in sorted(TRANSMISSION_ENGINES):
+        rng = RandomContext(11)
+        network, state = initialize_population({**PARAMETERS, "initial_infected_count": 0}, rng)
+        state.status[:] = INCUBATED
+        state.days_infected[:] = 3
+        state.refresh_active()
+        TRANSMISSION_ENGINES[engine](network, state, 1.0, rng)
+        exposed[engine] = np.flatnonzero(state.days_infected == 0)
+    assert len(exposed["vectorized"]) > 0
+    assert np.array_equal(exposed["frontier"], exposed["vectorized"])
+    assert np.array_equal(exposed["python"], exposed["vectorized"])
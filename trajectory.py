@@ -0,0 +1,287 @@
+"""
+The purpose of this document is to record the trajectory of a run to disk as it happens,
+so that any day of it can be looked at again, or replayed, without simulating it again.
+
+A trajectory is a folder of append-only files, each holding fixed-width records:
+
+    header.json     the population size, the first day recorded and the dtypes of the records
+    status.bin      the status code of every person, size bytes per day
+    counts.bin      the number of people in each status, one int64 per status code per day
+    index.bin       the offset and number of the contacts of every day in contacts.bin, two int64 per day
+    contacts.bin    the contact edges of every day, one after the other, as int32 pairs
+    households.npy, family.npy, positions.npy (optional)    what does not change during the run
+
+The contact layer is drawn anew every day (see ContactNetwork.rewire in contacts.py), so
+the edge delta of a day always removes all contacts of the day before and adds the new
+ones; a day's record therefore only holds its added contacts, which are also the full
+contact layer of that day. Every record of day d is at an offset computed from d, or read
+from index.bin, so Trajectory finds any day in O(1) through memory maps, reading only the
+pages of the days looked at. A 10 million people run costs 10 MB of status per day; the
+contacts are best left out of such runs (record_contacts=False), since they are tens of
+times larger.
+
+The records of a day are flushed before its index record is written, so after a crash
+the files hold every day up to the last complete one, which is all Trajectory reads.
+TrajectoryRecorder can also continue a recording from a given day, e.g. when a run
+resumes from a checkpoint (see checkpoint.py), dropping the days recorded after it; a run
+resumed without a recording to continue starts a new one at the day it resumes from.
+
+replay_graph in visualization.py plays a trajectory with the renderers of generate_graph.
+"""
+
+from __future__ import annotations
+from typing import Any
+import json
+import os
+import numpy as np
+from population import STATUS_NAMES
+
+TRAJECTORY_VERSION = 1
+HEADER_FILE = "header.json"
+STATUS_FILE = "status.bin"
+COUNTS_FILE = "counts.bin"
+INDEX_FILE = "index.bin"
+CONTACTS_FILE = "contacts.bin"
+EDGE_DTYPE = np.int32
+INDEX_DTYPE = np.int64
+
+
+def _record_count(path: str, record_bytes: int) -> int:
+    """
+    Return the number of complete records of record_bytes bytes in the file at path.
+    """
+    return os.path.getsize(path) // record_bytes if os.path.exists(path) else 0
+
+
+class TrajectoryRecorder:
+    """
+    Appends the days of a run to a trajectory folder, see the top of this file.
+
+    Attributes:
+        path (str): The trajectory folder.
+        size (int): The number of people.
+        record_contacts (bool): Whether the contacts of every day are recorded.
+        first_day (int): The first day of the recording, 0 being the state before the first simulated day.
+        days (int): The number of days recorded so far.
+        contact_offset (int): The number of contacts recorded so far.
+    """
+
+    path: str
+    size: int
+    record_contacts: bool
+    first_day: int
+    days: int
+    contact_offset: int
+    _files: dict[str, Any]
+
+    def __init__(self, path: str, size: int, household_edges: np.ndarray, family: np.ndarray,
+                 positions: np.ndarray | None = None, record_contacts: bool = True,
+                 day: int = 0, resume: bool = False) -> None:
+        """
+        Start a new recording in path whose first day is day, replacing any recording there,
+        or, if resume is set and path holds a recording of day, continue it after day.
+        """
+        self.path = path
+        self.size = size
+        self.record_contacts = record_contacts
+        self.first_day = day
+        os.makedirs(path, exist_ok=True)
+
+        days = 0
+        if resume and os.path.exists(os.path.join(path, HEADER_FILE)):
+            existing = Trajectory(path)
+            if existing.size == size and existing.first_day <= day <= existing.last_day:
+                self.first_day = existing.first_day
+                self.record_contacts = existing.record_contacts
+                days = day - existing.first_day + 1
+            del existing
+        if days == 0:
+            with open(os.path.join(path, HEADER_FILE), "w") as file:
+                json.dump({"version": TRAJECTORY_VERSION, "size": size, "first_day": day,
+                           "record_contacts": record_contacts, "status_dtype": "uint8",
+                           "edge_dtype": np.dtype(EDGE_DTYPE).name}, file)
+            np.save(os.path.join(path, "households.npy"), np.asarray(household_edges, dtype=EDGE_DTYPE))
+            np.save(os.path.join(path, "family.npy"), np.asarray(family))
+            if positions is not None:
+                np.save(os.path.join(path, "positions.npy"), np.asarray(positions))
+            elif os.path.exists(os.path.join(path, "positions.npy")):
+                os.remove(os.path.join(path, "positions.npy"))
+
+        # Drop whatever was recorded after the days kept, then append
+        index = np.fromfile(os.path.join(path, INDEX_FILE), dtype=INDEX_DTYPE, count=2 * days).reshape(-1, 2) \
+            if days else np.zeros((0, 2), dtype=INDEX_DTYPE)
+        self.contact_offset = int(index[-1].sum()) if days else 0
+        self.days = days
+        record_bytes = {STATUS_FILE: size, COUNTS_FILE: 8 * len(STATUS_NAMES), INDEX_FILE: 16,
+                        CONTACTS_FILE: 2 * np.dtype(EDGE_DTYPE).itemsize}
+        kept = {STATUS_FILE: days, COUNTS_FILE: days, INDEX_FILE: days, CONTACTS_FILE: self.contact_offset}
+        self._files = {}
+        for name, record in record_bytes.items():
+            file = open(os.path.join(path, name), "r+b" if days else "wb")
+            file.truncate(kept[name] * record)
+            file.seek(0, os.SEEK_END)
+            self._files[name] = file
+
+    @property
+    def next_day(self) -> int:
+        """
+        The day the next call to record records.
+        """
+        return self.first_day + self.days
+
+    def record(self, status: np.ndarray, contacts: np.ndarray | None = None,
+               counts: np.ndarray | None = None) -> None:
+        """
+        Append the next day, given by the status of every person and, if contacts are recorded,
+        the (E, 2) contacts of the day. counts, the number of people in each status, is computed
+        from status if it is not given.
+        """
+        counts = np.bincount(status, minlength=len(STATUS_NAMES)) if counts is None else counts
+        self._files[STATUS_FILE].write(np.ascontiguousarray(status, dtype=np.uint8).tobytes())
+        self._files[COUNTS_FILE].write(np.asarray(counts, dtype=np.int64).tobytes())
+        count = 0
+        if self.record_contacts and contacts is not None:
+            count = len(contacts)
+            self._files[CONTACTS_FILE].write(np.ascontiguousarray(contacts, dtype=EDGE_DTYPE).tobytes())
+        for name in (STATUS_FILE, COUNTS_FILE, CONTACTS_FILE):
+            self._files[name].flush()
+        self._files[INDEX_FILE].write(np.array([self.contact_offset, count], dtype=INDEX_DTYPE).tobytes())
+        self._files[INDEX_FILE].flush()
+        self.contact_offset += count
+        self.days += 1
+
+    def close(self) -> None:
+        """
+        Close the files of the recording.
+        """
+        for file in self._files.values():
+            file.close()
+        self._files = {}
+
+    def __enter__(self) -> TrajectoryRecorder:
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self.close()
+
+
+class Trajectory:
+    """
+    A recorded trajectory, read through memory maps, see the top of this file.
+
+    Attributes:
+        path (str): The trajectory folder.
+        size (int): The number of people.
+        record_contacts (bool): Whether the contacts of every day were recorded.
+        first_day (int): The first day recorded; the records of day d are at row d - first_day.
+        statuses (np.ndarray): The (days, size) status of every person on every day.
+        counts (np.ndarray): The (days, number of statuses) number of people in each status on every day.
+        index (np.ndarray): The (days, 2) offset and number of the contacts of every day.
+        edges (np.ndarray): The (E, 2) contacts of all days, one day after the other.
+    """
+
+    path: str
+    size: int
+    record_contacts: bool
+    first_day: int
+    statuses: np.ndarray
+    counts: np.ndarray
+    index: np.ndarray
+    edges: np.ndarray
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, HEADER_FILE)) as file:
+            header = json.load(file)
+        self.size = header["size"]
+        self.record_contacts = header["record_contacts"]
+        self.first_day = header["first_day"]
+
+        # Only the days whose every record is complete, see the top of this file
+        days = min(_record_count(os.path.join(path, STATUS_FILE), max(self.size, 1)),
+                   _record_count(os.path.join(path, COUNTS_FILE), 8 * len(STATUS_NAMES)),
+                   _record_count(os.path.join(path, INDEX_FILE), 16))
+        edge_count = _record_count(os.path.join(path, CONTACTS_FILE), 2 * np.dtype(EDGE_DTYPE).itemsize)
+        self.statuses = self._map(STATUS_FILE, np.uint8, (days, self.size))
+        self.counts = self._map(COUNTS_FILE, np.int64, (days, len(STATUS_NAMES)))
+        self.index = self._map(INDEX_FILE, INDEX_DTYPE, (days, 2))
+        self.edges = self._map(CONTACTS_FILE, EDGE_DTYPE, (edge_count, 2))
+
+    def _map(self, name: str, dtype: type, shape: tuple[int, int]) -> np.ndarray:
+        """
+        Return the first records of the file name as a read-only memory map of the given shape.
+        """
+        if shape[0] * shape[1] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode="r", shape=shape)
+
+    def __len__(self) -> int:
+        return len(self.statuses)
+
+    @property
+    def last_day(self) -> int:
+        """
+        The last complete day of the recording, first_day - 1 if none is.
+        """
+        return self.first_day + len(self) - 1
+
+    def _row(self, day: int) -> int:
+        """
+        Return the row of the records of day, raising an IndexError if day was not recorded.
+        """
+        if not self.first_day <= day <= self.last_day:
+            raise IndexError(f"day {day} is not between {self.first_day} and {self.last_day}")
+        return day - self.first_day
+
+    def status(self, day: int) -> np.ndarray:
+        """
+        Return the status of every person on day, as a read-only view on the file.
+        """
+        return self.statuses[self._row(day)]
+
+    def day_counts(self, day: int) -> np.ndarray:
+        """
+        Return the number of people in each status on day.
+        """
+        return self.counts[self._row(day)]
+
+    def contacts(self, day: int) -> np.ndarray:
+        """
+        Return the (E, 2) contacts of day, as a read-only view on the file; empty when contacts
+        were not recorded.
+        """
+        offset, count = self.index[self._row(day)]
+        return self.edges[offset:offset + count]
+
+    def households(self) -> np.ndarray:
+        """
+        Return the (E, 2) household edges of the run.
+        """
+        return np.load(os.path.join(self.path, "households.npy"), mmap_mode="r")
+
+    def family(self) -> np.ndarray:
+        """
+        Return the family id of every person.
+        """
+        return np.load(os.path.join(self.path, "family.npy"), mmap_mode="r")
+
+    def positions(self) -> np.ndarray | None:
+        """
+        Return the positions the run was drawn with, or None if they were not recorded.
+        """
+        path = os.path.join(self.path, "positions.npy")
+        return np.load(path) if os.path.exists(path) else None
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["json", "os", "typing", "numpy", "population"],
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': ["TrajectoryRecorder.__init__", "Trajectory.__init__"],
+            # 'disabled': ["E9999"]
+        })
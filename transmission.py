@@ -0,0 +1,145 @@
+"""
+The purpose of this document is to implement the daily transmission step of the
+visualization model, i.e. spreading the virus along the edges of the contact network,
+made of a household layer and a daily contact layer (see contacts.ContactNetwork).
+
+Three interchangeable engines are provided, selected by name through TRANSMISSION_ENGINES:
+    'python'      walks the edges one by one, as update_day originally did
+    'vectorized'  reads the edge arrays of both layers, draws every Bernoulli trial of the
+                  day in one NumPy call and applies the transitions with masks
+    'frontier'    like 'vectorized', but reads the household layer only from the rows of the
+                  active set, i.e. of the incubated and infected people (see population.py),
+                  so the static layer costs in proportion to the epidemic
+
+All engines follow the same rules. Along every edge, an incubated or infected person
+exposes the other person unless that person is already infected or dead (the first
+endpoint is checked first). An exposure succeeds with probability infection_rate and then
+makes the person incubated or infected with equal probability, restarting their day counter.
+
+Every random draw comes from the RandomContext of the run (see randomness.py).
+
+The only difference is when a new infection becomes contagious: the python engine lets it
+spread along the edges that come later in the same walk, while the vectorized and frontier
+engines use the statuses of the start of the day, so they do not depend on the order of
+the edges.
+"""
+
+from __future__ import annotations
+from typing import Callable
+import itertools
+import numpy as np
+from contacts import ContactNetwork
+from population import PopulationState, INCUBATED, INFECTED, DEAD
+from randomness import RandomContext
+
+
+def transmit_python(network: ContactNetwork, state: PopulationState, infection_rate: float,
+                    rng: RandomContext) -> None:
+    """
+    Spread the virus along every edge of network, one edge at a time, households first.
+    """
+    status = state.status
+    random = rng.random
+
+    for u, v in itertools.chain.from_iterable(edges.tolist() for edges in network.layers()):
+        if status[u] == INFECTED or status[u] == INCUBATED:
+            if status[v] != INFECTED and status[v] != DEAD:
+                if random.random() < infection_rate:
+                    state.set_status(v, INCUBATED if random.random() < 0.5 else INFECTED)
+
+        elif status[v] == INFECTED or status[v] == INCUBATED:
+            if status[u] != INFECTED and status[u] != DEAD:
+                if random.random() < infection_rate:
+                    state.set_status(u, INCUBATED if random.random() < 0.5 else INFECTED)
+
+
+def _expose(targets: np.ndarray, state: PopulationState, infection_rate: float, rng: RandomContext) -> None:
+    """
+    Expose every person of targets to the virus once, at the same time.
+
+    A person exposed several times ends up infected if any successful exposure made them
+    infected, and incubated otherwise, as they would when walking the edges one by one.
+    """
+    status = state.status
+    targets = targets[(status[targets] != INFECTED) & (status[targets] != DEAD)]
+
+    trials = rng.generator.random((2, len(targets)))
+    infected = trials[0] < infection_rate
+    becomes_incubated = targets[infected & (trials[1] < 0.5)]
+    becomes_infected = targets[infected & (trials[1] >= 0.5)]
+
+    state.set_status(becomes_incubated, INCUBATED)
+    state.set_status(becomes_infected, INFECTED)
+
+
+def _exposed_along(edges: np.ndarray, contagious: np.ndarray) -> np.ndarray:
+    """
+    Return the person exposed along every row (u, v) of edges with a contagious endpoint:
+    v if u is contagious, and u otherwise.
+    """
+    u, v = edges[:, 0], edges[:, 1]
+    from_u = contagious[u]
+    return np.where(from_u, v, u)[from_u | contagious[v]]
+
+
+def transmit_layers(layers: list[np.ndarray], state: PopulationState, infection_rate: float,
+                    rng: RandomContext) -> None:
+    """
+    Spread the virus along every row (u, v) of every edge array of layers at once.
+    """
+    status = state.status
+    contagious = (status == INCUBATED) | (status == INFECTED)
+    targets = [_exposed_along(edges, contagious) for edges in layers if len(edges)]
+    if targets:
+        _expose(np.concatenate(targets), state, infection_rate, rng)
+
+
+def transmit_vectorized(network: ContactNetwork, state: PopulationState, infection_rate: float,
+                        rng: RandomContext) -> None:
+    """
+    Spread the virus along every edge of both layers of network.
+    """
+    transmit_layers(network.layers(), state, infection_rate, rng)
+
+
+def transmit_frontier(network: ContactNetwork, state: PopulationState, infection_rate: float,
+                      rng: RandomContext) -> None:
+    """
+    Spread the virus from the active set of state only, reading its household neighbors from
+    the CSR rows of network. The contact layer is masked as in transmit_vectorized.
+
+    A household edge between two contagious people is kept in one direction only, from the
+    smaller id. As the household edges (u, v) have u < v (see contacts.build_households), it
+    exposes v, the same person as in the other engines.
+    """
+    active = state.active_nodes()
+    if len(active) == 0:
+        return
+    status = state.status
+    contagious = (status == INCUBATED) | (status == INFECTED)
+
+    sources, neighbors = network.households.expand(active)
+    household = neighbors[~contagious[neighbors] | (sources < neighbors)]
+    _expose(np.concatenate([household, _exposed_along(network.contacts, contagious)]),
+            state, infection_rate, rng)
+
+
+TRANSMISSION_ENGINES: dict[str, Callable[[ContactNetwork, PopulationState, float, RandomContext], None]] = {
+    'python': transmit_python,
+    'vectorized': transmit_vectorized,
+    'frontier': transmit_frontier,
+}
+
+
+if __name__ == "__main__":
+
+    import python_ta
+    check_python_ta = False
+    if check_python_ta:
+        python_ta.check_all(config={
+            'max-line-length': 120,
+            'extra-imports': ["numpy", "typing", "itertools", "contacts", "population", "randomness"],
+            # the names (strs) of functions that call print/open/input
+            'allowed-io': [],
+            # 'disabled': ["E9999"]
+        })
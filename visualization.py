@@ -22,6 +22,8 @@ data obtained from the interface, including:
             force medium -> divide contact density by 4
             force high -> divide contact density by 6
                 isolation within house
+            (see ISOLATION_MAPPING; the measures of a policy, lockdown, quarantine and
+            household isolation, are described in interventions.py)
     C. Visualization Data
         10. pause (time between each day)
         11. total_days
@@ -34,27 +36,40 @@ data obtained from the interface, including:
         1. what is the significance of blue nodes? 
         2. what is the probability of triggering incubation period?
     
-    attributes = [
+    attributes (arrays of population.PopulationState, indexed by node) = [
         ["Attribute", "Description", "Possible Values"],
-        ["status", "Indicates the health status of a person.", "'healthy',
-        'infected', 'recovered', 'dead', 'incubated'"],
+        ["status", "Indicates the health status of a person.", "HEALTHY,
+        INFECTED, RECOVERED, DEAD, INCUBATED"],
         ["days_infected", "Tracks how many days a node has been infected.",
         "Integer values starting from 0"],
-        ["node_color", "Used for visualization, indicates the health status of a person by color.",
-        "'green', 'red', 'blue', 'black', 'purple'"],
         ["family", "Indicates the family group of a person. Nodes within the same family have closer connections.",
         "Integer values, -1 for no family"]
     ]
+    node colors are derived from status through population.STATUS_COLORS
 
     isolation foce affects family by lowering infection rate, affects others by reducing added edge? 
     too little edge added? unreasonable? 
 
 """
 
-import random
-import networkx as nx
-import matplotlib.pyplot as plt
+import math
+from typing import Any
 import numpy as np
+from contacts import build_households, ContactNetwork
+from population import PopulationState, HEALTHY, INFECTED, STATUS_NAMES
+from transmission import TRANSMISSION_ENGINES
+from progression import progress
+from layout import family_layout, cached_family_layout
+from renderer import GraphRenderer, CountsRenderer
+from pipeline import SimulationWorker, play
+from randomness import RandomContext, context_from_state
+from profiling import Profiler, as_profiler
+from trajectory import Trajectory, TrajectoryRecorder
+from metrics import EpidemicMetrics
+from simulation import Policy, policy_from_state
+from interventions import PolicyEffect, Lockdown, Quarantine, HouseholdIsolation
+from checkpoint import CHECKPOINT_KEEP, Checkpoint, checkpoint_due, write_checkpoint, load_checkpoint, \
+    state_arrays, restore_state, adjacency_arrays, restore_adjacency
 
 numberType = int | float | str
 
@@ -64,194 +79,420 @@ FAMILY_EDGE = {"width": 2.0, "edge_color": 'blue'}
 # pass in contact density as length,
 
 
-def generate_number_normally(center: numberType, length: numberType, amount: int = 1) -> list[int]:
+# The most contacts a person makes in a day
+MAX_CONTACTS = 10
+# Number of days of contact counts drawn at once by ContactTargets
+CONTACT_BUFFER_DAYS = 16
+# Most contact counts ContactTargets keeps buffered (32 MB), fewer days are drawn at once for larger populations
+CONTACT_BUFFER_LIMIT = 1 << 22
+# Where the files of a profiled run go by default, see profiling.Profiler.save
+PROFILE_OUTPUT = "profile"
+# Where the checkpoints of a run go by default, see checkpoint.py
+CHECKPOINT_DIR = "checkpoints"
+
+# Bounds of population_size. The model itself only holds arrays (see population.py and
+# contacts.ContactNetwork), measured by the scale benchmark of benchmark.py (the 'frontier'
+# engine, medium households and a contact density of 5 on one core; the peak memory is that
+# of the arrays of the model, without the interpreter and libraries):
+#
+#     people       set up     per day    peak memory
+#     10,000       0.03 s     0.016 s        3 MB
+#     100,000      0.16 s     0.06 s        30 MB
+#     1,000,000    1.6 s      0.9 s        190 MB
+#     10,000,000   21 s       11 s         1.6 GB
+#
+# so the cap is set by memory and patience rather than by the engine.
+MIN_POPULATION = 10
+MAX_POPULATION = 10_000_000
+# Above this many people, generate_graph draws the counts per status instead of every person
+# (see renderer.CountsRenderer), since a frame of the graph takes over a second past it
+GRAPH_DRAWING_LIMIT = 2000
+
+
+def generate_number_normally(center: numberType, length: numberType, amount: int = 1,
+                             rng: np.random.Generator | None = None) -> np.ndarray:
     """
     Generate a random number by Gaussian normal distribution.
+
+    The numbers are drawn from rng, or from the global numpy random state if rng is None.
     """
     length = float(length)
     lower_bound = center - float(length) / 2
     upper_bound = center + float(length) / 2
-    random_numbers = np.random.normal(
+    random_numbers = (np.random if rng is None else rng).normal(
         loc=center, scale=length / 6, size=amount)
     return np.clip(random_numbers, lower_bound, upper_bound)
 
 
-def initialize_family(graph: nx.Graph, num_nodes: int, house_density: int) -> None:
+def generate_households(num_nodes: int, house_density: int, rng: RandomContext) -> tuple[np.ndarray, np.ndarray]:
     """
-    Initialize a group of family members and connect them with edges
+    Draw household sizes around house_density and split the people 0 to num_nodes - 1 into
+    households, returning the family id of every person and the (E, 2) household edges
+    (see contacts.build_households).
     """
-    # Initialize Nodes
-    _finished_nodes = 0
-    _unsampled_nodes = list(graph.nodes())
-    idx = 0
-    # Generate a group of family based on house_density
-    nodes = []
-    while _finished_nodes < num_nodes - int(house_density):
-
-        # Generate a group of family based on house_density
-        family_size = generate_number_normally(
-            house_density, house_density / 2, 1)[0]
-        family_size = int(family_size)
-        nodes = random.sample(_unsampled_nodes, family_size)
-        _finished_nodes += len(nodes)
+    # Enough family sizes to cover everyone, since a family has at least house_density * 3 / 4 members
+    amount = num_nodes // max(1, math.floor(house_density * 3 / 4)) + 1
+    family_sizes = generate_number_normally(house_density, house_density / 2, amount,
+                                            rng.generator).astype(np.int64)
+    return build_households(num_nodes, family_sizes, int(house_density), rng.generator)
 
-        # Remove nodes from sampling candidates
-        for i in nodes:
-            if i not in nodes:
-                continue
-            _unsampled_nodes.remove(i)
 
-        # Add Close Contact Edge
-        for i in nodes:
-            for j in nodes:
-                if not graph.has_edge(i, j) and i != j:
-                    graph.add_edge(i, j)
-                    graph.edges[i, j]['edge_color'] = 'blue'
-                    graph.edges[i, j]['relationship'] = 'family'
-                    graph.nodes[i]['family'] = idx
-                    graph.nodes[j]['family'] = idx
-                    idx += 1
-
-    for i in graph.nodes():
-        if i not in nodes:
-            graph.nodes[i]['family'] = -1
+def initialize_family(num_nodes: int, house_density: int, state: PopulationState,
+                      rng: RandomContext) -> ContactNetwork:
+    """
+    Initialize a group of family members and return the contact network connecting them
 
-    # # Deal with edge cases
-    # for i in _unsampled_nodes:
-    #     for j in _unsampled_nodes:
-    #         if not graph.has_edge(i, j) and i != j:
-    #             graph.add_edge(i, j, **FAMILY_EDGE)
+    The family id of every person is written to state.family, people left without a family keep -1.
+    Family sizes are drawn all at once and the households are built by generate_households;
+    they form the household layer of the network.
+    """
+    family, family_edges = generate_households(num_nodes, house_density, rng)
+    state.family[:] = family
+    return ContactNetwork(family_edges, num_nodes)
 
 
-def initialize_infected(graph: nx.Graph, initial_infected_count: int) -> None:
+def initialize_infected(state: PopulationState, initial_infected_count: int, rng: RandomContext) -> None:
     """
     Initialize a group of infected people
     """
-    infected_nodes = random.sample(list(graph.nodes()), initial_infected_count)
-    for node in graph.nodes():
-        if node in infected_nodes:
-            graph.nodes[node]['status'] = 'infected'
-            graph.nodes[node]['days_infected'] = 0
-            graph.nodes[node]['node_color'] = 'red'
-        else:
-            graph.nodes[node]['status'] = 'healthy'
-            graph.nodes[node]['node_color'] = 'green'
+    state.set_status(slice(None), HEALTHY)
+    infected_nodes = rng.random.sample(range(len(state)), initial_infected_count)
+    state.set_status(infected_nodes, INFECTED)
 
 
-def initialize_edges(graph: nx.Graph, contact_density: int, isolation_force: float) -> None:
+class ContactTargets:
     """
-    Initialize the edges of the graph
+    Draws how many contacts each person wants to have on a day, for a whole run.
+
+    A day's count for a person is generate_number_normally(density, density), truncated to an
+    integer and capped at MAX_CONTACTS, where density = contact_density * (1 - isolation_force).
+    Since that truncated normal is density times generate_number_normally(1, 1), the buffer holds
+    unit draws for CONTACT_BUFFER_DAYS days of the whole population at a time (fewer for populations
+    above CONTACT_BUFFER_LIMIT / CONTACT_BUFFER_DAYS people) and is refilled in bulk, while the
+    density may still change from one day to the next.
+
+    Attributes:
+        rng (np.random.Generator): The random generator of the run (see randomness.py).
+        buffer (np.ndarray): Unit draws which have not been used yet, from position on.
+        position (int): The index of the first unused draw of buffer.
     """
-    new_edges = []
 
-    for u in graph.nodes():
-        if graph.nodes[u]['status'] == 'dead':
-            continue
+    rng: np.random.Generator
+    buffer: np.ndarray
+    position: int
+
+    def __init__(self, rng: np.random.Generator) -> None:
+        self.rng = rng
+        self.buffer = np.empty(0)
+        self.position = 0
+
+    def draw(self, size: int, contact_density: numberType, isolation_force: float) -> np.ndarray:
+        """
+        Return the number of contacts each of size people wants to have today.
+        """
+        if self.position + size > len(self.buffer):
+            days = max(1, min(CONTACT_BUFFER_DAYS, CONTACT_BUFFER_LIMIT // max(size, 1)))
+            self.buffer = generate_number_normally(1.0, 1.0, size * days, self.rng)
+            self.position = 0
+        unit = self.buffer[self.position:self.position + size]
+        self.position += size
 
-        potential_connections = [v for v in graph.nodes() if
-                                 u != v
-                                 and graph.nodes[v]['status'] not in ['dead']
-                                 and not graph.has_edge(u, v)]
+        new_contact_density = float(contact_density) * (1 - isolation_force)
+        return np.minimum((unit * new_contact_density).astype(np.int64), MAX_CONTACTS)
 
-        new_contact_density = contact_density * (1 - isolation_force)
-        num = min(int(generate_number_normally(
-            new_contact_density, new_contact_density)[0]), 10)
-        num_new_edges = min(num - graph.degree(u), len(potential_connections))
 
-        if num_new_edges > 0:
-            n_edges = random.sample(potential_connections, num_new_edges)
+def enforce_policy(network: ContactNetwork, state: PopulationState, isolation_force: float,
+                   policy: Policy | None, day: int) -> PolicyEffect:
+    """
+    Return how policy changes the random contacts of day, or only isolation_force if there is no policy.
+    """
+    if policy is None:
+        return PolicyEffect(isolation_force)
+    return policy.enforce_policy(day, state, network.households)
 
-            for node in n_edges:
-                new_edges.append((u, node))
-                graph.add_edge(u, node, edge_color=(0, 0, 0, 0.3))
-    return new_edges
 
+def initialize_edges(network: ContactNetwork, state: PopulationState, contact_density: int,
+                     isolation_force: float, rng: RandomContext | None = None,
+                     targets: ContactTargets | None = None, policy: Policy | None = None,
+                     day: int = 0) -> np.ndarray:
+    """
+    Initialize the contact layer of the network and return it
 
-def update_day(graph: nx.Graph, infection_rate: float, death_rate: float,
+    Random draws come from rng, and the daily number of contacts from targets. An unseeded
+    context and a ContactTargets drawing from rng are used when they are None. The contacts
+    are those of the day after day and follow policy, which replaces isolation_force, if given.
+    """
+    rng = RandomContext() if rng is None else rng
+    targets = ContactTargets(rng.generator) if targets is None else targets
+    effect = enforce_policy(network, state, isolation_force, policy, day + 1)
+    contact_targets = targets.draw(len(state), contact_density, effect.isolation_force)
+    return network.rewire(effect.contactable(state.alive()), contact_targets, rng.generator)
+
+
+def update_day(network: ContactNetwork, state: PopulationState, infection_rate: float, death_rate: float,
                recovery_days: int, contact_density: int, isolation_force: float,
-               incubation_period: int, edges: list) -> None:
-    """
-    Update the graph based on the current day
-
-    1. Check all existing edges and color the node
-    2. Randomly choose infected and let die 
-    2. Reorder the contacting edges
-
-    """
-    all_edges = list(graph.edges())
-
-    for u, v in all_edges:
-        if graph.nodes[u]['status'] == 'infected' or graph.nodes[u]['status'] == 'incubated':
-            if graph.nodes[v]['status'] != 'infected' and graph.nodes[v]['status'] != 'dead':
-                if random.random() < infection_rate:
-                    if random.random() < 0.5:
-                        graph.nodes[v]['status'] = 'incubated'
-                        graph.nodes[v]['node_color'] = 'purple'
-                        graph.nodes[v]['days_infected'] = 0
-                    else:
-                        graph.nodes[v]['status'] = 'infected'
-                        graph.nodes[v]['node_color'] = 'red'
-                        graph.nodes[v]['days_infected'] = 0
-
-        elif graph.nodes[v]['status'] == 'infected' or graph.nodes[v]['status'] == 'incubated':
-            if graph.nodes[u]['status'] != 'infected' and graph.nodes[u]['status'] != 'dead':
-                if random.random() < infection_rate:
-                    if random.random() < 0.5:
-                        graph.nodes[u]['status'] = 'incubated'
-                        graph.nodes[u]['node_color'] = 'purple'
-                        graph.nodes[u]['days_infected'] = 0
-                    else:
-                        graph.nodes[u]['status'] = 'infected'
-                        graph.nodes[u]['node_color'] = 'red'
-                        graph.nodes[u]['days_infected'] = 0
-
-    infected_nodes = [node_ for node_, attrs in graph.nodes(
-        data=True) if attrs.get('status') == 'infected']
-    for node in infected_nodes:
-        if graph.nodes[node]['days_infected'] >= recovery_days:
-            if random.random() < death_rate:
-                graph.nodes[node]['status'] = 'dead'
-                graph.nodes[node]['node_color'] = 'black'
-            else:
-                graph.nodes[node]['status'] = 'recovered'
-                graph.nodes[node]['node_color'] = 'blue'
-        else:
-            graph.nodes[node]['days_infected'] += 1
-
-    incubated_nodes = [node_ for node_, attrs in graph.nodes(
-        data=True) if attrs.get('status') == 'incubated']
-    for node in incubated_nodes:
-        if graph.nodes[node]['days_infected'] >= incubation_period:
-            graph.nodes[node]['status'] = 'infected'
-            graph.nodes[node]['node_color'] = 'red'
-            graph.nodes[node]['days_infected'] = 0
-        else:
-            graph.nodes[node]['days_infected'] += 1
-
-    graph.remove_edges_from(edges)
-
-    new_edges = []
-    for u in graph.nodes():
-        if graph.nodes[u]['status'] == 'dead':
-            continue
-
-        # a list of nodes
-        potential_connections = [v_ for v_ in graph.nodes() if
-                                 (v_ != u
-                                 and graph.nodes[v_]['status'] != 'dead'
-                                 and not graph.has_edge(u, v_))]
-
-        new_contact_density = contact_density * (1 - isolation_force)
-        num = min(int(generate_number_normally(
-            new_contact_density, new_contact_density)[0]), 10)
-        num_new_edges = min(num - graph.degree(u), len(potential_connections))
-
-        if num_new_edges > 0:
-            n_edges = random.sample(potential_connections, num_new_edges)
-            for node in n_edges:
-                new_edges.append((u, node))
-                graph.add_edge(u, node, edge_color=(0, 0, 0, 0.3))
-    return new_edges
+               incubation_period: int, engine: str = 'python',
+               rng: RandomContext | None = None, targets: ContactTargets | None = None,
+               profiler: Profiler | None = None, policy: Policy | None = None, day: int = 1) -> np.ndarray:
+    """
+    Update the network based on the current day and return the new contacts
+
+    1. Check all existing edges and color the node, using the transmission engine named
+       engine (see transmission.py)
+    2. Randomly choose infected and let die, see progression.py for the state machine
+    2. Reorder the contacting edges, see contacts.py for how new contacts are sampled,
+       with the number of contacts drawn from targets. The contact layer of network is
+       overwritten in place, so the returned array is only valid until the next day.
+       These are the contacts of the day after day, so they follow the measures policy
+       takes on that day, given the people at the end of day (see interventions.py);
+       a policy replaces isolation_force.
+
+    Random draws come from rng; see initialize_edges for the defaults of rng and targets.
+    Each step is timed as a phase of profiler (see profiling.py).
+    """
+    rng = RandomContext() if rng is None else rng
+    profiler = as_profiler(profiler)
+    with profiler.phase("transmission"):
+        TRANSMISSION_ENGINES[engine](network, state, infection_rate, rng)
+    with profiler.phase("progression"):
+        progress(state, incubation_period, recovery_days, death_rate, rng.generator)
+
+    targets = ContactTargets(rng.generator) if targets is None else targets
+    with profiler.phase("apply_policy"):
+        effect = enforce_policy(network, state, isolation_force, policy, day + 1)
+    with profiler.phase("contact_targets"):
+        contact_targets = targets.draw(len(state), contact_density, effect.isolation_force)
+    with profiler.phase("rewire"):
+        return network.rewire(effect.contactable(state.alive()), contact_targets, rng.generator)
+
+
+DENSITY_MAPPING = {
+    "high": 6,
+    "medium": 4,
+    "low": 2,
+}
+
+# The isolation forces named by the interface: a low force divides the contact density by 2,
+# a medium one by 4 and a high one by 6, the house densities of the same names
+ISOLATION_MAPPING = {name: 1 - 1 / divisor for name, divisor in DENSITY_MAPPING.items()}
+
+
+def parse_parameters(data: dict[str, numberType]) -> dict[str, Any]:
+    """
+    Convert the parameter dictionary built by the interface (see
+    VirusSimulationApp.fetch_parameters in main.py) into typed values, filling in the
+    default value of every missing key.
+
+    An integer "seed" makes the run reproducible (see randomness.py).
+
+    The drawing speed is given either as "frame_rate" (days shown per second, 0 for as fast
+    as possible) or, as before, as the "pause" in seconds between two days.
+
+    "population_size" is clamped to MIN_POPULATION to MAX_POPULATION. The default "engine"
+    is 'python' up to GRAPH_DRAWING_LIMIT people and 'frontier' above; any other name than
+    those of transmission.TRANSMISSION_ENGINES raises a ValueError.
+
+    A true "profile" times every phase of every day (see profiling.py), with the memory
+    allocated by every phase unless "profile_allocations" is false or the days run beside
+    the display, as in generate_graph. "profile_days", a pair
+    of first and last day, also runs cProfile and tracemalloc over those days and turns
+    profiling on. The results are written to files starting with "profile_output".
+
+    A positive "checkpoint_every" saves the run to "checkpoint_dir" every that many days, and
+    a true "resume" continues the latest checkpoint there, if any, with the model parameters
+    it was saved with (see save_run and checkpoint.py).
+
+    A "record_path" records the status, and the contacts if "record_contacts" (by default
+    up to GRAPH_DRAWING_LIMIT people), of every day there, to be replayed with replay_graph
+    (see trajectory.py).
+
+    A "metrics_path" saves the counts per status, new infections and effective R of every
+    day there at the end of the run, as CSV, Parquet or .npz by its extension (see metrics.py).
+
+    "isolate_force" is a share of contacts given up or one of the names of ISOLATION_MAPPING.
+    The measures of the policy (see create_policy and interventions.py) are a "lockdown_threshold",
+    the share of the living people detected at which a lockdown giving up "lockdown_strength"
+    of the contacts starts, lifted below "lockdown_release"; a true "quarantine" of the detected
+    people; and a true "household_isolation" of their households. They are only taken from
+    day "policy_start" to day "policy_end", by default the whole run.
+    """
+    pause = float(data.get("pause", 0.5))
+    profile_days = data.get("profile_days")
+    profile_days = None if profile_days is None else (int(profile_days[0]), int(profile_days[1]))
+    population_size = int(min(max(int(data.get("population_size", 500)), MIN_POPULATION), MAX_POPULATION))
+    default_engine = "python" if population_size <= GRAPH_DRAWING_LIMIT else "frontier"
+    engine = str(data.get("engine", default_engine))
+    if engine not in TRANSMISSION_ENGINES:
+        raise ValueError(f"unknown engine {engine!r}, expected one of {sorted(TRANSMISSION_ENGINES)}")
+    isolate_force = data.get("isolate_force", 0.0)
+    isolate_force = ISOLATION_MAPPING[isolate_force.lower()] if isinstance(isolate_force, str) \
+        and isolate_force.lower() in ISOLATION_MAPPING else float(isolate_force)
+    return {
+        "infection_rate": float(data.get("infection_rate", 0.3)),
+        "initial_infected_count": int(data.get("initial_infected_count", 5)),
+        "incubation_period": int(data.get("incubation_period", 5)),
+        "death_rate": float(data.get("death_rate", 0.02)),
+        "recovery_days": int(data.get("recovery_days", 7)),
+        "population_size": population_size,
+        "isolate_force": isolate_force,
+        "house_density": DENSITY_MAPPING.get(str(data.get("house_density", "low")).lower(), 2),
+        "contact_density": int(data.get("contact_density", 5)),
+        "pause": pause,
+        "frame_rate": float(data.get("frame_rate", 1 / pause if pause > 0 else 0)),
+        "total_days": int(data.get("total_days", 100)),
+        "engine": engine,
+        "seed": None if data.get("seed") is None else int(data["seed"]),
+        "profile": bool(data.get("profile", profile_days is not None)),
+        "profile_allocations": bool(data.get("profile_allocations", True)),
+        "profile_days": profile_days,
+        "profile_output": str(data.get("profile_output", PROFILE_OUTPUT)),
+        "checkpoint_every": int(data.get("checkpoint_every", 0)),
+        "checkpoint_dir": str(data.get("checkpoint_dir", CHECKPOINT_DIR)),
+        "resume": bool(data.get("resume", False)),
+        "record_path": None if data.get("record_path") is None else str(data["record_path"]),
+        "record_contacts": bool(data.get("record_contacts", population_size <= GRAPH_DRAWING_LIMIT)),
+        "metrics_path": None if data.get("metrics_path") is None else str(data["metrics_path"]),
+        "lockdown_threshold": None if data.get("lockdown_threshold") is None else float(data["lockdown_threshold"]),
+        "lockdown_release": None if data.get("lockdown_release") is None else float(data["lockdown_release"]),
+        "lockdown_strength": float(data.get("lockdown_strength", 0.75)),
+        "quarantine": bool(data.get("quarantine", False)),
+        "household_isolation": bool(data.get("household_isolation", False)),
+        "policy_start": int(data.get("policy_start", 0)),
+        "policy_end": None if data.get("policy_end") is None else int(data["policy_end"]),
+    }
+
+
+def initialize_population(parameters: dict[str, Any], rng: RandomContext) -> tuple[ContactNetwork, PopulationState]:
+    """
+    Create the contact network, with its household layer, and the population state described by
+    parameters, as returned by parse_parameters, with the initial infected people chosen using rng.
+    """
+    num_nodes = parameters["population_size"]
+    state = PopulationState(num_nodes)
+
+    # Initialize family members
+    network = initialize_family(num_nodes, parameters["house_density"], state, rng)
+    initialize_infected(state, parameters["initial_infected_count"], rng)
+    return network, state
+
+
+def create_policy(parameters: dict[str, Any], checkpoint: Checkpoint | None = None) -> Policy:
+    """
+    Return the policy described by parameters, as returned by parse_parameters, or the policy
+    saved by save_run in checkpoint if any, with its measures in effect as they were.
+    """
+    if checkpoint is not None and "policy" in checkpoint.meta:
+        return policy_from_state(checkpoint.meta["policy"])
+    window = {"start_day": parameters["policy_start"], "end_day": parameters["policy_end"]}
+    interventions = []
+    if parameters["lockdown_threshold"] is not None:
+        interventions.append(Lockdown(parameters["lockdown_strength"], threshold=parameters["lockdown_threshold"],
+                                      release=parameters["lockdown_release"], **window))
+    if parameters["quarantine"]:
+        interventions.append(Quarantine(**window))
+    if parameters["household_isolation"]:
+        interventions.append(HouseholdIsolation(**window))
+    return Policy(parameters["isolate_force"], interventions)
+
+
+def run_day(network: ContactNetwork, state: PopulationState, parameters: dict[str, Any],
+            rng: RandomContext | None = None, targets: ContactTargets | None = None,
+            profiler: Profiler | None = None, policy: Policy | None = None, day: int = 1) -> np.ndarray:
+    """
+    Advance the simulation described by parameters, as returned by parse_parameters, by one day,
+    the given day, under policy (see update_day).
+    """
+    return update_day(network, state, parameters["infection_rate"], parameters["death_rate"],
+                      parameters["recovery_days"], parameters["contact_density"],
+                      parameters["isolate_force"], parameters["incubation_period"],
+                      parameters["engine"], rng, targets, profiler, policy, day)
+
+
+# The parameters which describe the model of a run, saved in its checkpoints and restored
+# when it resumes; the other parameters (drawing, profiling, total_days, ...) are taken
+# from the resuming call
+MODEL_PARAMETERS = ("infection_rate", "initial_infected_count", "incubation_period", "death_rate",
+                    "recovery_days", "population_size", "isolate_force", "house_density",
+                    "contact_density", "engine", "seed", "lockdown_threshold", "lockdown_release",
+                    "lockdown_strength", "quarantine", "household_isolation", "policy_start", "policy_end")
+
+
+def save_run(directory: str, day: int, network: ContactNetwork, state: PopulationState, targets: ContactTargets,
+             rng: RandomContext, parameters: dict[str, Any], metrics: EpidemicMetrics, keep: int = CHECKPOINT_KEEP,
+             policy: Policy | None = None, fresh: bool = False) -> str:
+    """
+    Save the run described by parameters, as returned by parse_parameters, at the end of day
+    as a checkpoint in directory (see checkpoint.py), and return the folder of the checkpoint.
+
+    The checkpoint holds state, both layers of network, the unused draws of targets, the
+    position of rng, the measures of policy in effect and the table of metrics, which also
+    holds the status counts of every day so far, so that generate_graph and simulate_history
+    can resume each other's checkpoints. fresh tells that the run did not resume (see write_checkpoint).
+    """
+    arrays = {**state_arrays(state), "household_edges": network.household_edges,
+              **adjacency_arrays(network.households, "households"), "household_keys": network.household_keys,
+              "contacts": network.contacts, "contact_targets": targets.buffer[targets.position:],
+              "metrics": metrics.table()}
+    meta = {"model": "visualization", "size": network.size, "rng": rng.get_state(),
+            "parameters": {key: parameters[key] for key in MODEL_PARAMETERS}}
+    if policy is not None:
+        meta["policy"] = policy.get_state()
+    return write_checkpoint(directory, day, arrays, meta, keep, fresh)
+
+
+def resume_run(checkpoint: Checkpoint) -> tuple[ContactNetwork, PopulationState, ContactTargets, RandomContext]:
+    """
+    Return the network, state, contact targets and random context saved in checkpoint by save_run,
+    ready to simulate the day after checkpoint.day. Nothing is recomputed, the arrays stay memory-mapped.
+    A checkpoint saved by another model, e.g. the Simulation of main.py, raises a ValueError.
+    """
+    if checkpoint.meta.get("model") != "visualization":
+        raise ValueError(f"the checkpoint of day {checkpoint.day} was saved by the {checkpoint.meta.get('model')} "
+                         f"model, not by generate_graph or simulate_history")
+    arrays = checkpoint.arrays
+    state = restore_state(checkpoint)
+    network = ContactNetwork(arrays["household_edges"], checkpoint.meta["size"],
+                             restore_adjacency(checkpoint, "households"), arrays["household_keys"])
+    network.contact_buffer = arrays["contacts"]
+    network.contact_count = len(arrays["contacts"])
+    rng = context_from_state(checkpoint.meta["rng"])
+    targets = ContactTargets(rng.generator)
+    targets.buffer = arrays["contact_targets"]
+    return network, state, targets, rng
+
+
+def create_metrics(parameters: dict[str, Any], state: PopulationState, day: int = 0,
+                   checkpoint: Checkpoint | None = None) -> EpidemicMetrics:
+    """
+    Return a metrics collector on state for the run described by parameters, as returned by
+    parse_parameters, from day on, continuing the metrics saved by save_run in checkpoint if any.
+    """
+    previous = None if checkpoint is None else checkpoint.arrays.get("metrics")
+    return EpidemicMetrics(state, parameters["incubation_period"] + parameters["recovery_days"], day, previous)
+
+
+def create_profiler(parameters: dict[str, Any], concurrent: bool = False) -> Profiler:
+    """
+    Return the profiler asked for by parameters, as returned by parse_parameters, which is
+    disabled unless "profile" is true. concurrent tells that the days run on a worker thread
+    beside the display (see pipeline.py), so allocations are not tracked.
+    """
+    return Profiler(parameters["profile"], parameters["profile_allocations"], parameters["profile_days"],
+                    concurrent)
+
+
+def create_renderer(total_days: int, status: np.ndarray, household_edges: np.ndarray,
+                    positions: np.ndarray | None, day: int = 0) -> GraphRenderer | CountsRenderer:
+    """
+    Return the renderer showing a run of total_days days of people with the given status on day:
+    the graph, with only what changes between days redrawn (see renderer.py), when the
+    positions of the people are given, and the curves of the counts per status otherwise.
+    """
+    if positions is None:
+        renderer = CountsRenderer(total_days, len(status))
+        renderer.draw_day(day, np.bincount(status, minlength=len(STATUS_NAMES)))
+        return renderer
+    return GraphRenderer(positions, household_edges, status)
 
 
 def generate_graph(
@@ -264,83 +505,139 @@ def generate_graph(
         as keys in virus_data
     - population_parameter = ["population_size", "house_density",
         "contact_density", "initial_infected_count"] are keys in population_data
-    - visualization_parameter = ["pause", "total_days"] are keys in
+    - visualization_parameter = ["pause" or "frame_rate", "total_days"] are keys in
         visualization_data
+    - the optional key "engine" names one of transmission.TRANSMISSION_ENGINES
+    - the optional keys "profile", "profile_days" and "profile_output" time the phases
+      of every day and write them to files (see parse_parameters and profiling.py)
+    - the optional keys "checkpoint_every", "checkpoint_dir" and "resume" save the run
+      every few days and resume it from the last save (see parse_parameters and checkpoint.py)
+    - the optional keys "record_path" and "record_contacts" record every day to disk to be
+      replayed with replay_graph (see parse_parameters and trajectory.py)
+    - the optional key "metrics_path" exports the numbers of every day (see metrics.py)
+    - the optional keys "lockdown_threshold", "quarantine", "household_isolation", ... add
+      measures to the policy of the run (see parse_parameters and interventions.py)
+
+    Missing keys take the default values of parse_parameters. See headless.py to run the
+    same simulation without drawing it.
+
+    Populations above GRAPH_DRAWING_LIMIT are shown as curves of the counts per status.
     """
-    density_mapping = {
-        "high": 6,
-        "medium": 4,
-        "low": 2,
-    }
+    parameters = parse_parameters(data)
+    # The days run on the worker of pipeline.py while this thread draws
+    profiler = create_profiler(parameters, concurrent=True)
+    checkpoint = load_checkpoint(parameters["checkpoint_dir"]) if parameters["resume"] else None
+
+    if checkpoint is None:
+        # Initialize the household layer and family members
+        with profiler.phase("initialize_population"):
+            rng = RandomContext(parameters["seed"])
+            network, state = initialize_population(parameters, rng)
+            targets = ContactTargets(rng.generator)
+        first_day = 0
+    else:
+        with profiler.phase("resume"):
+            parameters.update(checkpoint.meta["parameters"])
+            network, state, targets, rng = resume_run(checkpoint)
+        first_day = checkpoint.day
+    metrics = create_metrics(parameters, state, first_day, checkpoint)
+    policy = create_policy(parameters, checkpoint)
+    # Spawning does not draw from rng, and a resumed rng spawns the same layout stream again
+    layout_rng = rng.spawn(1)[0]
+    large = parameters["population_size"] > GRAPH_DRAWING_LIMIT
+
+    with profiler.phase("initialize_renderer"):
+        # Families are drawn as clusters, see layout.py
+        positions = None if large else \
+            cached_family_layout(state.family, parameters["house_density"], layout_rng)
+        renderer = create_renderer(parameters["total_days"], state.status, network.household_edges,
+                                   positions, first_day)
+    if checkpoint is None:
+        with profiler.phase("initialize_edges"):
+            edges = initialize_edges(network, state, parameters["contact_density"], parameters["isolate_force"],
+                                     rng, targets, policy)
+    else:
+        edges = network.contacts
+
+    recorder = None
+    if parameters["record_path"] is not None:
+        recorder = TrajectoryRecorder(parameters["record_path"], len(state), network.household_edges,
+                                      state.family, positions, parameters["record_contacts"],
+                                      first_day, resume=checkpoint is not None)
+        if recorder.next_day == first_day:
+            recorder.record(state.status, edges)
+
+    day = first_day
+
+    def step(_edges: np.ndarray) -> np.ndarray:
+        """
+        Advance the simulation by one day, recording it and saving a checkpoint when one is due.
+        """
+        nonlocal day
+        new_edges = run_day(network, state, parameters, rng, targets, profiler, policy, day + 1)
+        day += 1
+        metrics.end_day(day)
+        if recorder is not None:
+            with profiler.phase("record"):
+                recorder.record(state.status, new_edges, state.counts())
+        if checkpoint_due(day, parameters["checkpoint_every"]):
+            with profiler.phase("checkpoint"):
+                save_run(parameters["checkpoint_dir"], day, network, state, targets, rng, parameters, metrics,
+                         policy=policy, fresh=checkpoint is None)
+        return new_edges
+
+    # The network is updated on a worker thread and drawn here at the target frame rate (see pipeline.py)
+    worker = SimulationWorker(step, state, parameters["total_days"], edges, counts_only=large,
+                              profiler=profiler, first_day=first_day)
+    play(renderer, worker, parameters["frame_rate"], profiler)
+    worker.join()
+    if recorder is not None:
+        recorder.close()
+    if parameters["metrics_path"] is not None:
+        metrics.save(parameters["metrics_path"])
+
+    if profiler.enabled:
+        profiler.save(parameters["profile_output"])
+        profiler.close()
+        profiler.report()
 
-    # Add default value
-    infection_rate = float(data.get("infection_rate", 0.3))
-    initial_infected_count = int(
-        data.get("initial_infected_count", 5))  # Assuming default 0
-    incubation_period = int(
-        data.get("incubation_period", 5))  # Assuming default 0
-    death_rate = float(data.get("death_rate", 0.02))  # Assuming default 0
-    recovery_days = int(data.get("recovery_days", 7))  # Assuming default 0
-    population_size = int(min(max(data.get("population_size", 500), 10), 1000))
-    isolate_force = float(data.get("isolate_force", 0.0))  # Assuming default 0
-    house_density = density_mapping.get(data["house_density"].lower(), 2)
-    contact_density = int(data.get("contact_density", 5))  # Assuming default 0
-
-    # Initialize the graph
-    graph = nx.Graph()
-    graph.add_nodes_from(range(1, population_size + 1))
-    num_nodes = graph.number_of_nodes()
-
-    plt.ion()
-    fig, ax = plt.subplots(figsize=(15, 10))
+    # Keep the window open after the loop
+    renderer.show()
 
-    # Initialize family members
-    initialize_family(graph, num_nodes, house_density)
-    initialize_infected(graph, initial_infected_count)
-
-    # Animation
-    positions = nx.spring_layout(
-        graph, scale=5, k=1.0 / (len(graph.nodes()) ** 0.5), iterations=20, seed=42)
-    edges = initialize_edges(graph, contact_density, isolate_force)
-    for day in range(1, 101):
-        ax.clear()
-        fig.clf()
-
-        # Redefine ax to ensure it's correctly linked to the current figure
-        ax = fig.add_subplot(111)
-
-        # Update the graph
-        edges = update_day(graph, infection_rate, death_rate, recovery_days,
-                           contact_density, isolate_force, incubation_period, edges)
-        node_colors = [graph.nodes[node]['node_color']
-                       for node in graph.nodes()]
-        edge_colors = [graph.edges[edge]['edge_color']
-                       for edge in graph.edges()]
-        nx.draw(graph, pos=positions, node_color=node_colors,
-                with_labels=False, ax=ax, node_size=10, edge_color=edge_colors)
-
-        # Set the title and subtitle
-        infected = sum([1 for node in graph.nodes()
-                       if graph.nodes[node]['status'] == 'infected'])
-        dead = sum([1 for node in graph.nodes()
-                   if graph.nodes[node]['status'] == 'dead'])
-
-        fig.suptitle('Virus Infection', ha='center')
-        # Subtitle below main title
-        fig.text(0.5, 0.94, f'The {day}th Day',
-                 ha='center', va='center', fontsize=10)
-        # Second subtitle below the first subtitle
-        fig.text(0.5, 0.9, f'Infected: {infected} / {population_size - dead}',
-                 ha='center', va='center', fontsize=10)
-
-        # Draw and pause
-        plt.subplots_adjust(left=0.05, right=0.95, bottom=0.05)
-        plt.draw()
-        plt.pause(0.5)
 
-    # Keep the window open after the loop
-    plt.ioff()
-    plt.show()
+def replay_graph(path: str, frame_rate: float = 2.0, first_day: int | None = None,
+                 last_day: int | None = None) -> None:
+    """
+    Play the trajectory recorded in path (see trajectory.py and the "record_path" key of
+    parse_parameters) from first_day to last_day, by default all of it, at frame_rate days
+    per second with the renderers of generate_graph, without simulating anything.
+    """
+    trajectory = Trajectory(path)
+    first_day = trajectory.first_day if first_day is None else first_day
+    last_day = trajectory.last_day if last_day is None else last_day
+    state = PopulationState(trajectory.size)
+    state.status[:] = trajectory.status(first_day)
+
+    positions = None
+    if trajectory.size <= GRAPH_DRAWING_LIMIT:
+        positions = trajectory.positions()
+        positions = family_layout(trajectory.family(), np.random.default_rng()) if positions is None else positions
+    renderer = create_renderer(last_day, state.status, trajectory.households(), positions, first_day)
+    day = first_day
+
+    def step(_edges: np.ndarray) -> np.ndarray:
+        """
+        Move the replay to the next recorded day.
+        """
+        nonlocal day
+        day += 1
+        state.status[:] = trajectory.status(day)
+        return trajectory.contacts(day)
+
+    worker = SimulationWorker(step, state, last_day, trajectory.contacts(first_day),
+                              counts_only=positions is None, first_day=first_day)
+    play(renderer, worker, frame_rate)
+    renderer.show()
 
 
 if __name__ == "__main__":
@@ -350,8 +647,12 @@ if __name__ == "__main__":
     if check_python_ta:
         python_ta.check_all(config={
             'max-line-length': 120,
-            'extra-imports': ["matplotlib.pyplot", "numpy", "networkx",
-                              "simulation", "random"],  # the names (strs) of imported modules
+            'extra-imports': ["numpy",
+                              "simulation", "math", "typing", "contacts",
+                              "population", "transmission", "layout", "renderer",
+                              "pipeline", "randomness", "progression", "profiling",
+                              "checkpoint", "trajectory", "metrics",
+                              "interventions"],  # the names (strs) of imported modules
             # the names (strs) of functions that call print/open/input
             'allowed-io': [],
             # 'disabled': ["E9999"]